@@ -0,0 +1,97 @@
+"""Check the appositive boundary cache against uncached detection and time both on documents full of
+appositives and relative clauses.
+
+Relative clause attachment looks for the appositives between each candidate NP and a relative
+pronoun, and clause boundary extraction looks for them again, so without the cache the same start
+positions are analysed many times.
+
+Usage: py -m src.benchmarks.appositive_boundary --sizes 10 100 500 --chains 10 50 100
+"""
+
+import argparse
+import logging
+import random
+import sys
+import time
+
+from nltk import Tree
+
+from ..simplification import clause_boundary
+from ..simplification.agreement import init_agreement_pipeline
+from ..simplification.relative_clause_attachment import relative_clause_attachment
+from .sentence_index import make_sentence
+
+CLAUSES = [
+    "Budi , warga Jakarta , membeli rumah",
+    "presiden , warga di Jakarta , warga yang membeli rumah , mengatakan bahwa rumah itu besar",
+    "warga , presiden , Budi , rumah itu , dan dua warga yang membeli rumah",
+    "dia membeli rumah , rumah yang besar , di Jakarta",
+    "rumah , rumah itu , yang dia membeli"
+]
+
+def make_document(rng: random.Random, sentence_count: int) -> list[Tree]:
+    tree_list = [
+        make_sentence(" , ".join(rng.choice(CLAUSES) for _ in range(rng.randint(1, 4))).split(" ") + ["."])
+        for _ in range(sentence_count)
+    ]
+    return init_agreement_pipeline()(tree_list)
+
+def make_appositive_chain(appositive_count: int) -> list[Tree]:
+    # "Budi , warga di Jakarta , warga di Jakarta , ... yang membeli rumah ."
+    words = ["Budi"] + [",", "warga", "di", "Jakarta"] * appositive_count + ["yang", "membeli", "rumah", "."]
+    return init_agreement_pipeline()([make_sentence(words)])
+
+def uncached_find_appositive_boundary(tree: Tree, start_index: int, keep_structure=True, strategy=1) -> tuple[Tree, int, bool]:
+    return clause_boundary.analyse_appositive_boundary(tree, start_index, keep_structure=keep_structure, strategy=strategy)
+
+def run(tree_list: list[Tree], use_cache: bool) -> tuple[list[str], float, dict[str, int]]:
+    # The detection functions look find_appositive_boundary up in the module, so replacing it
+    # there turns the cache off everywhere.
+    cached_find_appositive_boundary = clause_boundary.find_appositive_boundary
+    if not use_cache:
+        clause_boundary.find_appositive_boundary = uncached_find_appositive_boundary
+
+    try:
+        start_time = time.perf_counter()
+        tree_list = relative_clause_attachment(tree_list)
+        corefs = [str([subtree.label().coref for subtree in tree]) for tree in tree_list]
+        tree_list = clause_boundary.extract_boundaries(tree_list, strategy=5)
+        elapsed_time = time.perf_counter() - start_time
+    finally:
+        clause_boundary.find_appositive_boundary = cached_find_appositive_boundary
+
+    return (corefs + [str(tree) for tree in tree_list], elapsed_time, clause_boundary.appositive_boundary_cache_info(tree_list))
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 500], help="sentences per document")
+    parser.add_argument("--chains", type=int, nargs="+", default=[10, 50, 100], help="appositives in a row before a relative pronoun")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    # Clause boundary detection logs every step; keep it out of the output.
+    logging.disable(logging.CRITICAL)
+
+    mismatch_count = 0
+    cases = [(f"{size:>5} sentences", lambda size=size: make_document(random.Random(args.seed), size)) for size in args.sizes]
+    cases += [(f"{count:>5} appositives", lambda count=count: make_appositive_chain(count)) for count in args.chains]
+    for name, make_tree_list in cases:
+        uncached_output, uncached_time, _ = run(make_tree_list(), use_cache=False)
+        cached_output, cached_time, counts = run(make_tree_list(), use_cache=True)
+        hit_count = counts["hits"]
+        miss_count = counts["misses"]
+
+        if cached_output != uncached_output:
+            mismatch_count += 1
+
+        print(
+            f"{name}: uncached {uncached_time * 1000:9.2f} ms, cached {cached_time * 1000:9.2f} ms"
+            f" ({uncached_time / cached_time:4.1f}x), {hit_count} hits, {miss_count} misses,"
+            f" {'same' if cached_output == uncached_output else 'DIFFERENT'} output"
+        )
+
+    if mismatch_count > 0:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Check the CoNLL-U input of TextSimplifier(pretagged=True) against the golden results, and time
+the startup of a rules-only simplifier in a fresh interpreter.
+
+The bundled tagged documents are written as CoNLL-U, read back, and simplified for every strategy;
+the output must be the golden simplified sentences of src.benchmarks.suite. The startup check
+imports src.indo_ts and builds a pretagged TextSimplifier in a new process, and fails if Stanza or
+torch was imported or if it took longer than --max-startup-seconds.
+
+Usage: py -m src.benchmarks.conllu_input [--max-startup-seconds 1]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+
+from ..indo_ts import TextSimplifier
+from ..simplification.conllu import read_conllu_documents, write_conllu_documents
+from .suite import GOLDEN_FILE, STRATEGIES, load_documents
+
+STARTUP_SCRIPT = """
+import json
+import sys
+import time
+start_time = time.perf_counter()
+from src.indo_ts import TextSimplifier
+from src.metrics import get_peak_rss_bytes
+simplifier = TextSimplifier(strategy=5, pretagged=True)
+startup_seconds = time.perf_counter() - start_time
+simplifier.simplify([[("Budi", "PROPN", ""), ("pergi", "VERB", ""), (".", "PUNCT", "")]])
+print(json.dumps({
+    "startup_seconds": startup_seconds,
+    "first_document_seconds": time.perf_counter() - start_time - startup_seconds,
+    "peak_rss_bytes": get_peak_rss_bytes(),
+    "heavy_modules": sorted(name for name in ("stanza", "torch") if name in sys.modules)
+}))
+"""
+
+REPOSITORY_DIRECTORY = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def measure_startup() -> dict:
+    completed = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT], cwd=REPOSITORY_DIRECTORY, capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout.splitlines()[-1])
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--max-startup-seconds", type=float, default=1.0)
+    args = parser.parse_args(argv)
+
+    documents = load_documents()
+    with open(GOLDEN_FILE, mode="r", encoding="utf-8") as file:
+        golden = json.load(file)
+
+    conllu_file = io.StringIO()
+    write_conllu_documents(((str(index), document) for index, document in enumerate(documents)), conllu_file)
+    conllu_file.seek(0)
+    start_time = time.perf_counter()
+    read_documents = list(read_conllu_documents(conllu_file))
+    read_seconds = time.perf_counter() - start_time
+
+    failure_count = 0
+    if read_documents != [(str(index), document) for index, document in enumerate(documents)]:
+        print("The documents read back differ from the documents written")
+        failure_count += 1
+
+    print(f"Read {len(read_documents)} documents from {len(conllu_file.getvalue())} characters of CoNLL-U in {read_seconds * 1000:.2f} ms")
+
+    for strategy in STRATEGIES:
+        with contextlib.redirect_stdout(io.StringIO()):
+            simplifier = TextSimplifier(strategy=strategy, pretagged=True)
+
+        results = simplifier.simplify_batch([document for _, document in read_documents])
+        for index, (result, expected_sentences) in enumerate(zip(results, golden[str(strategy)]["simplified"])):
+            sentences = [sentence for sentence_results in result for sentence in sentence_results]
+            expected_sentences = [sentence[0].upper() + sentence[1:] for sentence in expected_sentences]
+            if sentences != expected_sentences:
+                print(f"Strategy {strategy}, document {index}: {sentences!r} != {expected_sentences!r}")
+                failure_count += 1
+
+    startup = measure_startup()
+    peak_rss = "unknown" if startup["peak_rss_bytes"] is None else f"{startup['peak_rss_bytes'] / 2 ** 20:.1f} MiB"
+    print(
+        f"Rules-only startup: {startup['startup_seconds'] * 1000:.0f} ms, first document {startup['first_document_seconds'] * 1000:.1f} ms,"
+        f" peak RSS {peak_rss}"
+    )
+    if len(startup["heavy_modules"]) > 0:
+        print(f"Imported although no document is tagged: {', '.join(startup['heavy_modules'])}")
+        failure_count += 1
+
+    if startup["startup_seconds"] > args.max_startup_seconds:
+        print(f"Startup took longer than {args.max_startup_seconds} s")
+        failure_count += 1
+
+    if failure_count > 0:
+        sys.exit(1)
+
+    print("Output matches the golden results")
+
+if __name__ == "__main__":
+    main()
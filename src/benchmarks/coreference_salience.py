@@ -0,0 +1,251 @@
+"""Check the SalienceStore-based coreference stages against the previous dict-based ones and
+time both on synthetic documents of growing length.
+
+The previous stages halved every coreference class after each sentence and sorted all classes
+for every pronoun, so their cost per sentence grows with the document.
+
+Usage: py -m src.benchmarks.coreference_salience --sizes 10 100 500 1000 2000 [--repeat 5]
+"""
+
+import argparse
+import logging
+import random
+import sys
+import time
+
+from nltk import Tree
+
+from ..simplification.agreement import is_unification_possible
+from ..simplification.clause_boundary import detect_appositive_boundary
+from ..simplification.grammatical_function import is_subject
+from ..simplification.node import NodeRecord, get_token_record
+from ..simplification.relative_clause_attachment import relative_clause_attachment
+from ..simplification.resolve_third_person_pronouns import (
+    get_salience,
+    init_third_person_pronouns_pipeline,
+    is_satisfy_iobj_obliq_syntax_filtering,
+    is_satisfy_reflex_syntax_filtering
+)
+from ..simplification.sentence_index import build_sentence_index
+
+logger = logging.getLogger(__name__)
+
+# The previous implementations are kept below as the reference, with the same debug logging so
+# that the timings compare the coreference bookkeeping only.
+
+def reference_resolve_third_person_pronouns(tree_list: list[Tree], demonstratives=False) -> list[Tree]:
+    # Strategy 1, or strategy 2 with `demonstratives`.
+    coref_classes = {}
+    for tree in tree_list:
+        subtrees = tree
+        for subtree_index, subtree in enumerate(subtrees):
+            logger.debug("Checking subtree=%r", subtree)
+            subtree_label = subtree.label()
+            if subtree_label.tag != "NP":
+                continue
+
+            if subtree_label.has_feature("PronType", "Prs") or (demonstratives and subtree[-1].label().has_feature("PronType", "Dem")):
+                if subtree_label.get_feature("Person") not in [None, "3"]:
+                    continue
+
+                found = False
+                for coref_class_id, coref_class_details in sorted(coref_classes.items(), key=lambda x: x[1]["salience"], reverse=True):
+                    np = coref_class_details["tree"]
+                    np_label = np.label()
+                    logger.debug("Agreement filtering: np_label.agreements=%r", np_label.agreements)
+                    if len(np_label.agreements) > 0 and not is_unification_possible(subtree_label, np_label.agreements):
+                        continue
+
+                    if not is_satisfy_reflex_syntax_filtering(subtrees, subtree_index, np):
+                        continue
+
+                    if not is_satisfy_iobj_obliq_syntax_filtering(subtrees, subtree_index, np):
+                        continue
+
+                    if subtree_label.gfunc == "DOBJ" and np_label.gfunc == "SUBJ":
+                        subtree_subject_index = subtree_index - 1
+                        while subtree_subject_index >= 0 and not is_subject(subtrees[subtree_subject_index]):
+                            subtree_subject_index -= 1
+
+                        if subtree_subject_index >= 0:
+                            logger.debug("Subtree subject: %s", subtrees[subtree_subject_index])
+                            if subtrees[subtree_subject_index] == np:
+                                continue
+
+                    subtree_label.coref = coref_class_id
+                    coref_class_details["salience"] += get_salience(subtree_label)
+                    found = True
+                    break
+
+                if not found:
+                    subtree_label.coref = -1
+            else:
+                coref_classes[subtree_label.np_id] = {"salience": get_salience(subtree_label), "members": [], "tree": subtree}
+
+        for np_id in coref_classes.keys():
+            coref_classes[np_id]["salience"] /= 2
+
+    return tree_list
+
+def reference_relative_clause_attachment(tree_list: list[Tree]) -> list[Tree]:
+    coref_classes = {}
+    for tree in tree_list:
+        subtrees = tree
+        for subtree_index, subtree in enumerate(subtrees):
+            logger.debug("Checking subtree=%r", subtree)
+            subtree_label = subtree.label()
+            if subtree_label.tag == "NP":
+                if not subtree_label.has_feature("PronType", "Prs"):
+                    coref_classes[subtree_label.np_id] = {"salience": get_salience(subtree_label), "members": [], "tree": subtree}
+
+            elif subtree_label.has_feature("PronType", "Rel"):
+                subtree_label = subtree_label.copy()
+                subtree.set_label(subtree_label)
+
+                found = False
+                for coref_class_id, coref_class_details in sorted(coref_classes.items(), key=lambda x: x[1]["salience"], reverse=True):
+                    np = coref_class_details["tree"]
+                    np_index = subtree_index - 1
+                    while np_index >= 0 and subtrees[np_index] != np:
+                        np_index -= 1
+
+                    if np_index < 0:
+                        continue
+
+                    np_index += 1
+                    while np_index < subtree_index:
+                        logger.debug("np_index=%r", np_index)
+                        if subtrees[np_index].label().tag == "ADP" and np_index < len(subtrees) - 1:
+                            if subtrees[np_index + 1].label().tag == "NP":
+                                np_index += 2
+                            else:
+                                break
+
+                        elif subtrees[np_index][0] == "," and np_index < len(subtrees) - 3:
+                            _, boundary_index = detect_appositive_boundary(tree, start_index=np_index + 1)
+                            logger.debug("For relative clause attachment: boundary_index=%r", boundary_index)
+                            if boundary_index == -1 or boundary_index >= subtree_index:
+                                break
+
+                            np_index = boundary_index + 1
+
+                        else:
+                            break
+
+                    if np_index < subtree_index:
+                        continue
+
+                    subtree_label.coref = coref_class_id
+                    found = True
+                    break
+
+                if not found:
+                    for coref_class_id, _ in sorted(coref_classes.items(), key=lambda x: x[1]["salience"], reverse=True):
+                        subtree_label.coref = coref_class_id
+                        found = True
+                        break
+
+                if not found:
+                    subtree_label.coref = -1
+
+        for np_id in coref_classes.keys():
+            coref_classes[np_id]["salience"] /= 2
+
+    return tree_list
+
+NOUN_FEATS = ["Number=Sing", "Number=Plur", "Number=Sing|LocationTime=Yes", ""]
+PRONOUN_FEATS = ["Number=Sing|Person=3|PronType=Prs", "Number=Plur|Person=3|PronType=Prs", "Person=1|PronType=Prs"]
+
+def synthetic_document(rng: random.Random, sentence_count: int) -> list[Tree]:
+    tree_list: list[Tree] = []
+    np_id = 0
+
+    def noun_phrase(gfunc: str, pronoun=False) -> Tree:
+        nonlocal np_id
+        feats_string = rng.choice(PRONOUN_FEATS if pronoun else NOUN_FEATS)
+        head = get_token_record("PRON" if pronoun else "NOUN", feats_string)
+        children = [Tree(head, ["dia" if pronoun else "rumah"])]
+        if not pronoun and rng.random() < 0.2:
+            children.append(Tree(get_token_record("DET", "PronType=Dem"), ["itu"]))
+
+        label = NodeRecord("NP", np_id=np_id, gfunc=gfunc, agreements=dict(head.feats))
+        np_id += 1
+        return Tree(label, children)
+
+    for sentence_index in range(sentence_count):
+        subtrees = [noun_phrase("SUBJ", pronoun=rng.random() < 0.3), Tree(get_token_record("VERB", ""), ["membeli"])]
+        subtrees.append(noun_phrase("DOBJ", pronoun=rng.random() < 0.3))
+        if rng.random() < 0.5:
+            subtrees += [Tree(get_token_record("ADP", ""), ["di"]), noun_phrase("OBLIQ", pronoun=rng.random() < 0.2)]
+
+        if rng.random() < 0.4:
+            subtrees += [
+                Tree(get_token_record("PRON", "PronType=Rel"), ["yang"]),
+                Tree(get_token_record("VERB", ""), ["dibangun"]),
+                noun_phrase("OBLIQ")
+            ]
+
+        subtrees.append(Tree(get_token_record("PUNCT", ""), ["."]))
+        tree = Tree(NodeRecord("S", sentence_id=str(sentence_index)), subtrees)
+        # Grammatical function extraction builds the index of every sentence in the pipeline, so
+        # the stages are timed without building it.
+        build_sentence_index(tree)
+        tree_list.append(tree)
+
+    return tree_list
+
+def run_stage(stage, size: int, seed: int, repeat: int) -> tuple[list[str], float]:
+    # The output of the last run and the fastest time of `repeat` runs on fresh documents
+    best_time = float("inf")
+    for _ in range(repeat):
+        tree_list = synthetic_document(random.Random(seed + size), size)
+        start_time = time.perf_counter()
+        stage(tree_list)
+        best_time = min(best_time, time.perf_counter() - start_time)
+
+    return ([str(tree) for tree in tree_list], best_time)
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 100, 500, 1000, 2000], help="sentences per document")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5, help="runs per size, the fastest is shown")
+    args = parser.parse_args(argv)
+
+    stages = [
+        (
+            "Resolve third person pronouns (strategy 1)",
+            reference_resolve_third_person_pronouns,
+            init_third_person_pronouns_pipeline(strategy=1)
+        ),
+        (
+            "Resolve third person pronouns (strategy 2)",
+            lambda tree_list: reference_resolve_third_person_pronouns(tree_list, demonstratives=True),
+            init_third_person_pronouns_pipeline(strategy=2)
+        ),
+        (
+            "Relative clause attachment",
+            reference_relative_clause_attachment,
+            relative_clause_attachment
+        )
+    ]
+
+    failed = False
+    for name, reference_stage, stage in stages:
+        print(f"{name}:")
+        for size in args.sizes:
+            expected, reference_time = run_stage(reference_stage, size, args.seed, args.repeat)
+            actual, new_time = run_stage(stage, size, args.seed, args.repeat)
+
+            same = expected == actual
+            failed = failed or not same
+            print(
+                f"  {size:>5} sentences: previous {reference_time * 1000:9.1f} ms, SalienceStore {new_time * 1000:8.1f} ms "
+                f"({reference_time / new_time:5.1f}x), {'identical' if same else 'DIFFERENT'} corefs"
+            )
+
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""Start the simplification daemon, check its output against the golden results, show how much of
+the memory of each worker is shared with the parent, and check that a killed worker is replaced.
+
+By default the daemon serves the bundled tagged documents (--pretagged), which needs no Stanza.
+With --text, it loads Stanza and is sent the detokenized sentences of the same documents; their
+output is not compared, as Stanza tags them on its own.
+
+Usage: py -m src.benchmarks.daemon [--workers 4] [--clients 8] [--text]
+"""
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from ..daemon import get_memory_info
+from ..daemon_client import DaemonClient
+from ..utils import word_lists_to_sentences
+from .suite import GOLDEN_FILE, load_documents
+
+REPOSITORY_DIRECTORY = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def wait_for_daemon(socket_path: str, daemon: subprocess.Popen, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and daemon.poll() is None:
+        try:
+            with DaemonClient(socket_path, timeout=timeout) as client:
+                client.ping()
+                return True
+        except OSError:
+            time.sleep(0.1)
+
+    return False
+
+def get_process_memory(pid: int) -> dict:
+    # get_memory_info of another process, through /proc
+    info = {"rss_bytes": None}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", mode="r") as file:
+            for line in file:
+                name, _, value = line.partition(":")
+                if name == "Rss":
+                    info["rss_bytes"] = int(value.split()[0]) * 1024
+    except OSError:
+        pass
+
+    return info
+
+def format_bytes(value: int | None) -> str:
+    return "unknown" if value is None else f"{value / 2 ** 20:.1f} MiB"
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--clients", type=int, default=8, help="threads sending documents at once")
+    parser.add_argument("--repeat", type=int, default=20, help="times each client sends every document")
+    parser.add_argument("--strategy", type=int, default=5)
+    parser.add_argument("--text", action="store_true", help="send text and let the daemon tag it with Stanza")
+    parser.add_argument("--start-timeout", type=float, default=300.0)
+    args = parser.parse_args(argv)
+
+    tagged_documents = load_documents()
+    if args.text:
+        documents = ["\n\n".join(word_lists_to_sentences([[word for word, _, _ in sentence] for sentence in document])) for document in tagged_documents]
+        expected_results = None
+    else:
+        documents = tagged_documents
+        with open(GOLDEN_FILE, mode="r", encoding="utf-8") as file:
+            expected_results = [
+                [sentence[0].upper() + sentence[1:] for sentence in sentences]
+                for sentences in json.load(file)[str(args.strategy)]["simplified"]
+            ]
+
+    with tempfile.TemporaryDirectory() as directory:
+        socket_path = os.path.join(directory, "indo_ts.sock")
+        command = [
+            sys.executable, "-m", "src.daemon", "--socket", socket_path, "--workers", str(args.workers),
+            "--strategy", str(args.strategy), "--log-file", os.path.join(directory, "daemon.log")
+        ]
+        if not args.text:
+            command.append("--pretagged")
+
+        start_time = time.perf_counter()
+        daemon = subprocess.Popen(command, cwd=REPOSITORY_DIRECTORY, stdout=subprocess.DEVNULL)
+        try:
+            if not wait_for_daemon(socket_path, daemon, args.start_timeout):
+                print("The daemon did not start")
+                sys.exit(1)
+
+            print(f"Daemon ready in {time.perf_counter() - start_time:.2f} s with {args.workers} workers")
+            failure_count = run_checks(socket_path, daemon, documents, expected_results, args)
+        finally:
+            daemon.send_signal(signal.SIGTERM)
+            daemon.wait(timeout=30)
+
+        if os.path.exists(socket_path):
+            print("The daemon left its socket behind")
+            failure_count += 1
+
+    if failure_count > 0:
+        sys.exit(1)
+
+def run_checks(socket_path: str, daemon: subprocess.Popen, documents: list, expected_results: list[list[str]] | None, args) -> int:
+    failure_count = 0
+    mismatches: list[str] = []
+    errors: list[BaseException] = []
+
+    def send_documents():
+        try:
+            with DaemonClient(socket_path) as client:
+                for _ in range(args.repeat):
+                    for index, document in enumerate(documents):
+                        result = client.simplify(document)
+                        sentences = [sentence for sentence_results in result for sentence in sentence_results]
+                        if expected_results is not None and sentences != expected_results[index]:
+                            mismatches.append(f"document {index}: {sentences!r} != {expected_results[index]!r}")
+        except BaseException as e:
+            errors.append(e)
+
+    start_time = time.perf_counter()
+    threads = [threading.Thread(target=send_documents) for _ in range(args.clients)]
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    elapsed = time.perf_counter() - start_time
+    document_count = args.clients * args.repeat * len(documents)
+    print(f"{document_count} documents from {args.clients} clients in {elapsed:.2f} s ({document_count / elapsed:.0f} documents/s)")
+    for message in mismatches[:5] + [f"{type(e).__name__}: {e}" for e in errors]:
+        print(message)
+
+    if len(mismatches) > 0 or len(errors) > 0:
+        failure_count += 1
+
+    # A connection holds its worker, so as many open connections reach every worker once.
+    clients = [DaemonClient(socket_path) for _ in range(args.workers)]
+    try:
+        worker_memory = [client.memory() for client in clients]
+    finally:
+        for client in clients:
+            client.close()
+
+    parent_memory = get_process_memory(daemon.pid)
+    print(f"Parent: RSS {format_bytes(parent_memory['rss_bytes'])} (this process: {format_bytes(get_memory_info()['rss_bytes'])})")
+    for info in worker_memory:
+        print(
+            f"Worker {info['pid']}: RSS {format_bytes(info['rss_bytes'])}, shared {format_bytes(info['shared_bytes'])},"
+            f" private {format_bytes(info['private_bytes'])}, PSS {format_bytes(info['pss_bytes'])}"
+        )
+
+    worker_pids = {info["pid"] for info in worker_memory}
+    if len(worker_pids) != args.workers:
+        print(f"Expected {args.workers} workers, reached {len(worker_pids)}")
+        failure_count += 1
+
+    killed_pid = min(worker_pids)
+    os.kill(killed_pid, signal.SIGKILL)
+    deadline = time.monotonic() + 10
+    replaced = False
+    while time.monotonic() < deadline and not replaced:
+        time.sleep(0.2)
+        clients = [DaemonClient(socket_path, timeout=10) for _ in range(args.workers)]
+        try:
+            pids = {client.ping() for client in clients}
+        finally:
+            for client in clients:
+                client.close()
+
+        replaced = killed_pid not in pids and len(pids) == args.workers
+
+    print(f"Killed worker {killed_pid}: {'replaced' if replaced else 'NOT replaced'}")
+    if not replaced:
+        failure_count += 1
+
+    return failure_count
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Check word_list_to_sentence against the string-concatenating implementation it replaces and
+time both on long sentences.
+
+Usage: py -m src.benchmarks.detokenizer --count 20000 --lengths 100 1000 10000 50000
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+
+from ..utils import word_list_to_sentence, word_lists_to_sentences
+from .suite import load_documents
+
+# Words that take the special cases, and some that would break a careless rewrite (empty words,
+# words of one character, words with brackets or a newline in them).
+WORDS = [
+    ".", ",", "(", ")", "Rp", "[", "]", "[1]", "[a", "b]", "", "5", "10", "2,5", "0.", "1,", "a\nb",
+    "]x[", "Budi", "rumah", "di", "Jakarta", "yang", "x", "-", "\"", "dan", "( )", ".5"
+]
+
+def previous_word_list_to_sentence(word_list: list[str]) -> str:
+    sentence = ""
+    expected_close_symbol = []
+    next_no_space = True
+    for word in word_list:
+        if next_no_space:
+            sentence += word
+            next_no_space = False
+        elif word in [".", ","]:
+            sentence += word
+        elif len(expected_close_symbol) > 0 and expected_close_symbol[-1] == ")" == word:
+            sentence += word
+            expected_close_symbol.pop()
+        elif word == "(":
+            sentence += " " + word
+            next_no_space = True
+            expected_close_symbol.append(")")
+        elif len(sentence) >= 2 and sentence[-2] in "0123456789" and sentence[-1] in [".", ","]:
+            sentence += word
+        elif word == "Rp":
+            sentence += " " + word
+            next_no_space = True
+        else:
+            sentence += " " + word
+
+    sentence = re.sub(r"\[.+\]", "", sentence)
+
+    return sentence
+
+def make_word_list(rng: random.Random, length: int) -> list[str]:
+    return rng.choices(WORDS, k=length)
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=20000, help="random word lists to compare")
+    parser.add_argument("--lengths", type=int, nargs="+", default=[100, 1000, 10000, 50000], help="words per timed sentence")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    word_lists = [make_word_list(rng, rng.randint(0, 30)) for _ in range(args.count)]
+    word_lists.extend([word for word, _, _ in sentence] for document in load_documents() for sentence in document)
+
+    mismatch_count = 0
+    for word_list, sentence in zip(word_lists, word_lists_to_sentences(word_lists)):
+        expected_sentence = previous_word_list_to_sentence(word_list)
+        if sentence != expected_sentence:
+            mismatch_count += 1
+            if mismatch_count <= 5:
+                print(f"Different: {word_list!r}: {sentence!r} != {expected_sentence!r}")
+
+    print(f"{len(word_lists)} word lists: {mismatch_count} different")
+
+    for length in args.lengths:
+        # Without brackets, so that the bracket removal of the previous implementation does not
+        # remove most of the sentence.
+        word_list = [word for word in make_word_list(rng, length) if "[" not in word and "]" not in word]
+        start_time = time.perf_counter()
+        expected_sentence = previous_word_list_to_sentence(word_list)
+        previous_time = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        sentence = word_list_to_sentence(word_list)
+        current_time = time.perf_counter() - start_time
+
+        if sentence != expected_sentence:
+            mismatch_count += 1
+
+        print(
+            f"{len(word_list):>7} words: previous {previous_time * 1000:9.2f} ms, current {current_time * 1000:8.2f} ms"
+            f" ({previous_time / current_time:5.1f}x), {'same' if sentence == expected_sentence else 'DIFFERENT'} output"
+        )
+
+    # Many "[" and no "]": the previous regex scans the rest of the sentence from every "["
+    word_list = ["[", "Budi"] * (max(args.lengths) // 2)
+    start_time = time.perf_counter()
+    expected_sentence = previous_word_list_to_sentence(word_list)
+    previous_time = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    sentence = word_list_to_sentence(word_list)
+    current_time = time.perf_counter() - start_time
+    if sentence != expected_sentence:
+        mismatch_count += 1
+
+    print(
+        f"{len(word_list):>7} words, unclosed brackets: previous {previous_time * 1000:9.2f} ms, current {current_time * 1000:8.2f} ms,"
+        f" {'same' if sentence == expected_sentence else 'DIFFERENT'} output"
+    )
+
+    if mismatch_count > 0:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
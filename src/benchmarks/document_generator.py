@@ -0,0 +1,123 @@
+"""Tagged documents of a controlled size and shape, for finding out how the stages scale.
+
+The words and their tags come from the bundled documents (data/tagged_documents.json). A sentence
+is a sequence of NPs (a noun with an optional determiner or adjective, a name, or a pronoun) and
+other words (verbs, prepositions, adverbs), with commas, relative clauses ("yang" + verb) and
+conjunctions added at the given rates, and a period at the end.
+"""
+
+import random
+
+from .suite import load_documents
+
+class Vocabulary:
+    def __init__(self, documents: list[list[list[tuple[str, str, str]]]]):
+        self.words: dict[str, list[tuple[str, str, str]]] = {}
+        seen: set[tuple[str, str, str]] = set()
+        for document in documents:
+            for sentence in document:
+                for token in sentence:
+                    word, upos, feats = token
+                    if upos == "PRON":
+                        if "PronType=Rel" in feats or "PronType=Prs" not in feats or "Poss=Yes" in feats:
+                            continue
+
+                    if upos == "PUNCT" or token in seen:
+                        continue
+
+                    seen.add(token)
+                    self.words.setdefault(upos, []).append((word.lower() if upos not in ("PROPN", "NUM") else word, upos, feats))
+
+    def choice(self, rng: random.Random, upos: str) -> tuple[str, str, str]:
+        return rng.choice(self.words[upos])
+
+_vocabulary: Vocabulary | None = None
+
+def get_vocabulary() -> Vocabulary:
+    global _vocabulary
+    if _vocabulary is None:
+        _vocabulary = Vocabulary(load_documents())
+
+    return _vocabulary
+
+def make_noun_phrase(rng: random.Random, vocabulary: Vocabulary) -> list[tuple[str, str, str]]:
+    kind = rng.random()
+    if kind < 0.15:
+        return [vocabulary.choice(rng, "PRON")]
+
+    if kind < 0.4:
+        return [vocabulary.choice(rng, "PROPN") for _ in range(rng.randint(1, 2))]
+
+    noun_phrase = [vocabulary.choice(rng, "NOUN")]
+    if rng.random() < 0.3:
+        noun_phrase.append(vocabulary.choice(rng, "ADJ"))
+
+    if rng.random() < 0.3:
+        noun_phrase.append(vocabulary.choice(rng, "DET"))
+
+    return noun_phrase
+
+def make_other_words(rng: random.Random, vocabulary: Vocabulary) -> list[tuple[str, str, str]]:
+    kind = rng.random()
+    if kind < 0.6:
+        return [vocabulary.choice(rng, "VERB")]
+
+    if kind < 0.85:
+        return [vocabulary.choice(rng, "ADP")]
+
+    return [vocabulary.choice(rng, "ADV")]
+
+def make_tagged_sentence(
+    rng: random.Random,
+    token_count: int,
+    np_density=0.5,
+    comma_rate=0.1,
+    relative_pronoun_rate=0.05,
+    conjunction_rate=0.05,
+    vocabulary: Vocabulary | None = None
+) -> list[tuple[str, str, str]]:
+    """A sentence of about `token_count` tokens. `np_density` is the share of the words that start
+    an NP; the rates are the chances, after each NP or word, of a comma, a relative clause and a
+    conjunction."""
+    if vocabulary is None:
+        vocabulary = get_vocabulary()
+
+    sentence: list[tuple[str, str, str]] = []
+    while len(sentence) < token_count - 1:
+        is_noun_phrase = rng.random() < np_density
+        sentence.extend(make_noun_phrase(rng, vocabulary) if is_noun_phrase else make_other_words(rng, vocabulary))
+        if rng.random() < comma_rate:
+            sentence.append((",", "PUNCT", ""))
+
+        if is_noun_phrase and rng.random() < relative_pronoun_rate:
+            sentence.append(("yang", "PRON", "PronType=Rel"))
+            sentence.append(vocabulary.choice(rng, "VERB"))
+
+        if rng.random() < conjunction_rate:
+            sentence.append(vocabulary.choice(rng, "CCONJ"))
+
+    sentence.append((".", "PUNCT", ""))
+    return sentence
+
+def make_tagged_document(
+    rng: random.Random,
+    sentence_count: int,
+    tokens_per_sentence=20,
+    np_density=0.5,
+    comma_rate=0.1,
+    relative_pronoun_rate=0.05,
+    conjunction_rate=0.05
+) -> list[list[tuple[str, str, str]]]:
+    vocabulary = get_vocabulary()
+    return [
+        make_tagged_sentence(
+            rng,
+            tokens_per_sentence,
+            np_density=np_density,
+            comma_rate=comma_rate,
+            relative_pronoun_rate=relative_pronoun_rate,
+            conjunction_rate=conjunction_rate,
+            vocabulary=vocabulary
+        )
+        for _ in range(sentence_count)
+    ]
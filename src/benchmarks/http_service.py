@@ -0,0 +1,194 @@
+"""Start the HTTP service, check its plain, batch and streaming responses against the golden
+results, and measure the latency of lone requests and the throughput under concurrent load, with
+and without micro-batching.
+
+By default the service serves the bundled tagged documents (--pretagged), which needs no Stanza;
+there, batching has no tagging to share, so the numbers show its overhead. With --text, the service
+tags the detokenized sentences of the same documents with Stanza, and their output is not compared.
+
+Usage: py -m src.benchmarks.http_service [--clients 16] [--max-batch-size 16] [--text]
+"""
+
+import argparse
+import http.client
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from ..utils import word_lists_to_sentences
+from .suite import GOLDEN_FILE, load_documents
+
+REPOSITORY_DIRECTORY = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def start_service(args, max_batch_size: int, log_file: str) -> tuple[subprocess.Popen, int]:
+    command = [
+        sys.executable, "-m", "src.http_service", "--port", "0", "--strategy", str(args.strategy),
+        "--max-batch-size", str(max_batch_size), "--max-wait-ms", str(args.max_wait_ms), "--log-file", log_file
+    ]
+    if not args.text:
+        command.append("--pretagged")
+
+    service = subprocess.Popen(command, cwd=REPOSITORY_DIRECTORY, stdout=subprocess.PIPE, text=True)
+    for line in service.stdout:
+        if line.startswith("Listening on http://"):
+            return (service, int(line.rsplit(":", 1)[1]))
+
+    raise RuntimeError("the service did not start")
+
+def request(connection: http.client.HTTPConnection, method: str, path: str, body=None) -> tuple[int, bytes]:
+    connection.request(method, path, body=None if body is None else json.dumps(body), headers={"Content-Type": "application/json"})
+    response = connection.getresponse()
+    return (response.status, response.read())
+
+def wait_until_ready(port: int, timeout: float):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=timeout)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        _, body = request(connection, "GET", "/health")
+        if json.loads(body)["ready"]:
+            connection.close()
+            return
+
+        time.sleep(0.1)
+
+    raise RuntimeError("the service did not get ready")
+
+def flatten(result: list[list[str]]) -> list[str]:
+    return [sentence for sentences in result for sentence in sentences]
+
+def check_responses(port: int, documents: list, expected_results: list[list[str]] | None) -> int:
+    failure_count = 0
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    for index, document in enumerate(documents):
+        status, body = request(connection, "POST", "/simplify", {"document": document})
+        if status != 200 or (expected_results is not None and flatten(json.loads(body)["result"]) != expected_results[index]):
+            print(f"Document {index}: {status} {body[:200]!r}")
+            failure_count += 1
+
+    status, body = request(connection, "POST", "/simplify", {"documents": documents})
+    results = json.loads(body)["results"]
+    if status != 200 or len(results) != len(documents) or any("error" in result for result in results):
+        print(f"Batch: {status} {body[:200]!r}")
+        failure_count += 1
+    elif expected_results is not None and [flatten(result["result"]) for result in results] != expected_results:
+        print("Batch: different results")
+        failure_count += 1
+
+    connection.request("POST", "/simplify?stream=1", body=json.dumps({"documents": documents}))
+    response = connection.getresponse()
+    streamed_results: dict[int, list[list[str]]] = {}
+    for line in response:
+        item = json.loads(line)
+        streamed_results.setdefault(item["document"], []).append(item.get("result"))
+
+    if len(streamed_results) != len(documents):
+        print(f"Stream: {len(streamed_results)} documents of {len(documents)}")
+        failure_count += 1
+    elif expected_results is not None and [flatten(streamed_results[index]) for index in range(len(documents))] != expected_results:
+        print("Stream: different results")
+        failure_count += 1
+
+    for method, path, body, expected_status in [("POST", "/simplify", b"{", 400), ("GET", "/simplify", None, 405), ("GET", "/nothing", None, 404)]:
+        connection.request(method, path, body=body)
+        response = connection.getresponse()
+        response.read()
+        if response.status != expected_status:
+            print(f"{method} {path}: {response.status}, expected {expected_status}")
+            failure_count += 1
+
+    connection.close()
+    return failure_count
+
+def measure(port: int, documents: list, clients: int, repeat: int) -> tuple[float, float]:
+    # The median latency of lone requests, and documents per second with `clients` at once
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=300)
+    latencies = []
+    for document in documents * 3:
+        start_time = time.perf_counter()
+        request(connection, "POST", "/simplify", {"document": document})
+        latencies.append(time.perf_counter() - start_time)
+
+    connection.close()
+
+    def send_documents():
+        client_connection = http.client.HTTPConnection("127.0.0.1", port, timeout=300)
+        for _ in range(repeat):
+            for document in documents:
+                request(client_connection, "POST", "/simplify", {"document": document})
+
+        client_connection.close()
+
+    threads = [threading.Thread(target=send_documents) for _ in range(clients)]
+    start_time = time.perf_counter()
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    elapsed = time.perf_counter() - start_time
+    return (statistics.median(latencies), clients * repeat * len(documents) / elapsed)
+
+def get_average_batch_size(port: int) -> float:
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    _, body = request(connection, "GET", "/metrics")
+    connection.close()
+    values = {}
+    for line in body.decode("utf-8").splitlines():
+        name, _, value = line.partition(" ")
+        if name in ("indo_ts_batches_total", "indo_ts_batched_documents_total"):
+            values[name] = float(value)
+
+    return values["indo_ts_batched_documents_total"] / max(values["indo_ts_batches_total"], 1)
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=16, help="concurrent clients of the load test")
+    parser.add_argument("--repeat", type=int, default=10, help="times each client sends every document")
+    parser.add_argument("--max-batch-size", type=int, default=16)
+    parser.add_argument("--max-wait-ms", type=float, default=10.0)
+    parser.add_argument("--strategy", type=int, default=5)
+    parser.add_argument("--text", action="store_true", help="send text and let the service tag it with Stanza")
+    parser.add_argument("--start-timeout", type=float, default=300.0)
+    args = parser.parse_args(argv)
+
+    tagged_documents = load_documents()
+    if args.text:
+        documents = ["\n\n".join(word_lists_to_sentences([[word for word, _, _ in sentence] for sentence in document])) for document in tagged_documents]
+        expected_results = None
+    else:
+        documents = tagged_documents
+        with open(GOLDEN_FILE, mode="r", encoding="utf-8") as file:
+            expected_results = [
+                [sentence[0].upper() + sentence[1:] for sentence in sentences]
+                for sentences in json.load(file)[str(args.strategy)]["simplified"]
+            ]
+
+    failure_count = 0
+    with tempfile.TemporaryDirectory() as directory:
+        for max_batch_size in sorted({1, args.max_batch_size}):
+            service, port = start_service(args, max_batch_size, os.path.join(directory, f"http_service_{max_batch_size}.log"))
+            try:
+                wait_until_ready(port, args.start_timeout)
+                failure_count += check_responses(port, documents, expected_results)
+                median_latency, throughput = measure(port, documents, args.clients, args.repeat)
+                print(
+                    f"max batch size {max_batch_size:>3}: lone request {median_latency * 1000:7.2f} ms,"
+                    f" {args.clients} clients {throughput:8.1f} documents/s, average batch {get_average_batch_size(port):5.1f} documents"
+                )
+            finally:
+                service.terminate()
+                service.wait(timeout=30)
+
+    if failure_count > 0:
+        sys.exit(1)
+
+    print("Responses match" + (" the golden results" if expected_results is not None else ""))
+
+if __name__ == "__main__":
+    main()
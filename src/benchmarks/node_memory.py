@@ -0,0 +1,137 @@
+"""Measure the memory and allocations per sentence that interned token records and in-place
+annotation save, against a record for every token and a copy of every sentence after each pass.
+
+Token trees are built from the bundled tagged documents, repeated up to --sentences sentences, in
+three ways: with the semicolon-encoded label strings the pipeline started with, with a NodeRecord
+for every token, and with the interned records the pipeline uses now. The kept trees are measured
+with the memory profiler of src.metrics: bytes traced by tracemalloc and memory blocks left
+allocated, per sentence. Timings are taken separately, without tracemalloc.
+
+Before annotating in place, grammatical function extraction (five passes), agreement, pronoun
+resolution and relative clause attachment copied every sentence into a new Tree after each pass,
+eight copies per sentence. The copies are measured the same way, on the noun chunked trees.
+
+Usage: py -m src.benchmarks.node_memory [--sentences 2000]
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+
+from nltk import Tree
+
+from ..metrics import finish_memory_measurement, start_memory_measurement
+from ..simplification.node import NodeRecord, feats_from_string
+from ..simplification.noun_chunk import init_noun_chunk_pipeline
+from ..simplification.tagged_sentence import tagged_sentences_to_tree_list
+from .suite import load_documents
+
+# Sentence copies per sentence the annotation stages made before annotating in place
+COPIES_PER_SENTENCE = 8
+
+def label_string_trees(sentences: list[list[tuple[str, str, str]]]) -> list[Tree]:
+    # As the pipeline first built them: an f-string label for every token
+    return [
+        Tree(f"S;id={index}", [Tree(f"{upos};{feats_string}", [text]) for text, upos, feats_string in sentence])
+        for index, sentence in enumerate(sentences)
+    ]
+
+def record_per_token_trees(sentences: list[list[tuple[str, str, str]]]) -> list[Tree]:
+    return [
+        Tree(
+            NodeRecord("S", sentence_id=str(index)),
+            [Tree(NodeRecord(upos, feats=feats_from_string(feats_string)), [text]) for text, upos, feats_string in sentence]
+        )
+        for index, sentence in enumerate(sentences)
+    ]
+
+def interned_record_trees(sentences: list[list[tuple[str, str, str]]]) -> list[Tree]:
+    return tagged_sentences_to_tree_list(sentences)
+
+def copy_sentences(tree_list: list[Tree]) -> list[Tree]:
+    # What each of those passes did after annotating
+    return [Tree(tree.label(), [subtree for subtree in tree]) for tree in tree_list]
+
+def copy_passes(tree_list: list[Tree]) -> list[Tree]:
+    for _ in range(COPIES_PER_SENTENCE):
+        tree_list = copy_sentences(tree_list)
+
+    return tree_list
+
+def measure(function, argument, repeat: int) -> tuple[float, dict[str, int], object]:
+    # The fastest time of `repeat` runs, and the memory the result of one more run keeps
+    best_time = float("inf")
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        function(argument)
+        best_time = min(best_time, time.perf_counter() - start_time)
+
+    tracemalloc.start()
+    gc.collect()
+    memory_start = start_memory_measurement()
+    result = function(argument)
+    memory = finish_memory_measurement(memory_start)
+    tracemalloc.stop()
+    return (best_time, memory, result)
+
+def format_row(name: str, sentence_count: int, elapsed: float, memory: dict[str, int]) -> str:
+    return (
+        f"  {name:<28} {memory['retained_bytes'] / sentence_count:9.0f} bytes {memory['net_blocks'] / sentence_count:7.1f} blocks"
+        f" {elapsed / sentence_count * 1e6:8.1f} us per sentence"
+    )
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sentences", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs, the fastest is shown")
+    args = parser.parse_args(argv)
+
+    bundled_sentences = [sentence for document in load_documents() for sentence in document if len(sentence) > 0]
+    sentences = [bundled_sentences[index % len(bundled_sentences)] for index in range(args.sentences)]
+    token_count = sum(len(sentence) for sentence in sentences)
+
+    # The interned records are shared by the whole process, so they are made before measuring.
+    interned_record_trees(sentences)
+
+    print(f"Token trees of {len(sentences)} sentences ({token_count / len(sentences):.1f} tokens each), kept:")
+    results = {}
+    for name, build in [
+        ("label strings (baseline)", label_string_trees),
+        ("a record per token", record_per_token_trees),
+        ("interned records (now)", interned_record_trees)
+    ]:
+        elapsed, memory, _ = measure(build, sentences, args.repeat)
+        results[name] = memory
+        print(format_row(name, len(sentences), elapsed, memory))
+
+    before = results["a record per token"]
+    after = results["interned records (now)"]
+    print(
+        f"  Interning: {before['retained_bytes'] / max(after['retained_bytes'], 1):.1f}x fewer bytes,"
+        f" {before['net_blocks'] / max(after['net_blocks'], 1):.1f}x fewer blocks than a record per token"
+    )
+
+    tree_list = init_noun_chunk_pipeline(strategy=5)(interned_record_trees(sentences))
+    elapsed, copy_memory, _ = measure(copy_sentences, tree_list, args.repeat)
+    print("Sentence copies of the noun chunked trees, no longer made:")
+    print(format_row("one copy", len(sentences), elapsed, copy_memory))
+    print(format_row(f"{COPIES_PER_SENTENCE} copies (allocated)", len(sentences), elapsed * COPIES_PER_SENTENCE, {
+        "retained_bytes": copy_memory["retained_bytes"] * COPIES_PER_SENTENCE,
+        "net_blocks": copy_memory["net_blocks"] * COPIES_PER_SENTENCE
+    }))
+
+    # Each pass dropped the copy before it, so at most two were alive at once.
+    elapsed, memory, _ = measure(copy_passes, tree_list, args.repeat)
+    print(f"  {COPIES_PER_SENTENCE} passes in a row: peak {memory['peak_bytes'] / len(sentences):.0f} bytes per sentence above the trees, {elapsed / len(sentences) * 1e6:.1f} us per sentence")
+
+    before_bytes = before["retained_bytes"] + copy_memory["retained_bytes"] * COPIES_PER_SENTENCE
+    before_blocks = before["net_blocks"] + copy_memory["net_blocks"] * COPIES_PER_SENTENCE
+    print(
+        f"Token trees and copies per sentence: {before_bytes / len(sentences):.0f} bytes in {before_blocks / len(sentences):.1f} blocks before,"
+        f" {after['retained_bytes'] / len(sentences):.0f} bytes in {after['net_blocks'] / len(sentences):.1f} blocks now"
+        f" ({before_bytes / max(after['retained_bytes'], 1):.1f}x and {before_blocks / max(after['net_blocks'], 1):.1f}x fewer)"
+    )
+
+if __name__ == "__main__":
+    main()
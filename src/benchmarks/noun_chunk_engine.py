@@ -0,0 +1,115 @@
+"""Check TagChunkParser against nltk's RegexpChunkParser and compare their speed.
+
+Random tagged sentences are chunked with both parsers for every noun chunk grammar.
+The NP spans (or the error, for an invalid chunk string) must be the same.
+
+Usage: py -m src.benchmarks.noun_chunk_engine --sentences 20000 --seed 0
+"""
+
+import argparse
+import random
+import sys
+import time
+
+from nltk import Tree
+from nltk.chunk import RegexpChunkParser
+
+from ..simplification.node import get_token_record
+from ..simplification.noun_chunk import get_noun_chunk_rules
+from ..simplification.tag_chunker import TagChunkParser
+
+# (UPOS, feats) pairs, weighted towards the tags the grammars look at.
+TOKEN_TAGS = [
+    ("NOUN", ""), ("NOUN", "Number=Sing"), ("NOUN", "Number=Plur"), ("NOUN", "PronType=Rel"),
+    ("PROPN", ""), ("PROPN", "Number=Sing"),
+    ("PRON", "Number=Sing|Person=3|PronType=Prs"), ("PRON", "PronType=Rel"), ("PRON", "Person=1"),
+    ("NUM", "NumType=Card"), ("NUM", "NumType=Card|Year=Yes"), ("NUM", "Year=Yes"),
+    ("DET", "PronType=Dem"), ("DET", "PronType=Ind"), ("DET", ""),
+    ("ADJ", ""), ("ADJ", "Degree=Pos"),
+    ("VERB", "Mood=Ind|Voice=Act"), ("AUX", ""), ("ADP", ""), ("CCONJ", ""), ("SCONJ", ""),
+    ("PUNCT", ""), ("ADV", ""), ("PART", "Polarity=Neg"), ("X", "")
+]
+
+def regexp_parse_noun_chunks(parser: RegexpChunkParser, tree: Tree) -> Tree:
+    # The previous implementation: chunk "<UPOS;feats>" tag strings with nltk.
+    tagged_tree = Tree(tree.label(), [(index, str(subtree.label())) for index, subtree in enumerate(tree)])
+    chunked_tagged_tree = parser.parse(tagged_tree)
+
+    spans: list[tuple[int, int]] = []
+    for piece in chunked_tagged_tree:
+        if isinstance(piece, Tree):
+            spans.append((piece[0][0], piece[-1][0] + 1))
+
+    return spans
+
+def random_sentence(rng: random.Random, length: int) -> Tree:
+    children = []
+    for index in range(length):
+        upos, feats_string = rng.choice(TOKEN_TAGS)
+        children.append(Tree(get_token_record(upos, feats_string), [f"w{index}"]))
+
+    return Tree("S", children)
+
+def chunk_outcome(chunk_spans, tree: Tree):
+    try:
+        return chunk_spans(tree)
+    except ValueError as e:
+        return f"ValueError: {e}"
+
+def check_equivalence(sentences: list[Tree], strategy: int) -> int:
+    rules = get_noun_chunk_rules(strategy=strategy)
+    regexp_parser = RegexpChunkParser(rules, chunk_label="NP")
+    tag_parser = TagChunkParser(rules, chunk_label="NP")
+
+    mismatch_count = 0
+    for tree in sentences:
+        expected = chunk_outcome(lambda t: regexp_parse_noun_chunks(regexp_parser, t), tree)
+        actual = chunk_outcome(tag_parser.chunk_spans, tree)
+        if expected != actual:
+            mismatch_count += 1
+            if mismatch_count <= 5:
+                print(f"Mismatch (strategy {strategy}): {' '.join(str(subtree.label()) for subtree in tree)}", file=sys.stderr)
+                print(f"  RegexpChunkParser: {expected}", file=sys.stderr)
+                print(f"  TagChunkParser:    {actual}", file=sys.stderr)
+
+    return mismatch_count
+
+def time_parser(chunk_spans, sentences: list[Tree]) -> float:
+    start_time = time.perf_counter()
+    for tree in sentences:
+        chunk_outcome(chunk_spans, tree)
+
+    return time.perf_counter() - start_time
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sentences", type=int, default=20000, help="random sentences per grammar")
+    parser.add_argument("--max-length", type=int, default=40, help="maximum tokens per sentence")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    sentences = [random_sentence(rng, rng.randint(1, args.max_length)) for _ in range(args.sentences)]
+    # Short sentences from a few tags hit the rule interactions (Rel nouns, years, split pronouns) often.
+    sentences += [random_sentence(rng, length) for length in range(1, 7) for _ in range(args.sentences // 20)]
+
+    failed = False
+    for strategy, grammar in [(1, "strategy 1 and 5"), (2, "strategy 2 and 3")]:
+        mismatch_count = check_equivalence(sentences, strategy)
+        print(f"Equivalence ({grammar}): {len(sentences) - mismatch_count}/{len(sentences)} sentences match")
+        failed = failed or mismatch_count > 0
+
+        rules = get_noun_chunk_rules(strategy=strategy)
+        regexp_parser = RegexpChunkParser(rules, chunk_label="NP")
+        tag_parser = TagChunkParser(rules, chunk_label="NP")
+        token_count = sum(len(tree) for tree in sentences)
+        regexp_time = time_parser(lambda t: regexp_parse_noun_chunks(regexp_parser, t), sentences)
+        tag_time = time_parser(tag_parser.chunk_spans, sentences)
+        print(f"  RegexpChunkParser: {regexp_time:.3f} s ({token_count / regexp_time:,.0f} tokens/s)")
+        print(f"  TagChunkParser:    {tag_time:.3f} s ({token_count / tag_time:,.0f} tokens/s), {regexp_time / tag_time:.1f}x faster")
+
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
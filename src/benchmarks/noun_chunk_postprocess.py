@@ -0,0 +1,229 @@
+"""Check merge_noun_chunks against the previous three-pass post-processing and time both
+on adversarial sentences.
+
+The previous passes scanned to the end of the sentence for every "NP (" without a ")" and
+rebuilt merged demonstrative NPs by prepending, so both grow quadratically with sentence length.
+
+Usage: py -m src.benchmarks.noun_chunk_postprocess --sentences 5000 --sizes 500 1000 2000 4000
+"""
+
+import argparse
+import random
+import sys
+import time
+
+from nltk import Tree
+
+from ..simplification.node import NodeRecord, get_token_record
+from ..simplification.noun_chunk import merge_noun_chunks
+
+def reference_merge_noun_chunks(tree: Tree, absorb_parentheses_and_demonstratives=False) -> Tree:
+    # The previous implementation, kept as the reference.
+    new_subtrees: list[Tree] = []
+    subtree_index = 0
+    while subtree_index < len(tree):
+        if subtree_index < len(tree) - 2 and tree[subtree_index].label().tag == "NP" and tree[subtree_index + 1].label().tag == "CCONJ" and tree[subtree_index + 2].label().tag == "NP":
+            new_subtrees.append(Tree(
+                node=tree[subtree_index].label(),
+                children=tree[subtree_index, :] + [tree[subtree_index + 1]] + tree[subtree_index + 2, :]
+            ))
+            subtree_index += 3
+        else:
+            new_subtrees.append(tree[subtree_index])
+            subtree_index += 1
+
+    tree = Tree(tree.label(), new_subtrees)
+    if not absorb_parentheses_and_demonstratives:
+        return tree
+
+    # Handle ()
+    subtree_index = 0
+    new_subtrees = []
+    while subtree_index < len(tree):
+        found = False
+        while (not found) and subtree_index < len(tree):
+            subtree = tree[subtree_index]
+            if subtree_index >= len(tree) - 1:
+                new_subtrees.append(subtree)
+                subtree_index += 1
+                continue
+
+            next_subtree = tree[subtree_index + 1]
+            if subtree.label().tag == "NP" and next_subtree.label().tag == "PUNCT" and next_subtree[0] == "(":
+                found = True
+            else:
+                new_subtrees.append(subtree)
+                subtree_index += 1
+
+        if not found:
+            continue
+
+        start_index = subtree_index
+        subtree_index += 1
+
+        found = False
+        while (not found) and subtree_index < len(tree):
+            subtree = tree[subtree_index]
+            if subtree.label().tag == "PUNCT" and subtree[0] == ")":
+                found = True
+            else:
+                subtree_index += 1
+
+        if not found:
+            subtree_index = start_index
+            subtree = tree[subtree_index]
+            new_subtrees.append(subtree)
+            subtree_index += 1
+            continue
+
+        subtree_index += 1
+        if subtree_index < len(tree) and tree[subtree_index].label().tag == "NP":
+            subtree_index += 1
+
+        stop_index = subtree_index
+
+        np_children: list[Tree] = []
+        subtree_index = start_index
+        while subtree_index < stop_index:
+            subtree = tree[subtree_index]
+            if subtree.label().tag == "NP":
+                np_children += list(subtree)
+            else:
+                np_children.append(subtree)
+
+            subtree_index += 1
+
+        new_subtrees.append(Tree(NodeRecord("NP"), np_children))
+
+    tree = Tree(tree.label(), new_subtrees)
+
+    # Akhiran demonstrative
+    start_subtree_index = 0
+    subtree_index = 0
+    new_subtrees = []
+    while subtree_index < len(tree):
+        found = False
+        while (not found) and subtree_index < len(tree):
+            subtree = tree[subtree_index]
+            if subtree.label().tag == "NP":
+                last_np_child_label = subtree[-1].label()
+                if last_np_child_label.tag == "DET" and last_np_child_label.has_feature("PronType", "Dem"):
+                    found = True
+                else:
+                    new_subtrees.append(subtree)
+                    subtree_index += 1
+            else:
+                new_subtrees.append(subtree)
+                subtree_index += 1
+
+        if found:
+            first_np_index = subtree_index
+            prev_subtree_index = subtree_index - 1
+            while prev_subtree_index >= start_subtree_index:
+                if tree[prev_subtree_index].label().tag == "NP":
+                    first_np_index = prev_subtree_index
+
+                prev_subtree_index -= 1
+
+            prev_subtree_index = subtree_index - 1
+            new_np_children: list[Tree] = list(tree[subtree_index])
+            while first_np_index <= prev_subtree_index:
+                child = new_subtrees.pop(-1)
+                if child.label().tag == "NP":
+                    new_np_children = list(child) + new_np_children
+                else:
+                    new_np_children.insert(0, child)
+
+                prev_subtree_index -= 1
+
+            new_subtrees.append(Tree(NodeRecord("NP"), new_np_children))
+            subtree_index += 1
+            start_subtree_index = subtree_index
+
+    return Tree(tree.label(), new_subtrees)
+
+def token(upos: str, text: str, feats_string="") -> Tree:
+    return Tree(get_token_record(upos, feats_string), [text])
+
+def noun_phrase(*children: Tree) -> Tree:
+    return Tree(NodeRecord("NP"), list(children))
+
+def random_piece(rng: random.Random) -> Tree:
+    choice = rng.randrange(9)
+    if choice == 0:
+        return token("PUNCT", "(")
+    elif choice == 1:
+        return token("PUNCT", ")")
+    elif choice == 2:
+        return token("CCONJ", "dan")
+    elif choice == 3:
+        return noun_phrase(token("NOUN", "rumah"), token("DET", "itu", "PronType=Dem"))
+    elif choice == 4:
+        return token("VERB", "makan")
+    elif choice == 5:
+        return token("PUNCT", ",")
+    else:
+        return noun_phrase(*[token("NOUN", "buku") for _ in range(rng.randint(1, 3))])
+
+def adversarial_sentences(size: int) -> dict[str, Tree]:
+    np_open_unmatched = []
+    for _ in range(size // 2):
+        np_open_unmatched += [noun_phrase(token("NOUN", "buku")), token("PUNCT", "(")]
+
+    demonstrative_tail = []
+    for _ in range(size - 1):
+        demonstrative_tail += [noun_phrase(token("NOUN", "buku")), token("VERB", "makan")]
+    demonstrative_tail.append(noun_phrase(token("NOUN", "rumah"), token("DET", "itu", "PronType=Dem")))
+
+    open_then_close = []
+    for _ in range(size // 2):
+        open_then_close += [noun_phrase(token("NOUN", "buku")), token("PUNCT", "(")]
+    open_then_close.append(token("PUNCT", ")"))
+
+    return {
+        "many unmatched 'NP ('": Tree("S", np_open_unmatched),
+        "long NP list ending with a demonstrative": Tree("S", demonstrative_tail),
+        "many 'NP (' closed once at the end": Tree("S", open_then_close)
+    }
+
+def timed(function, tree: Tree) -> float:
+    start_time = time.perf_counter()
+    function(tree, absorb_parentheses_and_demonstratives=True)
+    return time.perf_counter() - start_time
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sentences", type=int, default=5000, help="random sentences for the equivalence check")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 1000, 2000, 4000], help="adversarial sentence sizes")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    mismatch_count = 0
+    for _ in range(args.sentences):
+        tree = Tree("S", [random_piece(rng) for _ in range(rng.randint(1, 30))])
+        for absorb in [False, True]:
+            expected = str(reference_merge_noun_chunks(tree, absorb_parentheses_and_demonstratives=absorb))
+            actual = str(merge_noun_chunks(tree, absorb_parentheses_and_demonstratives=absorb))
+            if expected != actual:
+                mismatch_count += 1
+                if mismatch_count <= 5:
+                    print(f"Mismatch: {tree}\n  reference: {expected}\n  merge_noun_chunks: {actual}", file=sys.stderr)
+
+    print(f"Equivalence: {2 * args.sentences - mismatch_count}/{2 * args.sentences} random sentences match")
+
+    for size in args.sizes:
+        for name, tree in adversarial_sentences(size).items():
+            if str(reference_merge_noun_chunks(tree, True)) != str(merge_noun_chunks(tree, True)):
+                mismatch_count += 1
+                print(f"Mismatch on {name} ({size})", file=sys.stderr)
+
+            reference_time = timed(reference_merge_noun_chunks, tree)
+            new_time = timed(merge_noun_chunks, tree)
+            print(f"{name:<42} {len(tree):>6} subtrees: previous {reference_time * 1000:9.2f} ms, merge_noun_chunks {new_time * 1000:7.2f} ms")
+
+    if mismatch_count > 0:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""Time every stage after Stanza on generated documents of growing size, fit how its time grows,
+and fail if a stage grows faster than its complexity budget.
+
+Two sizes are swept: the number of sentences of a document (of about 20 tokens each), and the
+number of tokens per sentence (of a document of 5 sentences). For each stage, the exponent k of
+time ~ size^k is fitted on the smallest time of --repeat runs per size, with the garbage
+collector paused during a run. A budget of 1.3 allows linear growth and some noise; quadratic
+growth fits an exponent near 2. The shape of the documents (NP density, commas, relative pronouns,
+conjunctions) can be changed, see src.benchmarks.document_generator.
+
+Usage: py -m src.benchmarks.scaling [--strategy 5] [--max-sentence-distance 20] [--budget tokens:clause_boundary=1.8]
+"""
+
+import argparse
+import gc
+import logging
+import math
+import random
+import sys
+import time
+
+from ..simplification.tagged_sentence import tagged_sentences_to_tree_list
+from .document_generator import make_tagged_document
+from .suite import init_stages
+
+AXES = {
+    "sentences": [50, 100, 200, 400, 800],
+    "tokens": [25, 50, 100, 200, 400]
+}
+
+DEFAULT_BUDGET = 1.3
+
+# Stages with a term quadratic in sentence length, which the default sizes fit at 1.0 to 1.6. A
+# pronoun or relative pronoun looks at the NPs before it in its sentence. Every clause that clause
+# boundary detection extracts rebuilds the sentence tree and so its SentenceIndex, and every split
+# of transform looks for its clause from the start of the sentence and copies the rest of it. The
+# number of pronouns and clauses grows with the length, so on much longer sentences (1600 tokens)
+# these exponents approach 2.
+DEFAULT_BUDGETS = {
+    ("tokens", "pronoun_resolution"): 1.6,
+    ("tokens", "relative_clause_attachment"): 1.6,
+    ("tokens", "clause_boundary"): 1.7,
+    ("tokens", "transform"): 1.7
+}
+
+# Without an eviction policy, a pronoun may look at every earlier antecedent of the document.
+UNBOUNDED_ANTECEDENT_BUDGETS = {
+    ("sentences", "pronoun_resolution"): 2.2
+}
+
+def make_axis_document(rng: random.Random, axis: str, size: int, shape: dict) -> list[list[tuple[str, str, str]]]:
+    if axis == "sentences":
+        return make_tagged_document(rng, size, tokens_per_sentence=20, **shape)
+
+    return make_tagged_document(rng, 5, tokens_per_sentence=size, **shape)
+
+def time_stages(tagged_document: list[list[tuple[str, str, str]]], strategy: int, max_sentence_distance: int | None = None) -> dict[str, float]:
+    stage_seconds: dict[str, float] = {}
+    result = tagged_sentences_to_tree_list(tagged_document, strategy=strategy)
+    for stage, process in init_stages(strategy, max_sentence_distance=max_sentence_distance):
+        start_time = time.perf_counter()
+        result = process(result)
+        stage_seconds[stage] = time.perf_counter() - start_time
+
+    return stage_seconds
+
+def fit_exponent(sizes: list[int], seconds: list[float]) -> float:
+    # Least squares slope of log(seconds) against log(size)
+    xs = [math.log(size) for size in sizes]
+    ys = [math.log(max(value, 1e-9)) for value in seconds]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    covariance = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    variance = sum((x - mean_x) ** 2 for x in xs)
+    return covariance / variance
+
+def sweep(axis: str, sizes: list[int], strategy: int, repeat: int, seed: int, shape: dict, max_sentence_distance: int | None = None) -> dict[str, list[float]]:
+    # Stage -> smallest time at each size
+    stage_seconds: dict[str, list[float]] = {}
+    for size in sizes:
+        tagged_document = make_axis_document(random.Random(seed), axis, size, shape)
+        best_seconds: dict[str, float] = {}
+        for _ in range(repeat):
+            # A full collection landing in one stage of one size would distort the fit, so the
+            # garbage is collected between runs instead.
+            gc.collect()
+            gc.disable()
+            try:
+                run_seconds = time_stages(tagged_document, strategy, max_sentence_distance=max_sentence_distance)
+            finally:
+                gc.enable()
+
+            for stage, seconds in run_seconds.items():
+                best_seconds[stage] = min(seconds, best_seconds.get(stage, math.inf))
+
+        for stage, seconds in best_seconds.items():
+            stage_seconds.setdefault(stage, []).append(seconds)
+
+    return stage_seconds
+
+def parse_budget(value: str) -> tuple[tuple[str, str], float]:
+    key, separator, exponent = value.partition("=")
+    axis, colon, stage = key.partition(":")
+    if separator == "" or colon == "" or axis not in AXES:
+        raise argparse.ArgumentTypeError(f"expected AXIS:STAGE=EXPONENT with AXIS one of {', '.join(AXES)}, got {value!r}")
+
+    try:
+        return ((axis, stage), float(exponent))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a number after '=', got {exponent!r}")
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--strategy", type=int, default=5)
+    parser.add_argument("--axes", nargs="+", choices=list(AXES), default=list(AXES))
+    parser.add_argument("--sentence-sizes", type=int, nargs="+", default=AXES["sentences"], help="sentences per document")
+    parser.add_argument("--token-sizes", type=int, nargs="+", default=AXES["tokens"], help="tokens per sentence")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per size; the smallest time is used")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-sentence-distance", type=int, help="eviction policy of the coreference stages (see SalienceStore)")
+    parser.add_argument("--np-density", type=float, default=0.5)
+    parser.add_argument("--comma-rate", type=float, default=0.1)
+    parser.add_argument("--relative-pronoun-rate", type=float, default=0.05)
+    parser.add_argument("--conjunction-rate", type=float, default=0.05)
+    parser.add_argument("--default-budget", type=float, default=DEFAULT_BUDGET, help="largest exponent allowed where no budget is set")
+    parser.add_argument("--budget", type=parse_budget, action="append", default=[], metavar="AXIS:STAGE=EXPONENT", help="largest exponent allowed for one stage")
+    args = parser.parse_args(argv)
+
+    logging.getLogger().setLevel(logging.WARNING)
+    budgets = dict(DEFAULT_BUDGETS)
+    if args.max_sentence_distance is None:
+        budgets.update(UNBOUNDED_ANTECEDENT_BUDGETS)
+
+    budgets.update(args.budget)
+    shape = {
+        "np_density": args.np_density,
+        "comma_rate": args.comma_rate,
+        "relative_pronoun_rate": args.relative_pronoun_rate,
+        "conjunction_rate": args.conjunction_rate
+    }
+    axis_sizes = {"sentences": args.sentence_sizes, "tokens": args.token_sizes}
+
+    over_budget_count = 0
+    for axis in args.axes:
+        sizes = axis_sizes[axis]
+        stage_seconds = sweep(axis, sizes, args.strategy, args.repeat, args.seed, shape, max_sentence_distance=args.max_sentence_distance)
+        print(f"{axis:<27}" + "".join(f" {size:>9}" for size in sizes) + f" {'exponent':>9} {'budget':>7}")
+        for stage, seconds in stage_seconds.items():
+            exponent = fit_exponent(sizes, seconds)
+            budget = budgets.get((axis, stage), args.default_budget)
+            is_over_budget = exponent > budget
+            if is_over_budget:
+                over_budget_count += 1
+
+            print(
+                f"  {stage:<25}" + "".join(f" {value * 1000:7.2f}ms" for value in seconds)
+                + f" {exponent:9.2f} {budget:7.2f}" + (" OVER BUDGET" if is_over_budget else "")
+            )
+
+    if over_budget_count > 0:
+        print(f"{over_budget_count} stage(s) grow faster than their budget")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
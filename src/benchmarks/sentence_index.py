@@ -0,0 +1,216 @@
+"""Check SentenceIndex against the token-by-token scans it replaces and time both, then time clause
+boundary detection on long sentences.
+
+The sentences are built from a small tagged lexicon, so Stanza is not needed.
+
+Usage: py -m src.benchmarks.sentence_index --lengths 20 100 500 2000
+"""
+
+import argparse
+import logging
+import random
+import sys
+import time
+
+from nltk import Tree
+
+from ..simplification.agreement import extract_agreements_from_head_noun
+from ..simplification.clause_boundary import extract_boundaries, is_valid_conjunction
+from ..simplification.grammatical_function import extract_grammatical_function, is_subject
+from ..simplification.node import NodeRecord, get_token_record
+from ..simplification.noun_chunk import init_noun_chunk_pipeline
+from ..simplification.sentence_index import (
+    COMMA,
+    NP_OR_RELATIVE,
+    PERIOD,
+    RELATIVE_PRONOUN,
+    SUBJECT,
+    VALID_CONJUNCTION,
+    SentenceIndex,
+    lowercase_word_kind,
+    not_tag_kind,
+    not_word_kind,
+    tag_kind,
+    word_kind
+)
+
+LEXICON = [
+    ("presiden", "NOUN", "Number=Sing"),
+    ("warga", "NOUN", "Number=Sing"),
+    ("rumah", "NOUN", "Number=Sing"),
+    ("Jakarta", "PROPN", ""),
+    ("Budi", "PROPN", ""),
+    ("dia", "PRON", "Number=Sing|Person=3|PronType=Prs"),
+    ("dirinya", "PRON", "Number=Sing|Person=3|PronType=Prs|Reflex=Yes"),
+    ("yang", "PRON", "PronType=Rel"),
+    ("membeli", "VERB", ""),
+    ("mengatakan", "VERB", ""),
+    ("besar", "ADJ", ""),
+    ("sangat", "ADV", ""),
+    ("di", "ADP", ""),
+    ("dan", "CCONJ", ""),
+    ("karena", "SCONJ", ""),
+    ("bahwa", "SCONJ", ""),
+    ("untuk", "SCONJ", ""),
+    ("itu", "DET", "PronType=Dem"),
+    ("dua", "NUM", ""),
+    (",", "PUNCT", ""),
+    (":", "PUNCT", ""),
+    (".", "PUNCT", "")
+]
+
+CLAUSES = [
+    "presiden membeli rumah di Jakarta",
+    "warga yang membeli rumah itu mengatakan bahwa dia sangat besar",
+    "Budi , warga Jakarta , membeli dua rumah",
+    "dia membeli rumah untuk dirinya",
+    "karena warga membeli rumah , presiden mengatakan bahwa rumah itu besar"
+]
+
+TAGS = {word: (upos, feats_string) for word, upos, feats_string in LEXICON}
+
+def make_sentence(words: list[str]) -> Tree:
+    # Through the stages before clause boundary detection, in the order of the pipeline
+    tree = Tree(NodeRecord("S", sentence_id="0"), [Tree(get_token_record(*TAGS[word]), [word]) for word in words])
+    tree_list = init_noun_chunk_pipeline(strategy=3)([tree])
+    tree_list = extract_grammatical_function(tree_list, strategy=5)
+    return extract_agreements_from_head_noun(tree_list)[0]
+
+def random_sentence(rng: random.Random, length: int) -> Tree:
+    return make_sentence([rng.choice(LEXICON)[0] for _ in range(length)] + ["."])
+
+def news_sentence(rng: random.Random, length: int) -> Tree:
+    # Clauses joined by commas, conjunctions and relative pronouns, like a long news sentence.
+    words = CLAUSES[0].split(" ")
+    while len(words) < length:
+        words += rng.choice([[","], [",", "dan"], ["yang"], ["karena"]]) + rng.choice(CLAUSES).split(" ")
+
+    return make_sentence(words + ["."])
+
+def scan_matches(kind: tuple, subtree: Tree) -> bool:
+    # The checks the scans in clause_boundary.py and resolve_third_person_pronouns.py used to do.
+    name, value = kind
+    label = subtree.label()
+    word = subtree[0] if isinstance(subtree[0], str) else None
+    if name == "tag":
+        return label.tag in value
+    elif name == "not_tag":
+        return label.tag not in value
+    elif name == "word":
+        return word in value
+    elif name == "not_word":
+        return word not in value
+    elif name == "lowercase_word":
+        return word is not None and word.lower() in value
+    elif name == "subject":
+        return is_subject(subtree)
+    elif name == "relative_pronoun":
+        return label.tag == "PRON" and label.has_feature("PronType", "Rel")
+    elif name == "np_or_relative":
+        return label.tag == "NP" or label.has_feature("PronType", "Rel")
+    else:
+        return is_valid_conjunction(subtree)
+
+def scan_next(tree: Tree, kind: tuple, index: int) -> int:
+    while index < len(tree) and not scan_matches(kind, tree[index]):
+        index += 1
+
+    return index
+
+def scan_previous(tree: Tree, kind: tuple, index: int) -> int:
+    index -= 1
+    while index >= 0 and not scan_matches(kind, tree[index]):
+        index -= 1
+
+    return index
+
+KINDS = [
+    SUBJECT,
+    RELATIVE_PRONOUN,
+    VALID_CONJUNCTION,
+    NP_OR_RELATIVE,
+    COMMA,
+    PERIOD,
+    tag_kind("VERB"),
+    tag_kind("NP"),
+    tag_kind("VERB", "ADJ"),
+    not_tag_kind("VERB"),
+    word_kind(",", ":", ";"),
+    not_word_kind(","),
+    lowercase_word_kind("bahwa", "karena")
+]
+
+def check(rng: random.Random, count: int) -> int:
+    mismatch_count = 0
+    for _ in range(count):
+        tree = random_sentence(rng, rng.randint(1, 60))
+        sentence_index = SentenceIndex(tree)
+        for kind in KINDS:
+            for index in range(len(tree) + 1):
+                if sentence_index.next(kind, index) != scan_next(tree, kind, index):
+                    mismatch_count += 1
+
+                if sentence_index.previous(kind, index) != scan_previous(tree, kind, index):
+                    mismatch_count += 1
+
+    return mismatch_count
+
+def time_lookups(tree: Tree) -> tuple[float, float]:
+    # From every position: the next verb, NP and comma, and the previous subject.
+    kinds = [tag_kind("VERB"), tag_kind("NP"), COMMA]
+
+    start_time = time.perf_counter()
+    for index in range(len(tree)):
+        for kind in kinds:
+            scan_next(tree, kind, index)
+
+        scan_previous(tree, SUBJECT, index)
+
+    scan_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    sentence_index = SentenceIndex(tree)
+    for index in range(len(tree)):
+        for kind in kinds:
+            sentence_index.next(kind, index)
+
+        sentence_index.previous(SUBJECT, index)
+
+    index_time = time.perf_counter() - start_time
+    return (scan_time, index_time)
+
+def time_boundaries(tree: Tree) -> float:
+    start_time = time.perf_counter()
+    extract_boundaries([tree], strategy=5)
+    return time.perf_counter() - start_time
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lengths", type=int, nargs="+", default=[20, 100, 500, 2000], help="tokens per sentence")
+    parser.add_argument("--checks", type=int, default=300, help="random sentences to check")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    # Clause boundary detection logs every step; keep it out of the output.
+    logging.disable(logging.CRITICAL)
+
+    rng = random.Random(args.seed)
+    mismatch_count = check(rng, args.checks)
+    print(f"Checked {args.checks} random sentences: {mismatch_count} mismatches")
+
+    print("All lookups from every position (next VERB, NP, comma; previous subject):")
+    for length in args.lengths:
+        scan_time, index_time = time_lookups(news_sentence(rng, length))
+        print(f"  {length:>5} tokens: scans {scan_time * 1000:9.2f} ms, SentenceIndex {index_time * 1000:7.2f} ms ({scan_time / index_time:6.1f}x)")
+
+    print("extract_boundaries:")
+    for length in args.lengths:
+        news_time = time_boundaries(news_sentence(rng, length))
+        repeated_relative_clause_time = time_boundaries(make_sentence(["rumah", "yang", "besar"] * (length // 3) + ["."]))
+        print(f"  {length:>5} tokens: news-like {news_time * 1000:8.2f} ms, relative pronouns without a verb {repeated_relative_clause_time * 1000:8.2f} ms")
+
+    if mismatch_count > 0:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Time the imports and the first documents of TextSimplifier in fresh interpreters, and fail if
+an import pulls in Stanza or torch (or NLTK, for src.utils) before they are needed.
+
+Every measurement runs in a new process, so nothing is imported or loaded already. With Stanza
+installed and its Indonesian models downloaded, the latency of the first and second documents is
+measured as well: loading the models on the first document, loading them in the constructor, and
+after warmup().
+
+Usage: py -m src.benchmarks.startup [--max-import-seconds 1]
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+
+REPOSITORY_DIRECTORY = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+HEAVY_MODULES = ["nltk", "stanza", "torch"]
+
+# Module -> heavy modules its import must not import
+IMPORT_CHECKS = {
+    "src.utils": ["nltk", "stanza", "torch"],
+    "src.simplification.stanza_pipeline": ["stanza", "torch"],
+    "src.indo_ts": ["stanza", "torch"]
+}
+
+TEXT = "Presiden Joko Widodo, yang lahir di Surakarta, meresmikan jalan tol baru di Jawa Tengah."
+
+IMPORT_SCRIPT = """
+import importlib, json, sys, time
+start_time = time.perf_counter()
+importlib.import_module({module!r})
+print(json.dumps({{"seconds": time.perf_counter() - start_time, "imported": [name for name in {heavy_modules!r} if name in sys.modules]}}))
+"""
+
+CONSTRUCT_SCRIPT = """
+import contextlib, io, json, sys, time
+from src.indo_ts import TextSimplifier
+start_time = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    TextSimplifier(strategy=5)
+print(json.dumps({{"seconds": time.perf_counter() - start_time, "imported": [name for name in {heavy_modules!r} if name in sys.modules]}}))
+"""
+
+FIRST_DOCUMENTS_SCRIPT = """
+import contextlib, io, json, time
+from src.indo_ts import TextSimplifier
+start_time = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    simplifier = TextSimplifier(strategy=5, load_stanza={load_stanza!r})
+    if {warmup!r}:
+        simplifier.warmup()
+
+ready_seconds = time.perf_counter() - start_time
+document_seconds = []
+for _ in range(2):
+    start_time = time.perf_counter()
+    simplifier.simplify({text!r})
+    document_seconds.append(time.perf_counter() - start_time)
+
+print(json.dumps({{"ready_seconds": ready_seconds, "first_seconds": document_seconds[0], "second_seconds": document_seconds[1]}}))
+"""
+
+FIRST_DOCUMENT_MODES = [
+    ("load on first document", "lazy", False),
+    ("load in constructor", "eager", False),
+    ("load and warmup()", "eager", True)
+]
+
+def run_script(script: str) -> dict:
+    completed = subprocess.run([sys.executable, "-c", script], cwd=REPOSITORY_DIRECTORY, capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout.splitlines()[-1])
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--max-import-seconds", type=float, default=1.0, help="longest import of src.indo_ts allowed")
+    args = parser.parse_args(argv)
+
+    failure_count = 0
+    for module, forbidden_modules in IMPORT_CHECKS.items():
+        result = run_script(IMPORT_SCRIPT.format(module=module, heavy_modules=HEAVY_MODULES))
+        print(f"import {module:<36} {result['seconds'] * 1000:8.1f} ms, imports {', '.join(result['imported']) or 'none of ' + ', '.join(HEAVY_MODULES)}")
+        imported_forbidden_modules = [name for name in result["imported"] if name in forbidden_modules]
+        if len(imported_forbidden_modules) > 0:
+            print(f"  {module} must not import {', '.join(imported_forbidden_modules)}")
+            failure_count += 1
+
+        if module == "src.indo_ts" and result["seconds"] > args.max_import_seconds:
+            print(f"  longer than {args.max_import_seconds} s")
+            failure_count += 1
+
+    result = run_script(CONSTRUCT_SCRIPT.format(heavy_modules=HEAVY_MODULES))
+    print(f"{'TextSimplifier()':<43} {result['seconds'] * 1000:8.1f} ms")
+    if "stanza" in result["imported"] or "torch" in result["imported"]:
+        print("  TextSimplifier() must not import Stanza before the first document")
+        failure_count += 1
+
+    if importlib.util.find_spec("stanza") is None:
+        print("Stanza is not installed: the first documents are not timed")
+    else:
+        for name, load_stanza, warmup in FIRST_DOCUMENT_MODES:
+            result = run_script(FIRST_DOCUMENTS_SCRIPT.format(load_stanza=load_stanza, warmup=warmup, text=TEXT))
+            print(
+                f"{name:<24} ready {result['ready_seconds'] * 1000:8.1f} ms, first document {result['first_seconds'] * 1000:8.1f} ms,"
+                f" second document {result['second_seconds'] * 1000:8.1f} ms"
+            )
+
+    if failure_count > 0:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""Time every stage after Stanza on bundled tagged documents, for strategies 1, 2, 3 and 5, and
+check the output of every stage against stored golden results.
+
+The documents in data/tagged_documents.json are synthetic news-style Indonesian sentences, tagged
+the way Stanza tags them, so neither Stanza nor a model download is needed. For each repetition,
+the trees are built again from the tags and every stage is timed on its own while the documents go
+through the whole chain. The golden results (data/golden.json) are a hash of each stage's output
+and the simplified sentences; regenerate them with --update-golden only when a change of output is
+intended.
+
+Usage: py -m src.benchmarks.suite --repeat 20 --output results.json [--compare previous.json]
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from collections.abc import Callable
+
+from nltk import Tree
+
+from ..metrics import STAGES
+from ..simplification.agreement import init_agreement_pipeline
+from ..simplification.clause_boundary import extract_boundaries
+from ..simplification.grammatical_function import extract_grammatical_function
+from ..simplification.noun_chunk import init_noun_chunk_pipeline
+from ..simplification.relative_clause_attachment import relative_clause_attachment
+from ..simplification.resolve_third_person_pronouns import init_third_person_pronouns_pipeline
+from ..simplification.tagged_sentence import tagged_sentences_to_tree_list
+from ..simplification.transform import transform
+from ..utils import word_lists_to_sentences
+
+DATA_DIRECTORY = os.path.join(os.path.dirname(__file__), "data")
+DOCUMENTS_FILE = os.path.join(DATA_DIRECTORY, "tagged_documents.json")
+GOLDEN_FILE = os.path.join(DATA_DIRECTORY, "golden.json")
+STRATEGIES = [1, 2, 3, 5]
+
+def load_documents(file_path: str = DOCUMENTS_FILE) -> list[list[list[tuple[str, str, str]]]]:
+    with open(file_path, mode="r", encoding="utf-8") as file:
+        return [
+            [[tuple(token) for token in sentence] for sentence in document]
+            for document in json.load(file)["documents"]
+        ]
+
+def init_stages(strategy: int, max_sentence_distance: int | None = None) -> list[tuple[str, Callable]]:
+    # The stages of TextSimplifier after Stanza, named as in src.metrics.
+    noun_chunk_pipeline = init_noun_chunk_pipeline(strategy=strategy)
+    agreement_pipeline = init_agreement_pipeline()
+    third_person_pronouns_pipeline = init_third_person_pronouns_pipeline(strategy=strategy, max_sentence_distance=max_sentence_distance)
+    return [
+        ("noun_chunk", noun_chunk_pipeline),
+        ("grammatical_function", lambda tree_list: extract_grammatical_function(tree_list, strategy=strategy)),
+        ("agreement", agreement_pipeline),
+        ("pronoun_resolution", third_person_pronouns_pipeline),
+        ("relative_clause_attachment", lambda tree_list: relative_clause_attachment(tree_list, max_sentence_distance=max_sentence_distance)),
+        ("clause_boundary", lambda tree_list: extract_boundaries(tree_list, strategy=strategy)),
+        ("transform", lambda tree_list: transform(tree_list, strategy=strategy)),
+        ("detokenization", lambda tree_list: word_lists_to_sentences([tree.leaves() for tree in tree_list]))
+    ]
+
+def serialize(value) -> str:
+    if isinstance(value, Tree):
+        return "(" + str(value.label()) + " " + " ".join(serialize(child) for child in value) + ")"
+
+    return str(value)
+
+def run_strategy(documents: list[list[list[tuple[str, str, str]]]], strategy: int) -> tuple[dict[str, float], dict[str, str], list[list[str]]]:
+    """Returns the seconds spent in each stage, a hash of each stage's output, and the simplified
+    sentences of each document."""
+    stages = init_stages(strategy)
+    stage_seconds = {stage: 0.0 for stage, _ in stages}
+    stage_hashes = {stage: hashlib.sha256() for stage, _ in stages}
+    simplified_documents: list[list[str]] = []
+    for document in documents:
+        result = tagged_sentences_to_tree_list(document, strategy=strategy)
+        for stage, process in stages:
+            start_time = time.perf_counter()
+            result = process(result)
+            stage_seconds[stage] += time.perf_counter() - start_time
+            for item in result:
+                stage_hashes[stage].update(serialize(item).encode("utf-8"))
+                stage_hashes[stage].update(b"\n")
+
+        simplified_documents.append(result)
+
+    return (stage_seconds, {stage: stage_hash.hexdigest() for stage, stage_hash in stage_hashes.items()}, simplified_documents)
+
+def run_suite(documents: list[list[list[tuple[str, str, str]]]], repeat: int) -> tuple[dict, dict]:
+    results = {}
+    golden = {}
+    for strategy in STRATEGIES:
+        samples: dict[str, list[float]] = {}
+        for _ in range(repeat):
+            stage_seconds, stage_hashes, simplified_documents = run_strategy(documents, strategy)
+            for stage, seconds in stage_seconds.items():
+                samples.setdefault(stage, []).append(seconds)
+
+        results[str(strategy)] = {
+            stage: {"min_seconds": min(stage_samples), "median_seconds": statistics.median(stage_samples)}
+            for stage, stage_samples in samples.items()
+        }
+        golden[str(strategy)] = {"stage_hashes": stage_hashes, "simplified": simplified_documents}
+
+    return (results, golden)
+
+def check_golden(golden: dict, expected_golden: dict) -> list[str]:
+    problems: list[str] = []
+    for strategy, expected in expected_golden.items():
+        actual = golden.get(strategy)
+        if actual is None:
+            problems.append(f"strategy {strategy}: not run")
+            continue
+
+        # The first stage that differs is where to look; the later ones differ because of it.
+        for stage in sorted(expected["stage_hashes"], key=STAGES.index):
+            if actual["stage_hashes"].get(stage) != expected["stage_hashes"][stage]:
+                problems.append(f"strategy {strategy}: output of {stage} differs from the golden result")
+                break
+
+        for index, (sentences, expected_sentences) in enumerate(zip(actual["simplified"], expected["simplified"])):
+            if sentences != expected_sentences:
+                problems.append(f"strategy {strategy}, document {index}: {sentences} != {expected_sentences}")
+
+    return problems
+
+def get_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(__file__), capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_results(results: dict, previous_results: dict | None = None):
+    header = f"{'strategy':>8} {'stage':<27} {'min ms':>9} {'median ms':>10}"
+    if previous_results is not None:
+        header += f" {'before ms':>10} {'speedup':>8}"
+
+    print(header)
+    for strategy, stages in results.items():
+        for stage, timing in stages.items():
+            line = f"{strategy:>8} {stage:<27} {timing['min_seconds'] * 1000:9.3f} {timing['median_seconds'] * 1000:10.3f}"
+            if previous_results is not None:
+                previous_timing = previous_results.get(strategy, {}).get(stage)
+                if previous_timing is None:
+                    line += f" {'-':>10} {'-':>8}"
+                else:
+                    speedup = previous_timing["median_seconds"] / timing["median_seconds"] if timing["median_seconds"] > 0 else float("inf")
+                    line += f" {previous_timing['median_seconds'] * 1000:10.3f} {speedup:7.2f}x"
+
+            print(line)
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20, help="runs per strategy; the min and median are reported")
+    parser.add_argument("--output", help="write the timings to this JSON file")
+    parser.add_argument("--compare", help="timings written by an earlier run (e.g. of another commit)")
+    parser.add_argument("--update-golden", action="store_true", help="store the current output as the golden results")
+    args = parser.parse_args(argv)
+
+    logging.getLogger().setLevel(logging.WARNING)
+    documents = load_documents()
+    results, golden = run_suite(documents, args.repeat)
+
+    previous_results = None
+    if args.compare is not None:
+        with open(args.compare, mode="r", encoding="utf-8") as file:
+            previous_results = json.load(file)["results"]
+
+    print(f"{len(documents)} documents, {sum(len(document) for document in documents)} sentences, {sum(len(sentence) for document in documents for sentence in document)} tokens")
+    print_results(results, previous_results)
+
+    if args.update_golden:
+        with open(GOLDEN_FILE, mode="w", encoding="utf-8") as file:
+            json.dump(golden, file, ensure_ascii=False, indent=1)
+            file.write("\n")
+
+        print(f"Golden results written to {GOLDEN_FILE}")
+        problems = []
+    else:
+        with open(GOLDEN_FILE, mode="r", encoding="utf-8") as file:
+            problems = check_golden(golden, json.load(file))
+
+        for problem in problems:
+            print(problem)
+
+        print("Output matches the golden results" if len(problems) == 0 else f"{len(problems)} differences from the golden results")
+
+    if args.output is not None:
+        with open(args.output, mode="w", encoding="utf-8") as file:
+            json.dump({
+                "commit": get_commit(),
+                "python": platform.python_version(),
+                "repeat": args.repeat,
+                "golden_match": len(problems) == 0,
+                "results": results
+            }, file, indent=1)
+            file.write("\n")
+
+    if len(problems) > 0:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
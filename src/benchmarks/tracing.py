@@ -0,0 +1,66 @@
+"""Time the rule stages with logging off, with a decision trace, and with DEBUG logging, and check
+that tracing does not change the output.
+
+Usage: py -m src.benchmarks.tracing --sizes 10 100 300
+"""
+
+import argparse
+import logging
+import random
+import sys
+import time
+
+from nltk import Tree
+
+from ..simplification.clause_boundary import extract_boundaries
+from ..simplification.relative_clause_attachment import relative_clause_attachment
+from ..simplification.resolve_third_person_pronouns import init_third_person_pronouns_pipeline
+from ..simplification.trace import trace_decisions
+from ..simplification.transform import transform
+from .appositive_boundary import make_document
+
+def run(tree_list: list[Tree]) -> tuple[list[str], float]:
+    start_time = time.perf_counter()
+    tree_list = init_third_person_pronouns_pipeline(strategy=5)(tree_list)
+    tree_list = relative_clause_attachment(tree_list)
+    tree_list = extract_boundaries(tree_list, strategy=5)
+    tree_list = transform(tree_list, strategy=5)
+    elapsed_time = time.perf_counter() - start_time
+    return ([str(tree) for tree in tree_list], elapsed_time)
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 300], help="sentences per document")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    # DEBUG records go to a handler that drops them, so only formatting them is timed.
+    root_logger = logging.getLogger()
+    root_logger.addHandler(logging.NullHandler())
+
+    mismatch_count = 0
+    for size in args.sizes:
+        root_logger.setLevel(logging.WARNING)
+        output, plain_time = run(make_document(random.Random(args.seed), size))
+
+        with trace_decisions() as decisions:
+            traced_output, traced_time = run(make_document(random.Random(args.seed), size))
+
+        root_logger.setLevel(logging.DEBUG)
+        logged_output, logged_time = run(make_document(random.Random(args.seed), size))
+        root_logger.setLevel(logging.WARNING)
+
+        if traced_output != output or logged_output != output:
+            mismatch_count += 1
+
+        print(
+            f"{size:>5} sentences: WARNING {plain_time * 1000:8.2f} ms, decision trace {traced_time * 1000:8.2f} ms"
+            f" ({len(decisions)} decisions), DEBUG {logged_time * 1000:9.2f} ms,"
+            f" {'same' if traced_output == output and logged_output == output else 'DIFFERENT'} output"
+        )
+
+    if mismatch_count > 0:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
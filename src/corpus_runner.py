@@ -0,0 +1,254 @@
+"""Simplify a corpus with a pool of worker processes.
+
+Input is a JSON lines file. Each line is either a document string or an object
+with a "document" field (and optionally an "id" field). With --tokenize-pretokenized,
+a document is a list of sentences, each a list of words. With --conllu, input is a
+CoNLL-U file of documents tagged already, and Stanza is never loaded. Output is a JSON
+lines file in the same order, with either a "result" or an "error" for each document.
+
+Usage: py -m src.corpus_runner input.jsonl output.jsonl --workers 4 --chunksize 8
+       py -m src.corpus_runner input.conllu output.jsonl --conllu
+"""
+
+import argparse
+import collections
+import concurrent.futures
+import json
+import logging
+import multiprocessing
+import sys
+import time
+from collections.abc import Iterable, Iterator
+from concurrent.futures.process import BrokenProcessPool
+
+from .indo_ts import Document, TextSimplifier
+from .simplification.conllu import read_conllu_documents
+from .simplification.tag_cache import TagCache
+from .logging_config import DroppingQueueHandler, add_logging_arguments, configure_logging_from_args, install_queue_handler
+
+_worker_simplifier: TextSimplifier | None = None
+
+def init_worker(tokenize_no_ssplit=False, strategy=1, place_time_lexicon_path=None, title_lexicon_path=None, max_sentence_distance=None, min_salience=None, log_options=None, stanza_cache_dir=None, tokenize_pretokenized=False, pretagged=False):
+    # Runs once per worker process, so Stanza and the rule pipelines are loaded once and stay warm.
+    # log_options (see get_worker_log_options) make the worker log through the parent's queue.
+    global _worker_simplifier
+    if log_options is not None:
+        log_queue, dropped, level, module_levels = log_options
+        install_queue_handler(log_queue, dropped=dropped, level=level, module_levels=module_levels)
+
+    _worker_simplifier = TextSimplifier(
+        tokenize_no_ssplit=tokenize_no_ssplit,
+        strategy=strategy,
+        place_time_lexicon_path=place_time_lexicon_path,
+        title_lexicon_path=title_lexicon_path,
+        max_sentence_distance=max_sentence_distance,
+        min_salience=min_salience,
+        stanza_cache_dir=stanza_cache_dir,
+        tokenize_pretokenized=tokenize_pretokenized,
+        pretagged=pretagged
+    )
+
+def simplify_chunk(chunk: list[tuple[int, Document]]) -> list[tuple[int, list[list[str]] | None, str | None]]:
+    indices = [index for index, _ in chunk]
+    documents = [document for _, document in chunk]
+
+    outcomes: list[tuple[int, list[list[str]] | None, str | None]] = []
+    results = _worker_simplifier.simplify_batch(documents, batch_size=len(documents), return_exceptions=True)
+    for index, result in zip(indices, results):
+        if isinstance(result, Exception):
+            outcomes.append((index, None, f"{type(result).__name__}: {result}"))
+        else:
+            outcomes.append((index, result, None))
+
+    return outcomes
+
+def get_worker_log_options(log_handler: DroppingQueueHandler) -> tuple:
+    # The queue and dropped counter of the handler, and the levels set in this process.
+    module_levels = {
+        name: logging.getLevelName(logger.level)
+        for name, logger in logging.root.manager.loggerDict.items()
+        if isinstance(logger, logging.Logger) and logger.level != logging.NOTSET
+    }
+    return (log_handler.queue, log_handler.dropped, logging.getLevelName(logging.getLogger().level), module_levels)
+
+def chunked(documents: Iterable[Document], chunksize: int) -> Iterator[list[tuple[int, Document]]]:
+    chunk: list[tuple[int, Document]] = []
+    for index, document in enumerate(documents):
+        chunk.append((index, document))
+        if len(chunk) == chunksize:
+            yield chunk
+            chunk = []
+
+    if len(chunk) > 0:
+        yield chunk
+
+def run_corpus(
+    documents: Iterable[Document],
+    workers=1,
+    chunksize=8,
+    tokenize_no_ssplit=False,
+    strategy=1,
+    place_time_lexicon_path=None,
+    title_lexicon_path=None,
+    max_sentence_distance=None,
+    min_salience=None,
+    log_handler: DroppingQueueHandler | None = None,
+    stanza_cache_dir=None,
+    tokenize_pretokenized=False,
+    pretagged=False
+) -> Iterator[tuple[int, list[list[str]] | None, str | None]]:
+    """Yield (index, result, error) for every document, in input order.
+
+    Exactly one of `result` and `error` is None. A failing document never stops the run, but a
+    worker process that dies (killed for memory, or crashed in native code) raises
+    BrokenProcessPool instead of leaving the run waiting forever.
+    With `log_handler` (from configure_logging with multiprocess=True), the workers log through
+    its queue. With `stanza_cache_dir`, the workers share a cache of Stanza tags there. With
+    `pretagged`, the documents are tagged already (see TextSimplifier) and Stanza is not loaded.
+    """
+    if workers < 1:
+        raise ValueError("workers must be at least 1")
+
+    if chunksize < 1:
+        raise ValueError("chunksize must be at least 1")
+
+    executor = concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=init_worker,
+        initargs=(
+            tokenize_no_ssplit,
+            strategy,
+            place_time_lexicon_path,
+            title_lexicon_path,
+            max_sentence_distance,
+            min_salience,
+            get_worker_log_options(log_handler) if log_handler is not None else None,
+            stanza_cache_dir,
+            tokenize_pretokenized,
+            pretagged
+        )
+    )
+    # Chunks are submitted as results are taken, so a long corpus is not read into memory at once;
+    # two chunks per worker keep every worker busy while the oldest one is waited for.
+    pending: collections.deque[concurrent.futures.Future] = collections.deque()
+    try:
+        for chunk in chunked(documents, chunksize):
+            pending.append(executor.submit(simplify_chunk, chunk))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+
+        while len(pending) > 0:
+            yield from pending.popleft().result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+def read_documents(file_path: str) -> Iterator[tuple[str | None, str | list[list[str]]]]:
+    with open(file_path, mode="r", encoding="utf-8") as file:
+        for line in file:
+            if line.strip() == "":
+                continue
+
+            item = json.loads(line)
+            if isinstance(item, (str, list)):
+                yield (None, item)
+            else:
+                yield (item.get("id"), item["document"])
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Simplify a JSON lines corpus in parallel.")
+    parser.add_argument("input", help="JSON lines file with one document per line")
+    parser.add_argument("output", help="JSON lines file to write the results to")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count(), help="number of worker processes")
+    parser.add_argument("--chunksize", type=int, default=8, help="documents per task (and per Stanza call)")
+    parser.add_argument("--strategy", type=int, default=5)
+    parser.add_argument("--tokenize-no-ssplit", action="store_true")
+    parser.add_argument("--tokenize-pretokenized", action="store_true", help="documents are lists of sentences, each a list of words")
+    parser.add_argument("--conllu", action="store_true", help="input is CoNLL-U tagged already, documents separated by '# newdoc'")
+    parser.add_argument("--place-time-lexicon", help="file with extra place/time keywords, one per line")
+    parser.add_argument("--title-lexicon", help="file with extra title words, one per line")
+    parser.add_argument("--max-sentence-distance", type=int, help="forget antecedents not mentioned in this many sentences")
+    parser.add_argument("--min-salience", type=float, help="forget antecedents whose salience falls below this")
+    parser.add_argument("--stanza-cache-dir", help="directory of a cache of Stanza tags, shared by the workers and later runs")
+    add_logging_arguments(parser, default_log_file="corpus_runner.log")
+    args = parser.parse_args(argv)
+
+    log_handler = configure_logging_from_args(args, multiprocess=True)
+    # Only its counters are read here; the workers open the cache themselves.
+    stanza_cache = TagCache(args.stanza_cache_dir, model_version="") if args.stanza_cache_dir is not None else None
+    stanza_cache_info = stanza_cache.info() if stanza_cache is not None else None
+
+    document_ids: list[str | None] = []
+
+    def documents() -> Iterator[Document]:
+        if args.conllu:
+            with open(args.input, mode="r", encoding="utf-8") as input_file:
+                for document_id, document in read_conllu_documents(input_file):
+                    document_ids.append(document_id)
+                    yield document
+
+            return
+
+        for document_id, document in read_documents(args.input):
+            document_ids.append(document_id)
+            yield document
+
+    start_time = time.perf_counter()
+    total_count = 0
+    failed_count = 0
+    sentence_count = 0
+    broken_pool_error: Exception | None = None
+    with open(args.output, mode="w", encoding="utf-8") as output_file:
+        # Written as far as the workers got, if one of them died
+        try:
+            for index, result, error in run_corpus(
+                documents(),
+                workers=args.workers,
+                chunksize=args.chunksize,
+                tokenize_no_ssplit=args.tokenize_no_ssplit,
+                strategy=args.strategy,
+                place_time_lexicon_path=args.place_time_lexicon,
+                title_lexicon_path=args.title_lexicon,
+                max_sentence_distance=args.max_sentence_distance,
+                min_salience=args.min_salience,
+                log_handler=log_handler,
+                stanza_cache_dir=args.stanza_cache_dir,
+                tokenize_pretokenized=args.tokenize_pretokenized,
+                pretagged=args.conllu
+            ):
+                record = {"id": document_ids[index] if document_ids[index] is not None else index}
+                if error is None:
+                    record["result"] = result
+                    sentence_count += len(result)
+                else:
+                    record["error"] = error
+                    failed_count += 1
+                    print(f"Document {record['id']} failed: {error}", file=sys.stderr)
+
+                print(json.dumps(record, ensure_ascii=False), file=output_file)
+                total_count += 1
+        except BrokenProcessPool as e:
+            broken_pool_error = e
+
+    elapsed = time.perf_counter() - start_time
+    print(f"Documents: {total_count} ({total_count - failed_count} succeeded, {failed_count} failed)", file=sys.stderr)
+    print(f"Sentences: {sentence_count}", file=sys.stderr)
+    print(f"Elapsed: {elapsed:.2f} s with {args.workers} worker(s), chunksize {args.chunksize}", file=sys.stderr)
+    if elapsed > 0:
+        print(f"Throughput: {total_count / elapsed:.2f} documents/s, {sentence_count / elapsed:.2f} sentences/s", file=sys.stderr)
+
+    if stanza_cache is not None:
+        new_stanza_cache_info = stanza_cache.info()
+        hit_count = new_stanza_cache_info["hits"] - stanza_cache_info["hits"]
+        miss_count = new_stanza_cache_info["misses"] - stanza_cache_info["misses"]
+        if hit_count + miss_count > 0:
+            print(f"Stanza cache: {hit_count} hits, {miss_count} misses ({hit_count / (hit_count + miss_count):.1%} hit rate)", file=sys.stderr)
+
+    if log_handler.dropped_count > 0:
+        print(f"Dropped log records: {log_handler.dropped_count} (see --log-queue-size)", file=sys.stderr)
+
+    if broken_pool_error is not None:
+        print(f"A worker process died, stopping after {total_count} documents: {broken_pool_error}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
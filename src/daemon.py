@@ -0,0 +1,250 @@
+"""Serve TextSimplifier to local clients from worker processes that share one copy of the models.
+
+The parent process loads Stanza, builds the rule pipelines and simplifies a warmup document, then
+freezes its heap (gc.freeze) and forks the workers. The workers inherit the loaded models, and as
+the garbage collector of a worker never writes to the frozen objects, their pages stay shared
+copy-on-write: the memory of each extra worker is mostly its own working set. A worker that dies
+is replaced by a new fork of the parent, which is ready at once. Unix only.
+
+The workers accept connections on one Unix socket; a connection is served by one worker until it
+is closed. Requests and responses are JSON objects, one per line:
+
+    {"document": ...}              -> {"result": [[...], ...]} or {"error": "..."}
+    {"documents": [...]}           -> {"results": [{"result": ...} or {"error": "..."}, ...]}
+    {"command": "ping"}            -> {"pid": ...}
+    {"command": "memory"}          -> see get_memory_info
+
+See src.daemon_client for a client.
+
+Usage: py -m src.daemon --socket /tmp/indo_ts.sock --workers 4 --strategy 5
+"""
+
+import argparse
+import gc
+import json
+import logging
+import multiprocessing
+import multiprocessing.connection
+import os
+import signal
+import socket
+import sys
+import time
+
+from .daemon_client import DEFAULT_SOCKET_PATH
+from .indo_ts import TextSimplifier
+from .logging_config import add_logging_arguments, configure_logging_from_args
+
+logger = logging.getLogger(__name__)
+
+# A worker that dies sooner than this after it was forked is replaced only after this long, so a
+# worker that cannot start does not make the parent fork in a tight loop.
+MIN_WORKER_SECONDS = 1.0
+
+FORK_CONTEXT = multiprocessing.get_context("fork")
+
+def get_memory_info() -> dict:
+    # The resident memory of this process, split into pages shared with other processes (the
+    # models of the parent, for a worker) and private ones, from /proc/self/smaps_rollup (Linux).
+    # The sizes are None elsewhere.
+    info = {"pid": os.getpid(), "rss_bytes": None, "pss_bytes": None, "shared_bytes": None, "private_bytes": None}
+    try:
+        with open("/proc/self/smaps_rollup", mode="r") as file:
+            fields = {}
+            for line in file:
+                name, _, value = line.partition(":")
+                if value.strip().endswith("kB"):
+                    fields[name] = int(value.split()[0]) * 1024
+    except OSError:
+        return info
+
+    info["rss_bytes"] = fields.get("Rss")
+    info["pss_bytes"] = fields.get("Pss")
+    info["shared_bytes"] = fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0)
+    info["private_bytes"] = fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+    return info
+
+def handle_request(simplifier: TextSimplifier, request: dict) -> dict:
+    if "document" in request:
+        try:
+            return {"result": simplifier.simplify(request["document"])}
+        except Exception as e:
+            logger.exception("Simplifying a document failed")
+            return {"error": f"{type(e).__name__}: {e}"}
+
+    if "documents" in request:
+        if not isinstance(request["documents"], list):
+            return {"error": "\"documents\" must be a list"}
+
+        results = simplifier.simplify_batch(request["documents"], batch_size=max(len(request["documents"]), 1), return_exceptions=True)
+        return {"results": [
+            {"error": f"{type(result).__name__}: {result}"} if isinstance(result, Exception) else {"result": result}
+            for result in results
+        ]}
+
+    command = request.get("command")
+    if command == "ping":
+        return {"pid": os.getpid()}
+
+    if command == "memory":
+        return get_memory_info()
+
+    return {"error": f"unknown request: {json.dumps(request, ensure_ascii=False)[:100]}"}
+
+def serve_connection(simplifier: TextSimplifier, connection: socket.socket):
+    with connection, connection.makefile("rwb") as file:
+        for line in file:
+            if line.strip() == b"":
+                continue
+
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                response = {"error": f"invalid JSON: {e}"}
+            else:
+                try:
+                    response = handle_request(simplifier, request) if isinstance(request, dict) else {"error": "a request must be a JSON object"}
+                except Exception as e:
+                    # A bad request must not end the worker, and with it the connection.
+                    logger.exception("Handling a request failed")
+                    response = {"error": f"{type(e).__name__}: {e}"}
+
+            file.write(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+            file.flush()
+
+def run_worker(simplifier: TextSimplifier, server: socket.socket):
+    # The parent stops the workers; Ctrl-C in a terminal goes to every process of the group.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    # The objects of the parent are frozen, so collecting the garbage of requests leaves their
+    # pages shared.
+    gc.enable()
+    while True:
+        connection, _ = server.accept()
+        try:
+            serve_connection(simplifier, connection)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+def start_worker(simplifier: TextSimplifier, server: socket.socket, worker_number: int) -> multiprocessing.Process:
+    # Forked, so the worker gets the loaded simplifier and the listening socket as they are.
+    worker = FORK_CONTEXT.Process(target=run_worker, args=(simplifier, server), name=f"Worker-{worker_number}", daemon=True)
+    worker.start()
+    return worker
+
+def bind_socket(socket_path: str) -> socket.socket:
+    if os.path.exists(socket_path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(socket_path)
+        except OSError:
+            # Left by a daemon that did not stop cleanly
+            os.unlink(socket_path)
+        else:
+            raise RuntimeError(f"a daemon is already listening on {socket_path}")
+        finally:
+            probe.close()
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    server.listen(128)
+    return server
+
+def stop(signal_number, frame):
+    raise KeyboardInterrupt
+
+def serve(socket_path: str = DEFAULT_SOCKET_PATH, workers=4, torch_threads: int | None = 1, **simplifier_options):
+    """Load a TextSimplifier (with `simplifier_options`), fork `workers` processes serving it on
+    `socket_path`, and replace any worker that dies, until SIGTERM or SIGINT.
+
+    `torch_threads` sets the threads of torch in every worker; the workers are the parallelism, and
+    a thread pool started before the fork is not safe to use in a forked child.
+    """
+    if workers < 1:
+        raise ValueError("workers must be at least 1")
+
+    # Objects freed while loading would leave holes in pages the workers share, so the garbage
+    # collector waits until the heap is frozen.
+    gc.disable()
+    simplifier = TextSimplifier(load_stanza="eager", **simplifier_options)
+    torch = sys.modules.get("torch")
+    if torch is not None and torch_threads is not None:
+        torch.set_num_threads(torch_threads)
+
+    simplifier.warmup()
+    server = bind_socket(socket_path)
+    gc.freeze()
+    previous_handler = signal.signal(signal.SIGTERM, stop)
+
+    # Worker number -> (process, when it was started)
+    worker_processes: dict[int, tuple[multiprocessing.Process, float]] = {}
+    try:
+        for worker_number in range(workers):
+            worker_processes[worker_number] = (start_worker(simplifier, server, worker_number), time.monotonic())
+
+        logger.info("Serving on %s with %d workers", socket_path, workers)
+        while True:
+            multiprocessing.connection.wait([process.sentinel for process, _ in worker_processes.values()])
+            for worker_number, (process, start_time) in list(worker_processes.items()):
+                if process.is_alive():
+                    continue
+
+                process.join()
+                lifetime = time.monotonic() - start_time
+                logger.warning("Worker %d (pid %d) exited with code %s after %.1f s, replacing it", worker_number, process.pid, process.exitcode, lifetime)
+                if lifetime < MIN_WORKER_SECONDS:
+                    time.sleep(MIN_WORKER_SECONDS)
+
+                worker_processes[worker_number] = (start_worker(simplifier, server, worker_number), time.monotonic())
+    except KeyboardInterrupt:
+        logger.info("Stopping %d workers", len(worker_processes))
+    finally:
+        signal.signal(signal.SIGTERM, previous_handler)
+        for process, _ in worker_processes.values():
+            process.terminate()
+
+        for process, _ in worker_processes.values():
+            process.join()
+
+        server.close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+        gc.unfreeze()
+        gc.enable()
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Serve text simplification on a Unix socket from pre-forked workers.")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH, help="path of the Unix socket")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count(), help="number of worker processes")
+    parser.add_argument("--torch-threads", type=int, default=1, help="threads of torch in each worker")
+    parser.add_argument("--strategy", type=int, default=5)
+    parser.add_argument("--tokenize-no-ssplit", action="store_true")
+    parser.add_argument("--tokenize-pretokenized", action="store_true", help="documents are lists of sentences, each a list of words")
+    parser.add_argument("--pretagged", action="store_true", help="documents are lists of sentences of [text, upos, feats] tokens; Stanza is not loaded")
+    parser.add_argument("--place-time-lexicon", help="file with extra place/time keywords, one per line")
+    parser.add_argument("--title-lexicon", help="file with extra title words, one per line")
+    parser.add_argument("--max-sentence-distance", type=int, help="forget antecedents not mentioned in this many sentences")
+    parser.add_argument("--min-salience", type=float, help="forget antecedents whose salience falls below this")
+    parser.add_argument("--stanza-cache-dir", help="directory of a cache of Stanza tags, shared by the workers and later runs")
+    add_logging_arguments(parser, default_log_file="daemon.log")
+    args = parser.parse_args(argv)
+
+    configure_logging_from_args(args, multiprocess=True)
+    serve(
+        args.socket,
+        workers=args.workers,
+        torch_threads=args.torch_threads,
+        strategy=args.strategy,
+        tokenize_no_ssplit=args.tokenize_no_ssplit,
+        tokenize_pretokenized=args.tokenize_pretokenized,
+        pretagged=args.pretagged,
+        place_time_lexicon_path=args.place_time_lexicon,
+        title_lexicon_path=args.title_lexicon,
+        max_sentence_distance=args.max_sentence_distance,
+        min_salience=args.min_salience,
+        stanza_cache_dir=args.stanza_cache_dir
+    )
+
+if __name__ == "__main__":
+    main()
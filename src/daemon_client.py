@@ -0,0 +1,97 @@
+"""A client of the simplification daemon (src.daemon), which imports neither Stanza nor NLTK.
+
+    with DaemonClient("/tmp/indo_ts.sock") as client:
+        result = client.simplify("Budi, yang tinggal di Jakarta, pergi ke pasar.")
+
+A client keeps one connection, which a daemon worker serves until it is closed; use one client
+per thread.
+"""
+
+import json
+import os
+import socket
+import tempfile
+
+DEFAULT_SOCKET_PATH = os.path.join(tempfile.gettempdir(), "indo_ts.sock")
+
+class DaemonError(Exception):
+    # A document the daemon could not simplify, or a request it did not understand
+    pass
+
+class DaemonClient:
+    def __init__(self, socket_path: str = DEFAULT_SOCKET_PATH, timeout: float | None = None):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._socket: socket.socket | None = None
+        self._file = None
+
+    def simplify(self, document) -> list[list[str]]:
+        return self._request({"document": document})["result"]
+
+    def simplify_batch(self, documents: list, return_exceptions=False) -> list[list[list[str]] | DaemonError]:
+        # The daemon tags the documents together, as TextSimplifier.simplify_batch does.
+        results: list[list[list[str]] | DaemonError] = []
+        for response in self._request({"documents": documents})["results"]:
+            if "error" not in response:
+                results.append(response["result"])
+            elif return_exceptions:
+                results.append(DaemonError(response["error"]))
+            else:
+                raise DaemonError(response["error"])
+
+        return results
+
+    def ping(self) -> int:
+        # The process id of the worker serving this client
+        return self._request({"command": "ping"})["pid"]
+
+    def memory(self) -> dict:
+        # The resident memory of the worker serving this client, see src.daemon.get_memory_info
+        return self._request({"command": "memory"})
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+        if self._socket is not None:
+            self._socket.close()
+
+        self._socket = None
+        self._file = None
+
+    def __enter__(self) -> "DaemonClient":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _request(self, request: dict) -> dict:
+        if self._socket is None:
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._socket.settimeout(self.timeout)
+            try:
+                self._socket.connect(self.socket_path)
+            except OSError:
+                self.close()
+                raise
+
+            self._file = self._socket.makefile("rwb")
+
+        try:
+            self._file.write(json.dumps(request, ensure_ascii=False).encode("utf-8") + b"\n")
+            self._file.flush()
+            line = self._file.readline()
+        except OSError:
+            self.close()
+            raise
+
+        if line == b"":
+            # The worker died; the next request connects to another one.
+            self.close()
+            raise ConnectionError("the daemon closed the connection")
+
+        response = json.loads(line)
+        if "error" in response:
+            raise DaemonError(response["error"])
+
+        return response
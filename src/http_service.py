@@ -0,0 +1,372 @@
+"""An HTTP service around TextSimplifier that tags concurrent requests together.
+
+Documents of concurrent requests are collected into micro-batches of at most --max-batch-size
+documents, waiting at most --max-wait-ms after the first one; under load the batches grow, and a
+lone request waits only that long. Each batch is tagged by one Stanza call and then goes through
+the rule stages per document, in one executor thread, so the event loop never blocks. A document
+is answered as soon as its rule stages are done, without waiting for the rest of its batch.
+
+    POST /simplify  {"document": ...}                -> {"result": [[...], ...]}
+    POST /simplify  {"documents": [...]}             -> {"results": [{"result": ...} or {"error": "..."}, ...]}
+    POST /simplify  {"documents": [...], "stream": true}
+                    -> JSON lines, one per input sentence as soon as its document is done:
+                       {"document": 0, "sentence": 0, "result": [...]} or {"document": 0, "error": "..."}
+    GET /health                                      -> {"ready": true}, once the models are loaded
+    GET /metrics                                     -> the metrics in Prometheus text format
+
+A request with both "document" and "documents" is answered for "document", streamed or not; a
+"documents" that is not a list is a 400.
+
+The rule stages resolve pronouns and relative clauses across sentences, so the sentences of one
+document are ready together; streaming sends each document as it is done.
+
+Usage: py -m src.http_service --port 8080 --max-batch-size 16 --max-wait-ms 10 --strategy 5
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import logging
+import signal
+from urllib.parse import urlsplit, parse_qs
+
+from .indo_ts import TextSimplifier
+from .logging_config import add_logging_arguments, configure_logging_from_args
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY_BYTES = 10_000_000
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    411: "Length Required",
+    413: "Content Too Large",
+    431: "Request Header Fields Too Large",
+    500: "Internal Server Error",
+    501: "Not Implemented"
+}
+
+class MicroBatcher:
+    """Collects documents submitted from the event loop into batches for one executor thread."""
+
+    def __init__(self, simplifier: TextSimplifier, max_batch_size=16, max_wait_seconds=0.01):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+
+        self.simplifier = simplifier
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self.batch_count = 0
+        self.batched_document_count = 0
+        self.ready = False
+        # One thread, as TextSimplifier is not thread-safe. While it runs a batch, new documents
+        # wait in the queue; the next batch is formed from them once this one is done.
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="simplifier")
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def start(self):
+        # Called from the event loop. The models are warmed up in the executor thread before the
+        # first batch, which waits for them; `ready` tells when they are.
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+        self._executor.submit(self._warmup)
+
+    def _warmup(self):
+        try:
+            self.simplifier.warmup()
+        except Exception:
+            # Every document will fail the same way, and say why.
+            logger.exception("Warming up the simplifier failed")
+            return
+
+        self.ready = True
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+        self._executor.shutdown(wait=True)
+
+    def submit(self, document) -> asyncio.Future:
+        future = self._loop.create_future()
+        self._queue.put_nowait((document, future))
+        return future
+
+    async def simplify(self, document) -> list[list[str]]:
+        return await self.submit(document)
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            deadline = self._loop.time() + self.max_wait_seconds
+            while len(batch) < self.max_batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+
+                timeout = deadline - self._loop.time()
+                if timeout <= 0:
+                    break
+
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Requests whose client went away are not simplified.
+            batch = [(document, future) for document, future in batch if not future.done()]
+            if len(batch) == 0:
+                continue
+
+            self.batch_count += 1
+            self.batched_document_count += len(batch)
+            await self._loop.run_in_executor(self._executor, self._simplify_batch, batch)
+
+    def _simplify_batch(self, batch: list[tuple[object, asyncio.Future]]):
+        # Runs in the executor thread; each future is resolved on the event loop as soon as its
+        # document is done.
+        resolved_count = 0
+        try:
+            results = self.simplifier.simplify_many([document for document, _ in batch], batch_size=len(batch), return_exceptions=True)
+            for (_, future), result in zip(batch, results):
+                self._loop.call_soon_threadsafe(set_future_result, future, result)
+                resolved_count += 1
+        except Exception as e:
+            logger.exception("Simplifying a batch failed")
+            for _, future in batch[resolved_count:]:
+                self._loop.call_soon_threadsafe(set_future_result, future, e)
+
+def set_future_result(future: asyncio.Future, result):
+    if future.done():
+        return
+
+    if isinstance(result, Exception):
+        future.set_exception(result)
+    else:
+        future.set_result(result)
+
+def format_error(e: Exception) -> str:
+    return f"{type(e).__name__}: {e}"
+
+def encode_json(value) -> bytes:
+    return json.dumps(value, ensure_ascii=False).encode("utf-8")
+
+async def write_response(writer: asyncio.StreamWriter, status: int, body: bytes, content_type="application/json", keep_alive=True):
+    writer.write(
+        f"HTTP/1.1 {status} {REASONS[status]}\r\nContent-Type: {content_type}\r\nContent-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("ascii") + body
+    )
+    await writer.drain()
+
+async def write_chunk(writer: asyncio.StreamWriter, data: bytes):
+    writer.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+    await writer.drain()
+
+async def stream_results(writer: asyncio.StreamWriter, batcher: MicroBatcher, documents: list, keep_alive: bool):
+    writer.write(
+        f"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\nTransfer-Encoding: chunked\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("ascii")
+    )
+    await writer.drain()
+    document_indices = {batcher.submit(document): index for index, document in enumerate(documents)}
+    pending = set(document_indices)
+    try:
+        while len(pending) > 0:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                document_index = document_indices[future]
+                if future.exception() is not None:
+                    lines = [{"document": document_index, "error": format_error(future.exception())}]
+                else:
+                    lines = [
+                        {"document": document_index, "sentence": sentence_index, "result": sentences}
+                        for sentence_index, sentences in enumerate(future.result())
+                    ]
+
+                await write_chunk(writer, b"".join(encode_json(line) + b"\n" for line in lines))
+    finally:
+        for future in pending:
+            future.cancel()
+
+    writer.write(b"0\r\n\r\n")
+    await writer.drain()
+
+async def handle_simplify(writer: asyncio.StreamWriter, batcher: MicroBatcher, body: bytes, query: dict, keep_alive: bool):
+    try:
+        request = json.loads(body)
+    except ValueError as e:
+        await write_response(writer, 400, encode_json({"error": f"invalid JSON: {e}"}), keep_alive=keep_alive)
+        return
+
+    if (
+        not isinstance(request, dict)
+        or ("document" not in request and "documents" not in request)
+        or ("documents" in request and not isinstance(request["documents"], list))
+    ):
+        await write_response(writer, 400, encode_json({"error": "expected an object with \"document\" or a list of \"documents\""}), keep_alive=keep_alive)
+        return
+
+    # "document" wins over "documents", streamed or not.
+    documents = [request["document"]] if "document" in request else request["documents"]
+    if request.get("stream") is True or query.get("stream", [""])[0] in ("1", "true"):
+        await stream_results(writer, batcher, documents, keep_alive)
+        return
+
+    if "document" in request:
+        try:
+            result = await batcher.simplify(request["document"])
+        except Exception as e:
+            await write_response(writer, 500, encode_json({"error": format_error(e)}), keep_alive=keep_alive)
+            return
+
+        await write_response(writer, 200, encode_json({"result": result}), keep_alive=keep_alive)
+        return
+
+    outcomes = await asyncio.gather(*[batcher.submit(document) for document in documents], return_exceptions=True)
+    results = [{"error": format_error(outcome)} if isinstance(outcome, Exception) else {"result": outcome} for outcome in outcomes]
+    await write_response(writer, 200, encode_json({"results": results}), keep_alive=keep_alive)
+
+def get_metrics_text(batcher: MicroBatcher) -> str:
+    return batcher.simplifier.metrics.to_prometheus() + (
+        "# HELP indo_ts_batches_total Micro-batches simplified.\n"
+        "# TYPE indo_ts_batches_total counter\n"
+        f"indo_ts_batches_total {batcher.batch_count}\n"
+        "# HELP indo_ts_batched_documents_total Documents in the micro-batches.\n"
+        "# TYPE indo_ts_batched_documents_total counter\n"
+        f"indo_ts_batched_documents_total {batcher.batched_document_count}\n"
+    )
+
+async def handle_connection(batcher: MicroBatcher, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    # HTTP/1.1 with persistent connections; request bodies need a Content-Length.
+    try:
+        while True:
+            try:
+                head = await reader.readuntil(b"\r\n\r\n")
+            except asyncio.IncompleteReadError:
+                return
+            except asyncio.LimitOverrunError:
+                await write_response(writer, 431, encode_json({"error": "request head too large"}), keep_alive=False)
+                return
+
+            request_line, *header_lines = head.decode("latin-1").split("\r\n")
+            method, target, version = (request_line.split(" ") + ["", "", ""])[:3]
+            headers = {}
+            for header_line in header_lines:
+                name, separator, value = header_line.partition(":")
+                if separator != "":
+                    headers[name.strip().lower()] = value.strip()
+
+            connection_header = headers.get("connection", "").lower()
+            keep_alive = connection_header == "keep-alive" if version == "HTTP/1.0" else connection_header != "close"
+            if "transfer-encoding" in headers:
+                await write_response(writer, 501, encode_json({"error": "chunked request bodies are not supported"}), keep_alive=False)
+                return
+
+            try:
+                content_length = int(headers.get("content-length", "0") or "0")
+            except ValueError:
+                await write_response(writer, 400, encode_json({"error": "invalid Content-Length"}), keep_alive=False)
+                return
+
+            if content_length > MAX_BODY_BYTES:
+                await write_response(writer, 413, encode_json({"error": f"the body is larger than {MAX_BODY_BYTES} bytes"}), keep_alive=False)
+                return
+
+            body = await reader.readexactly(content_length)
+            url = urlsplit(target)
+            if url.path == "/simplify":
+                if method != "POST":
+                    await write_response(writer, 405, encode_json({"error": "use POST"}), keep_alive=keep_alive)
+                else:
+                    await handle_simplify(writer, batcher, body, parse_qs(url.query), keep_alive)
+            elif url.path == "/health" and method == "GET":
+                await write_response(writer, 200, encode_json({"ready": batcher.ready}), keep_alive=keep_alive)
+            elif url.path == "/metrics" and method == "GET":
+                await write_response(writer, 200, get_metrics_text(batcher).encode("utf-8"), content_type="text/plain; version=0.0.4", keep_alive=keep_alive)
+            else:
+                await write_response(writer, 404, encode_json({"error": f"no such resource: {method} {url.path}"}), keep_alive=keep_alive)
+
+            if not keep_alive:
+                return
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+async def serve(host="127.0.0.1", port=8080, max_batch_size=16, max_wait_seconds=0.01, on_listening=None, **simplifier_options):
+    """Serve until SIGINT or SIGTERM. The models load in the executor thread while the service
+    already accepts requests; /health tells when they are ready. `on_listening` is called with the
+    (host, port) the service listens on, e.g. when `port` is 0.
+    """
+    simplifier = TextSimplifier(**simplifier_options)
+    batcher = MicroBatcher(simplifier, max_batch_size=max_batch_size, max_wait_seconds=max_wait_seconds)
+    batcher.start()
+    server = await asyncio.start_server(lambda reader, writer: handle_connection(batcher, reader, writer), host, port)
+    address = server.sockets[0].getsockname()[:2]
+    logger.info("Listening on http://%s:%d", *address)
+    if on_listening is not None:
+        on_listening(address)
+
+    loop = asyncio.get_running_loop()
+    stop_event = asyncio.Event()
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signal_number, stop_event.set)
+        except (NotImplementedError, RuntimeError):
+            # Not on Windows, nor outside the main thread; Ctrl-C still stops asyncio.run.
+            pass
+
+    async with server:
+        await stop_event.wait()
+
+    await batcher.close()
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Serve text simplification over HTTP with micro-batching.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080, help="0 for any free port")
+    parser.add_argument("--max-batch-size", type=int, default=16, help="most documents tagged together")
+    parser.add_argument("--max-wait-ms", type=float, default=10.0, help="longest wait for more documents after the first of a batch")
+    parser.add_argument("--strategy", type=int, default=5)
+    parser.add_argument("--tokenize-no-ssplit", action="store_true")
+    parser.add_argument("--tokenize-pretokenized", action="store_true", help="documents are lists of sentences, each a list of words")
+    parser.add_argument("--pretagged", action="store_true", help="documents are lists of sentences of [text, upos, feats] tokens; Stanza is not loaded")
+    parser.add_argument("--place-time-lexicon", help="file with extra place/time keywords, one per line")
+    parser.add_argument("--title-lexicon", help="file with extra title words, one per line")
+    parser.add_argument("--max-sentence-distance", type=int, help="forget antecedents not mentioned in this many sentences")
+    parser.add_argument("--min-salience", type=float, help="forget antecedents whose salience falls below this")
+    parser.add_argument("--stanza-cache-dir", help="directory of a cache of Stanza tags")
+    add_logging_arguments(parser, default_log_file="http_service.log")
+    args = parser.parse_args(argv)
+
+    configure_logging_from_args(args)
+    asyncio.run(serve(
+        args.host,
+        args.port,
+        max_batch_size=args.max_batch_size,
+        max_wait_seconds=args.max_wait_ms / 1000,
+        on_listening=lambda address: print(f"Listening on http://{address[0]}:{address[1]}", flush=True),
+        strategy=args.strategy,
+        tokenize_no_ssplit=args.tokenize_no_ssplit,
+        tokenize_pretokenized=args.tokenize_pretokenized,
+        pretagged=args.pretagged,
+        place_time_lexicon_path=args.place_time_lexicon,
+        title_lexicon_path=args.title_lexicon,
+        max_sentence_distance=args.max_sentence_distance,
+        min_salience=args.min_salience,
+        stanza_cache_dir=args.stanza_cache_dir
+    ))
+
+if __name__ == "__main__":
+    main()
@@ -1,69 +1,362 @@
+import argparse
+import json
 import logging
+import threading
+import tracemalloc
+from collections.abc import Iterable, Iterator
 from nltk.tree import Tree
-from .simplification.agreement import extract_agreements_from_head_noun
-from .simplification.clause_boundary import extract_boundaries
+from .simplification.agreement import PLACE_TIME_KEYWORD_LIST, TITLE_WORDS, init_agreement_pipeline, load_lexicon
+from .simplification.clause_boundary import appositive_boundary_cache_info, extract_boundaries
 from .simplification.grammatical_function import extract_grammatical_function
 from .simplification.noun_chunk import init_noun_chunk_pipeline
-
-from .simplification.stanza_pipeline import init_stanza_pipeline
+from .simplification.tag_cache import DEFAULT_MAX_BYTES
+from .simplification.tagged_sentence import init_tagged_batch_pipeline
 from .simplification.relative_clause_attachment import relative_clause_attachment
 from .simplification.resolve_third_person_pronouns import init_third_person_pronouns_pipeline
+from .simplification.trace import trace_decisions
 from .simplification.transform import transform
-from .utils import word_list_to_sentence
+from .logging_config import add_logging_arguments, configure_logging_from_args
+from .metrics import DocumentMetrics, SimplificationMetrics, get_rss_bytes
+from .utils import word_lists_to_sentences
+
+logger = logging.getLogger(__name__)
+
+# Text, a list of sentences of words (tokenize_pretokenized), or a list of sentences of
+# (text, upos, feats string) tokens (pretagged)
+Document = str | list[list[str]] | list[list[tuple[str, str, str]]]
 
 class TextSimplifier:
-    def __init__(self, tokenize_no_ssplit=False, strategy=1):
-        self._stanza_pipeline = init_stanza_pipeline(
-            tokenize_no_ssplit=tokenize_no_ssplit,
-            strategy=strategy
-        )
+    def __init__(
+        self,
+        tokenize_no_ssplit=False,
+        strategy=1,
+        place_time_lexicon_path: str | None = None,
+        title_lexicon_path: str | None = None,
+        max_sentence_distance: int | None = None,
+        min_salience: float | None = None,
+        profile_memory=False,
+        balanced_brackets=False,
+        stanza_cache_dir: str | None = None,
+        stanza_cache_max_bytes: int = DEFAULT_MAX_BYTES,
+        tokenize_pretokenized=False,
+        pretagged=False,
+        load_stanza="lazy"
+    ):
+        # The lexicon files (one entry per line) extend the built-in place/time keywords and titles.
+        # max_sentence_distance and min_salience bound the coreference state of long documents by
+        # evicting old antecedents (see SalienceStore); self.stats counts the evictions over all runs,
+        # along with the hits and misses of the appositive boundary cache and the splits made.
+        # self.metrics times every stage and counts these stats among others (see src.metrics).
+        # profile_memory makes it measure the memory of every stage too, with tracemalloc (slow).
+        # balanced_brackets removes each [...] of the output on its own, instead of everything from
+        # the first "[" to the last "]" of a sentence (see utils.strip_brackets).
+        # stanza_cache_dir keeps the Stanza tags of every document there (see TagCache), so a
+        # document tagged before, by any run or worker, is not tagged again.
+        # With tokenize_pretokenized, a document is a list of sentences, each a list of words, that
+        # Stanza only tags; result[i] holds the simplified sentences of sentence i of the document.
+        # With pretagged, a document is a list of sentences of (text, upos, feats string) tokens
+        # (see conllu.read_conllu_documents), and Stanza is not even imported.
+        # load_stanza is when Stanza is imported and its models loaded: "lazy" (by the first
+        # document), "eager" (here) or "background" (by a thread started here, see is_ready and
+        # wait_until_ready). warmup() also runs them once.
+        if load_stanza not in ("lazy", "eager", "background"):
+            raise ValueError(f"load_stanza must be 'lazy', 'eager' or 'background', got {load_stanza!r}")
+
+        if pretagged:
+            self._stanza_pipeline = init_tagged_batch_pipeline(strategy=strategy)
+        else:
+            from .simplification.stanza_pipeline import init_stanza_batch_pipeline
+
+            self._stanza_pipeline = init_stanza_batch_pipeline(
+                tokenize_no_ssplit=tokenize_no_ssplit,
+                strategy=strategy,
+                cache_dir=stanza_cache_dir,
+                cache_max_bytes=stanza_cache_max_bytes,
+                tokenize_pretokenized=tokenize_pretokenized
+            )
+
+        self._input_stage = "tagged_input" if pretagged else "stanza"
         self._noun_chunk_pipeline = init_noun_chunk_pipeline(strategy=strategy)
-        self._third_person_pronouns_pipeline = init_third_person_pronouns_pipeline(strategy=strategy)
+        self._agreement_pipeline = init_agreement_pipeline(
+            place_time_keywords=PLACE_TIME_KEYWORD_LIST + (load_lexicon(place_time_lexicon_path) if place_time_lexicon_path is not None else []),
+            title_words=TITLE_WORDS + (load_lexicon(title_lexicon_path) if title_lexicon_path is not None else [])
+        )
+        self._third_person_pronouns_pipeline = init_third_person_pronouns_pipeline(
+            strategy=strategy,
+            max_sentence_distance=max_sentence_distance,
+            min_salience=min_salience
+        )
+        self._max_sentence_distance = max_sentence_distance
+        self._min_salience = min_salience
         self._strategy = strategy
+        self._balanced_brackets = balanced_brackets
+        self._one_result_per_sentence = tokenize_pretokenized or pretagged
+        self.stats: dict[str, int] = {}
+        self.metrics = SimplificationMetrics()
+        self._profile_memory = profile_memory
+        if profile_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+        self._load_thread: threading.Thread | None = None
+        self._load_error: Exception | None = None
+        if load_stanza == "eager":
+            self._stanza_pipeline.load()
+        elif load_stanza == "background" and not self._stanza_pipeline.is_loaded():
+            self._load_thread = threading.Thread(target=self._load_in_background, name="stanza-load", daemon=True)
+            self._load_thread.start()
+
         print("Strategy:", strategy)
-    
-    def simplify(self, document: str) -> list[list[str]]:
-        result = self._stanza_pipeline(document)
-        result = self._noun_chunk_pipeline(result)
-        result = extract_grammatical_function(result, strategy=self._strategy)
-        result = extract_agreements_from_head_noun(result)
-        result = self._third_person_pronouns_pipeline(result)
-        result = relative_clause_attachment(result)
-        result = extract_boundaries(result, strategy=self._strategy)
-        result = transform(result, strategy=self._strategy)
-        result = tree_list_to_simplified_sentences_list(result)
+
+    def _load_in_background(self):
+        try:
+            self._stanza_pipeline.load()
+        except Exception as e:
+            # Raised by wait_until_ready; the first document tries to load the models again.
+            logger.warning("Loading Stanza in the background failed: %s", e)
+            self._load_error = e
+
+    def is_ready(self) -> bool:
+        # Whether a document can be simplified without waiting for the models to load
+        return self._stanza_pipeline.is_loaded()
+
+    def wait_until_ready(self, timeout: float | None = None) -> bool:
+        """Wait for the background load (or load the models now, if none was started) and return
+        whether they are loaded. The error of a background load that failed is raised here.
+        """
+        if self._load_thread is None:
+            self._stanza_pipeline.load()
+        else:
+            self._load_thread.join(timeout)
+            if self._load_error is not None:
+                raise self._load_error
+
+        return self.is_ready()
+
+    def warmup(self):
+        """Simplify a short built-in document, so that the first real document does not pay for
+        loading the models and the first run of Stanza and torch. The tag cache, metrics and stats
+        are left as they were.
+        """
+        tree_list = self._stanza_pipeline.warmup()
+        stats = dict(self.stats)
+        self._run_rule_stages(tree_list, DocumentMetrics())
+        self.stats.clear()
+        self.stats.update(stats)
+
+    def simplify(self, document: Document) -> list[list[str]]:
+        start_rss_bytes = get_rss_bytes() if self._profile_memory else None
+        document_metrics = DocumentMetrics(profile_memory=self._profile_memory)
+        with document_metrics.time_stage(self._input_stage):
+            tree_list, = self._stanza_pipeline([document], stats=self.stats)
+
+        result = self._simplify_tree_list(tree_list, document_metrics, sentence_count=self._get_sentence_count(document))
+        if self._profile_memory:
+            self.metrics.add_batch(1, start_rss_bytes=start_rss_bytes)
+
+        return result
+
+    def simplify_with_trace(self, document: Document) -> tuple[list[list[str]], list[dict]]:
+        """Simplify one document and return the rule decisions made for it as well.
+
+        Only this call is traced (see trace.trace_decisions); other documents, even ones being
+        simplified at the same time in another thread or task, are not.
+        """
+        with trace_decisions() as decisions:
+            result = self.simplify(document)
+
+        return (result, decisions)
+
+    def simplify_batch(self, documents: list[Document], batch_size: int = 32, return_exceptions=False) -> list[list[list[str]] | Exception]:
+        return list(self.simplify_many(documents, batch_size=batch_size, return_exceptions=return_exceptions))
+
+    def simplify_many(self, documents: Iterable[Document], batch_size: int = 32, return_exceptions=False) -> Iterator[list[list[str]] | Exception]:
+        """Simplify documents in batches of `batch_size`, in input order.
+
+        If `return_exceptions` is true, a document that fails is yielded as its exception
+        instead of stopping the whole run.
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+
+        batch: list[Document] = []
+        for document in documents:
+            batch.append(document)
+            if len(batch) == batch_size:
+                yield from self._simplify_documents(batch, return_exceptions=return_exceptions)
+                batch = []
+
+        if len(batch) > 0:
+            yield from self._simplify_documents(batch, return_exceptions=return_exceptions)
+
+    def _simplify_documents(self, documents: list[Document], return_exceptions=False) -> Iterator[list[list[str]] | Exception]:
+        start_rss_bytes = get_rss_bytes() if self._profile_memory else None
+        batch_metrics = DocumentMetrics(profile_memory=self._profile_memory)
+        try:
+            with batch_metrics.time_stage(self._input_stage):
+                tree_lists = self._stanza_pipeline(documents, stats=self.stats)
+        except Exception as e:
+            if not return_exceptions:
+                raise
+
+            if len(documents) == 1:
+                yield e
+                return
+
+            # Find the offending document(s) by tagging one at a time.
+            for document in documents:
+                yield from self._simplify_documents([document], return_exceptions=True)
+
+            return
+
+        # Stanza tags the whole batch at once, so each document is given an equal share of its time
+        # and retained memory, and the peak of the whole batch. The rule stages still run per
+        # document, so coreference state never leaks from one document to another.
+        for document, tree_list in zip(documents, tree_lists):
+            document_metrics = batch_metrics.share(len(documents))
+            sentence_count = self._get_sentence_count(document)
+            if not return_exceptions:
+                yield self._simplify_tree_list(tree_list, document_metrics, sentence_count=sentence_count)
+                continue
+
+            try:
+                yield self._simplify_tree_list(tree_list, document_metrics, sentence_count=sentence_count)
+            except Exception as e:
+                yield e
+
+        if self._profile_memory:
+            self.metrics.add_batch(len(documents), start_rss_bytes=start_rss_bytes)
+
+    def _get_sentence_count(self, document: Document) -> int | None:
+        # Pretokenized and pretagged sentences are never split or merged, so every one of them gets
+        # a result, even the empty ones and those that end up with no words.
+        return len(document) if self._one_result_per_sentence else None
+
+    def _simplify_tree_list(self, tree_list: list[Tree], document_metrics: DocumentMetrics | None = None, sentence_count: int | None = None) -> list[list[str]]:
+        if document_metrics is None:
+            document_metrics = DocumentMetrics(profile_memory=self._profile_memory)
+
+        try:
+            result = self._run_rule_stages(tree_list, document_metrics, sentence_count=sentence_count)
+        except Exception:
+            self.metrics.add_document(document_metrics, failed=True)
+            raise
+
+        self.metrics.add_document(document_metrics)
         return result
+
+    def _run_rule_stages(self, tree_list: list[Tree], document_metrics: DocumentMetrics, sentence_count: int | None = None) -> list[list[str]]:
+        document_metrics.count("sentences", len(tree_list))
+        document_metrics.count("tokens", sum(len(tree.leaves()) for tree in tree_list))
+
+        with document_metrics.time_stage("noun_chunk"):
+            result = self._noun_chunk_pipeline(tree_list)
+
+        document_metrics.count("noun_phrases", count_children(result, lambda label: label.tag == "NP"))
+
+        with document_metrics.time_stage("grammatical_function"):
+            result = extract_grammatical_function(result, strategy=self._strategy)
+
+        with document_metrics.time_stage("agreement"):
+            result = self._agreement_pipeline(result)
+
+        stats: dict[str, int] = {}
+        with document_metrics.time_stage("pronoun_resolution"):
+            result = self._third_person_pronouns_pipeline(result, stats=stats)
+
+        # Only the pronoun stage has set corefs so far; unresolved pronouns get -1.
+        document_metrics.count("pronouns_resolved", count_children(result, lambda label: label.coref is not None and label.coref >= 0))
+        document_metrics.count("pronouns_unresolved", count_children(result, lambda label: label.coref == -1))
+
+        with document_metrics.time_stage("relative_clause_attachment"):
+            result = relative_clause_attachment(
+                result,
+                max_sentence_distance=self._max_sentence_distance,
+                min_salience=self._min_salience,
+                stats=stats
+            )
+
+        document_metrics.count("relative_pronouns_resolved", count_children(result, lambda label: is_relative_pronoun(label) and label.coref is not None and label.coref >= 0))
+        document_metrics.count("relative_pronouns_unresolved", count_children(result, lambda label: is_relative_pronoun(label) and label.coref == -1))
+
+        with document_metrics.time_stage("clause_boundary"):
+            result = extract_boundaries(result, strategy=self._strategy)
+
+        for key, value in appositive_boundary_cache_info(result).items():
+            stats[f"appositive_boundary_cache_{key}"] = value
+
+        with document_metrics.time_stage("transform"):
+            result = transform(result, strategy=self._strategy, stats=stats)
+
+        with document_metrics.time_stage("detokenization"):
+            result = tree_list_to_simplified_sentences_list(result, balanced_brackets=self._balanced_brackets, sentence_count=sentence_count)
+
+        document_metrics.count("simplified_sentences", sum(len(sentences) for sentences in result))
+
+        logger.info("Document stats: %s", stats)
+        for key, value in stats.items():
+            self.stats[key] = self.stats.get(key, 0) + value
+            document_metrics.count(key, value)
+
+        return result
+
+def count_children(tree_list: list[Tree], predicate) -> int:
+    # The number of sentence children whose label satisfies the predicate
+    return sum(1 for tree in tree_list for subtree in tree if predicate(subtree.label()))
+
+def is_relative_pronoun(label) -> bool:
+    return label.tag != "NP" and label.has_feature("PronType", "Rel")
     
-def tree_list_to_simplified_sentences_list(tree_list: list[Tree]) -> list[list[str]]:
-    simplified_sentences_list: list[list[str]] = []
-    for tree in tree_list:
-        _, id_attribute = tree.label().split(";")
-        _, id_value = id_attribute.split("=")
-        sentence_id, *_ = id_value.split(".")
+def tree_list_to_simplified_sentences_list(tree_list: list[Tree], balanced_brackets=False, sentence_count: int | None = None) -> list[list[str]]:
+    # With sentence_count, the list has an entry for every sentence, even the ones after the last tree.
+    simplified_sentences_list: list[list[str]] = [] if sentence_count is None else [[] for _ in range(sentence_count)]
+    simplified_sentences = word_lists_to_sentences([tree.leaves() for tree in tree_list], balanced_brackets=balanced_brackets)
+    for tree, simplified_sentence in zip(tree_list, simplified_sentences):
+        sentence_id, *_ = tree.label().sentence_id.split(".")
         sentence_id = int(sentence_id)
 
         while sentence_id >= len(simplified_sentences_list):
             simplified_sentences_list.append([])
 
-        word_list = tree.leaves()
-        simplified_sentence = word_list_to_sentence(word_list)
         simplified_sentence = simplified_sentence[0].upper() + simplified_sentence[1:]
         simplified_sentences_list[sentence_id].append(simplified_sentence)
 
     return simplified_sentences_list
 
 if __name__ == "__main__":
-    logging.basicConfig(filename='myapp.log', level=logging.DEBUG)
-    simplifier = TextSimplifier(strategy=5)
+    parser = argparse.ArgumentParser(description="Simplify documents typed in one by one.")
+    add_logging_arguments(parser)
+    parser.add_argument("--trace", action="store_true", help="print the rule decisions made for each document")
+    parser.add_argument("--metrics-jsonl", help="append the stage timings and counters of each document to this file")
+    parser.add_argument("--metrics-prometheus", help="write the totals in Prometheus text format to this file on exit")
+    args = parser.parse_args()
+
+    configure_logging_from_args(args)
+    # The models load while the first document is typed.
+    simplifier = TextSimplifier(strategy=5, load_stanza="background")
 
     interrupt = False
     while not interrupt:
         try:
             document = input("Document: ")
-            result = simplifier.simplify(document)
+            if args.trace:
+                result, decisions = simplifier.simplify_with_trace(document)
+                print("Decisions:")
+                for decision in decisions:
+                    print(json.dumps(decision, ensure_ascii=False))
+            else:
+                result = simplifier.simplify(document)
+
             print("Result:")
             print(result)
             print()
+
+            if args.metrics_jsonl is not None:
+                with open(args.metrics_jsonl, mode="a", encoding="utf-8") as metrics_file:
+                    print(json.dumps(simplifier.metrics.recent_documents[-1]), file=metrics_file)
         except KeyboardInterrupt:
             interrupt = True
+
+    if args.metrics_prometheus is not None:
+        with open(args.metrics_prometheus, mode="w", encoding="utf-8") as metrics_file:
+            metrics_file.write(simplifier.metrics.to_prometheus())
     
@@ -0,0 +1,142 @@
+"""Logging for the entry points (`src.indo_ts`, `src.corpus_runner`).
+
+Records are put on a bounded queue by the thread (or worker process) that logs them, and a
+background thread writes them to a rotating log file, so simplifying a document never waits for
+the disk. When the queue is full, records are dropped and counted instead of blocking.
+"""
+
+import argparse
+import atexit
+import logging
+import logging.handlers
+import multiprocessing
+import queue
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """A QueueHandler that drops a record when the queue is full and counts it.
+
+    The count is a multiprocessing.Value, so worker processes given the same queue and counter
+    (see install_queue_handler) add to it as well.
+    """
+
+    def __init__(self, log_queue, dropped=None):
+        super().__init__(log_queue)
+        self.dropped = dropped if dropped is not None else multiprocessing.Value("L", 0)
+        self.listener: logging.handlers.QueueListener | None = None
+
+    @property
+    def dropped_count(self) -> int:
+        return self.dropped.value
+
+    def enqueue(self, record: logging.LogRecord):
+        self.queue.put_nowait(record)
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            self.enqueue(self.prepare(record))
+        except queue.Full:
+            with self.dropped.get_lock():
+                self.dropped.value += 1
+        except Exception:
+            self.handleError(record)
+
+def create_file_handler(log_file: str, max_bytes=10_000_000, backup_count=5, when: str | None = None) -> logging.Handler:
+    # Rotate by time if `when` is given (e.g. "midnight", "H"), otherwise by size.
+    if when is not None:
+        handler = logging.handlers.TimedRotatingFileHandler(log_file, when=when, backupCount=backup_count, encoding="utf-8")
+    else:
+        handler = logging.handlers.RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+
+    handler.setFormatter(logging.Formatter("%(asctime)s %(processName)s %(name)s %(levelname)s %(message)s"))
+    return handler
+
+def install_queue_handler(log_queue, dropped=None, level: str = "WARNING", module_levels: dict[str, str] | None = None) -> DroppingQueueHandler:
+    # Makes the root logger log through the queue only. Also used by worker processes, which get
+    # the queue and counter of the process that writes the file.
+    handler = DroppingQueueHandler(log_queue, dropped=dropped)
+    root_logger = logging.getLogger()
+    for old_handler in root_logger.handlers[:]:
+        root_logger.removeHandler(old_handler)
+
+    root_logger.addHandler(handler)
+    root_logger.setLevel(level.upper())
+    for name, module_level in (module_levels or {}).items():
+        logging.getLogger(name).setLevel(module_level.upper())
+
+    return handler
+
+def configure_logging(
+    log_file: str,
+    level: str = "WARNING",
+    module_levels: dict[str, str] | None = None,
+    max_bytes=10_000_000,
+    backup_count=5,
+    when: str | None = None,
+    queue_size=10_000,
+    multiprocess=False
+) -> DroppingQueueHandler:
+    """Log to `log_file` through a queue of `queue_size` records and a background writer thread.
+
+    `module_levels` sets the level of single loggers, e.g. {"src.simplification.clause_boundary": "DEBUG"}.
+    With `multiprocess`, the queue can be shared with worker processes (see install_queue_handler).
+    The writer is stopped, and the number of dropped records logged, at exit or by stop_logging.
+    """
+    log_queue = multiprocessing.Queue(queue_size) if multiprocess else queue.Queue(queue_size)
+    handler = install_queue_handler(log_queue, level=level, module_levels=module_levels)
+    handler.listener = logging.handlers.QueueListener(
+        log_queue,
+        create_file_handler(log_file, max_bytes=max_bytes, backup_count=backup_count, when=when),
+        respect_handler_level=True
+    )
+    handler.listener.start()
+    atexit.register(stop_logging, handler)
+    return handler
+
+def stop_logging(handler: DroppingQueueHandler):
+    # Writes the queued records and stops the writer thread. Safe to call more than once.
+    listener = handler.listener
+    if listener is None:
+        return
+
+    handler.listener = None
+    listener.stop()
+    if handler.dropped_count > 0:
+        record = logging.makeLogRecord({
+            "name": __name__,
+            "levelno": logging.WARNING,
+            "levelname": "WARNING",
+            "msg": f"{handler.dropped_count} log records were dropped because the queue was full"
+        })
+        for target in listener.handlers:
+            target.handle(record)
+
+    for target in listener.handlers:
+        target.close()
+
+def parse_module_level(value: str) -> tuple[str, str]:
+    name, separator, level = value.partition("=")
+    if separator == "" or name == "" or level == "":
+        raise argparse.ArgumentTypeError(f"expected MODULE=LEVEL, got {value!r}")
+
+    return (name, level)
+
+def add_logging_arguments(parser: argparse.ArgumentParser, default_log_file="myapp.log"):
+    parser.add_argument("--log-file", default=default_log_file)
+    parser.add_argument("--log-level", default="WARNING", help="e.g. INFO, or DEBUG to log every rule step (slow)")
+    parser.add_argument("--log-module-level", type=parse_module_level, action="append", default=[], metavar="MODULE=LEVEL", help="level of one logger, e.g. src.simplification.clause_boundary=DEBUG")
+    parser.add_argument("--log-max-bytes", type=int, default=10_000_000, help="rotate the log file at this size")
+    parser.add_argument("--log-rotate-when", help="rotate the log file by time instead, e.g. midnight")
+    parser.add_argument("--log-backup-count", type=int, default=5, help="rotated log files to keep")
+    parser.add_argument("--log-queue-size", type=int, default=10_000, help="records waiting to be written before new ones are dropped")
+
+def configure_logging_from_args(args: argparse.Namespace, multiprocess=False) -> DroppingQueueHandler:
+    return configure_logging(
+        args.log_file,
+        level=args.log_level,
+        module_levels=dict(args.log_module_level),
+        max_bytes=args.log_max_bytes,
+        backup_count=args.log_backup_count,
+        when=args.log_rotate_when,
+        queue_size=args.log_queue_size,
+        multiprocess=multiprocess
+    )
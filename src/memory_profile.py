@@ -0,0 +1,74 @@
+"""Print how much memory each stage needs for documents of growing length.
+
+Each document is made of the first N sentences of a text, repeated as often as needed, and is
+simplified with memory profiling on (see src.metrics). For every stage the table shows the
+high-water mark of traced memory above its level at the start of the stage. The last columns show
+what the stages left allocated, the RSS of the process after the document and how much it grew
+while simplifying it. The peak RSS of the process is printed at the end.
+
+Usage: py -m src.memory_profile --sizes 1 10 100 500 [--text-file sample.txt]
+"""
+
+import argparse
+
+from .indo_ts import TextSimplifier
+from .metrics import STAGES
+
+SAMPLE_TEXT = (
+    "Presiden Joko Widodo, yang lahir di Surakarta, meresmikan jalan tol baru di Jawa Tengah. "
+    "Warga yang tinggal di dekat sungai mengatakan bahwa banjir datang setiap tahun. "
+    "Budi membeli rumah di Jakarta dan adiknya pindah ke Bandung. "
+    "Menteri Keuangan, Sri Mulyani, menyampaikan bahwa ekonomi tumbuh lima persen. "
+    "Karena hujan turun sangat deras, pertandingan sepak bola itu ditunda. "
+    "Dia mengatakan bahwa sekolah yang dibangun tahun 2010 itu akan diperbaiki."
+)
+
+def make_document(sentences: list[str], size: int) -> str:
+    return " ".join(sentences[index % len(sentences)] for index in range(size))
+
+def split_sentences(text: str) -> list[str]:
+    # Good enough for building test documents; Stanza splits the real sentences.
+    return [sentence.strip().rstrip(".") + "." for sentence in text.split(". ") if sentence.strip().rstrip(".") != ""]
+
+def format_bytes(byte_count: int | None) -> str:
+    if byte_count is None:
+        return "-"
+
+    if abs(byte_count) < 1024 * 1024:
+        return f"{byte_count / 1024:.0f}K"
+
+    return f"{byte_count / 1024 / 1024:.1f}M"
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100, 500], help="sentences per document")
+    parser.add_argument("--text-file", help="text to take the sentences from (default: a built-in sample)")
+    parser.add_argument("--strategy", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    if args.text_file is not None:
+        with open(args.text_file, mode="r", encoding="utf-8") as file:
+            text = file.read()
+    else:
+        text = SAMPLE_TEXT
+
+    sentences = split_sentences(text.replace("\n", " "))
+    simplifier = TextSimplifier(strategy=args.strategy, profile_memory=True)
+
+    print(f"{'sentences':>9} {'tokens':>7}" + "".join(f" {stage[:10]:>10}" for stage in STAGES) + f" {'retained':>9} {'RSS':>9} {'RSS grew':>9}")
+    for size in args.sizes:
+        simplifier.simplify(make_document(sentences, size))
+        document = simplifier.metrics.recent_documents[-1]
+        batch = simplifier.metrics.recent_batches[-1]
+        stages = document["stages"]
+        retained_bytes = sum(stage["retained_bytes"] for stage in stages.values())
+        print(
+            f"{document['counters']['sentences']:>9} {document['counters']['tokens']:>7}"
+            + "".join(f" {format_bytes(stages[stage]['peak_bytes']) if stage in stages else '-':>10}" for stage in STAGES)
+            + f" {format_bytes(retained_bytes):>9} {format_bytes(batch['rss_bytes']):>9} {format_bytes(batch['rss_growth_bytes']):>9}"
+        )
+
+    print(f"Peak RSS of the process: {format_bytes(simplifier.metrics.peak_rss_bytes)}")
+
+if __name__ == "__main__":
+    main()
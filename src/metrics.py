@@ -0,0 +1,272 @@
+"""Where TextSimplifier spends its time, per stage and per document, and what it did.
+
+Every stage of a document is timed with the wall clock and with process CPU time (which includes
+the threads Stanza/torch use). Counters count sentences, tokens, NPs, resolved and unresolved
+pronouns, the splits of each transformation, and the stats of the stages (evictions, cache hits).
+TextSimplifier.metrics adds up all documents and keeps the most recent ones, and can be read as a
+dict or exported as Prometheus text or JSON lines.
+
+With memory profiling (TextSimplifier(profile_memory=True), which starts tracemalloc and so slows
+everything down), every stage also records:
+- peak_bytes: the high-water mark of traced memory during the stage, above its level at the start,
+- retained_bytes: traced memory still allocated when the stage ends, above its level at the start
+  (its output, caches; negative if the stage freed more than it kept),
+- net_blocks: memory blocks allocated minus blocks freed during the stage (sys.getallocatedblocks).
+tracemalloc only sees the blocks that are allocated at a given moment, so memory allocated and
+freed again within a stage shows only through the peak; neither the total bytes allocated nor the
+number of allocations can be measured this way.
+
+Every batch records the RSS of the process after it and how much it grew during the batch (from
+/proc/self/statm, on Linux), and the peak RSS of the process so far (from getrusage, which never
+goes down).
+"""
+
+import contextlib
+import json
+import os
+import sys
+import time
+import tracemalloc
+from collections import deque
+from collections.abc import Iterator
+
+STAGES = [
+    "stanza",
+    "tagged_input",
+    "noun_chunk",
+    "grammatical_function",
+    "agreement",
+    "pronoun_resolution",
+    "relative_clause_attachment",
+    "clause_boundary",
+    "transform",
+    "detokenization"
+]
+
+class DocumentMetrics:
+    def __init__(self, profile_memory=False):
+        self.profile_memory = profile_memory
+        self.stage_wall_seconds: dict[str, float] = {}
+        self.stage_cpu_seconds: dict[str, float] = {}
+        self.stage_memory: dict[str, dict[str, int]] = {}
+        self.counters: dict[str, int] = {}
+
+    @contextlib.contextmanager
+    def time_stage(self, stage: str) -> Iterator[None]:
+        if self.profile_memory:
+            memory_start = start_memory_measurement()
+
+        start_wall_time = time.perf_counter()
+        start_cpu_time = time.process_time()
+        try:
+            yield
+        finally:
+            self.add_stage_time(stage, time.perf_counter() - start_wall_time, time.process_time() - start_cpu_time)
+            if self.profile_memory:
+                self.add_stage_memory(stage, finish_memory_measurement(memory_start))
+
+    def add_stage_time(self, stage: str, wall_seconds: float, cpu_seconds: float):
+        self.stage_wall_seconds[stage] = self.stage_wall_seconds.get(stage, 0.0) + wall_seconds
+        self.stage_cpu_seconds[stage] = self.stage_cpu_seconds.get(stage, 0.0) + cpu_seconds
+
+    def add_stage_memory(self, stage: str, memory: dict[str, int]):
+        stage_memory = self.stage_memory.setdefault(stage, {"peak_bytes": 0, "retained_bytes": 0, "net_blocks": 0})
+        stage_memory["peak_bytes"] = max(stage_memory["peak_bytes"], memory["peak_bytes"])
+        stage_memory["retained_bytes"] += memory["retained_bytes"]
+        stage_memory["net_blocks"] += memory["net_blocks"]
+
+    def share(self, document_count: int) -> "DocumentMetrics":
+        # An equal share of these stage times and retained memory, for each document of a batch.
+        # The peak is the batch's, as a peak cannot be split.
+        document_metrics = DocumentMetrics(profile_memory=self.profile_memory)
+        for stage, wall_seconds in self.stage_wall_seconds.items():
+            document_metrics.add_stage_time(stage, wall_seconds / document_count, self.stage_cpu_seconds[stage] / document_count)
+
+        for stage, memory in self.stage_memory.items():
+            document_metrics.add_stage_memory(stage, {
+                "peak_bytes": memory["peak_bytes"],
+                "retained_bytes": memory["retained_bytes"] // document_count,
+                "net_blocks": memory["net_blocks"] // document_count
+            })
+
+        return document_metrics
+
+    def count(self, counter: str, value: int = 1):
+        self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def as_dict(self) -> dict:
+        return {
+            "wall_seconds": sum(self.stage_wall_seconds.values()),
+            "cpu_seconds": sum(self.stage_cpu_seconds.values()),
+            "stages": {
+                stage: {"wall_seconds": wall_seconds, "cpu_seconds": self.stage_cpu_seconds[stage], **self.stage_memory.get(stage, {})}
+                for stage, wall_seconds in self.stage_wall_seconds.items()
+            },
+            "counters": dict(self.counters)
+        }
+
+class SimplificationMetrics:
+    """Totals over all documents, and the `recent_document_count` most recent documents."""
+
+    def __init__(self, recent_document_count=1000):
+        self.document_count = 0
+        self.failed_document_count = 0
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.stage_calls: dict[str, int] = {}
+        self.stage_wall_seconds: dict[str, float] = {}
+        self.stage_cpu_seconds: dict[str, float] = {}
+        self.counters: dict[str, int] = {}
+        self.stage_max_peak_bytes: dict[str, int] = {}
+        self.stage_retained_bytes: dict[str, int] = {}
+        self.stage_net_blocks: dict[str, int] = {}
+        self.rss_bytes: int | None = None
+        self.peak_rss_bytes: int | None = None
+        self.recent_documents: deque[dict] = deque(maxlen=recent_document_count)
+        self.recent_batches: deque[dict] = deque(maxlen=recent_document_count)
+
+    def add_document(self, document_metrics: DocumentMetrics, failed=False):
+        self.document_count += 1
+        if failed:
+            self.failed_document_count += 1
+
+        for stage, wall_seconds in document_metrics.stage_wall_seconds.items():
+            cpu_seconds = document_metrics.stage_cpu_seconds[stage]
+            self.stage_calls[stage] = self.stage_calls.get(stage, 0) + 1
+            self.stage_wall_seconds[stage] = self.stage_wall_seconds.get(stage, 0.0) + wall_seconds
+            self.stage_cpu_seconds[stage] = self.stage_cpu_seconds.get(stage, 0.0) + cpu_seconds
+            self.wall_seconds += wall_seconds
+            self.cpu_seconds += cpu_seconds
+
+        for stage, memory in document_metrics.stage_memory.items():
+            self.stage_max_peak_bytes[stage] = max(self.stage_max_peak_bytes.get(stage, 0), memory["peak_bytes"])
+            self.stage_retained_bytes[stage] = self.stage_retained_bytes.get(stage, 0) + memory["retained_bytes"]
+            self.stage_net_blocks[stage] = self.stage_net_blocks.get(stage, 0) + memory["net_blocks"]
+
+        for counter, value in document_metrics.counters.items():
+            self.counters[counter] = self.counters.get(counter, 0) + value
+
+        document = document_metrics.as_dict()
+        document["failed"] = failed
+        self.recent_documents.append(document)
+
+    def add_batch(self, document_count: int, start_rss_bytes: int | None = None):
+        # Called after each batch when profiling memory, with the RSS before the batch.
+        rss_bytes = get_rss_bytes()
+        peak_rss_bytes = get_peak_rss_bytes()
+        if peak_rss_bytes is not None and rss_bytes is not None:
+            # The kernel updates the peak lazily, so it may lag behind a fresh sample.
+            peak_rss_bytes = max(peak_rss_bytes, rss_bytes)
+
+        if rss_bytes is not None:
+            self.rss_bytes = rss_bytes
+
+        if peak_rss_bytes is not None:
+            self.peak_rss_bytes = peak_rss_bytes
+
+        self.recent_batches.append({
+            "documents": document_count,
+            "rss_bytes": rss_bytes,
+            "rss_growth_bytes": rss_bytes - start_rss_bytes if rss_bytes is not None and start_rss_bytes is not None else None,
+            "peak_rss_bytes": peak_rss_bytes
+        })
+
+    def as_dict(self) -> dict:
+        stages = {}
+        for stage in sorted(self.stage_calls, key=stage_order):
+            stages[stage] = {
+                "calls": self.stage_calls[stage],
+                "wall_seconds": self.stage_wall_seconds[stage],
+                "cpu_seconds": self.stage_cpu_seconds[stage]
+            }
+            if stage in self.stage_max_peak_bytes:
+                stages[stage]["max_peak_bytes"] = self.stage_max_peak_bytes[stage]
+                stages[stage]["retained_bytes"] = self.stage_retained_bytes[stage]
+                stages[stage]["net_blocks"] = self.stage_net_blocks[stage]
+
+        return {
+            "documents": self.document_count,
+            "failed_documents": self.failed_document_count,
+            "wall_seconds": self.wall_seconds,
+            "cpu_seconds": self.cpu_seconds,
+            "rss_bytes": self.rss_bytes,
+            "peak_rss_bytes": self.peak_rss_bytes,
+            "stages": stages,
+            "counters": dict(sorted(self.counters.items()))
+        }
+
+    def to_prometheus(self, prefix="indo_ts") -> str:
+        # Prometheus text exposition format
+        lines: list[str] = []
+
+        def add_metric(name: str, description: str, samples: list[tuple[str, float]], metric_type="counter"):
+            lines.append(f"# HELP {prefix}_{name} {description}")
+            lines.append(f"# TYPE {prefix}_{name} {metric_type}")
+            for labels, value in samples:
+                lines.append(f"{prefix}_{name}{labels} {value!r}")
+
+        stages = sorted(self.stage_calls, key=stage_order)
+        add_metric("documents_total", "Documents simplified.", [("", self.document_count)])
+        add_metric("failed_documents_total", "Documents that failed.", [("", self.failed_document_count)])
+        add_metric("document_wall_seconds_total", "Wall time spent on documents.", [("", self.wall_seconds)])
+        add_metric("document_cpu_seconds_total", "Process CPU time spent on documents.", [("", self.cpu_seconds)])
+        add_metric("stage_calls_total", "Documents that went through each stage.", [(f'{{stage="{stage}"}}', self.stage_calls[stage]) for stage in stages])
+        add_metric("stage_wall_seconds_total", "Wall time spent in each stage.", [(f'{{stage="{stage}"}}', self.stage_wall_seconds[stage]) for stage in stages])
+        add_metric("stage_cpu_seconds_total", "Process CPU time spent in each stage.", [(f'{{stage="{stage}"}}', self.stage_cpu_seconds[stage]) for stage in stages])
+        if len(self.stage_max_peak_bytes) > 0:
+            memory_stages = sorted(self.stage_max_peak_bytes, key=stage_order)
+            add_metric("stage_max_peak_bytes", "Highest high-water mark of traced memory in each stage, for one document or batch.", [(f'{{stage="{stage}"}}', self.stage_max_peak_bytes[stage]) for stage in memory_stages], metric_type="gauge")
+            add_metric("stage_retained_bytes", "Traced memory left allocated by each stage, negative if it freed more than it kept.", [(f'{{stage="{stage}"}}', self.stage_retained_bytes[stage]) for stage in memory_stages], metric_type="gauge")
+            add_metric("stage_net_blocks", "Memory blocks allocated minus blocks freed by each stage.", [(f'{{stage="{stage}"}}', self.stage_net_blocks[stage]) for stage in memory_stages], metric_type="gauge")
+
+        if self.rss_bytes is not None:
+            add_metric("rss_bytes", "Resident set size of the process after the last batch.", [("", self.rss_bytes)], metric_type="gauge")
+
+        if self.peak_rss_bytes is not None:
+            add_metric("peak_rss_bytes", "Peak resident set size of the process so far.", [("", self.peak_rss_bytes)], metric_type="gauge")
+
+        for counter, value in sorted(self.counters.items()):
+            add_metric(f"{counter}_total", f"Sum of the {counter} counter over all documents.", [("", value)])
+
+        return "\n".join(lines) + "\n"
+
+    def to_json_lines(self) -> str:
+        # One line per recent document, oldest first.
+        return "".join(json.dumps(document) + "\n" for document in self.recent_documents)
+
+def start_memory_measurement() -> tuple[int, int]:
+    tracemalloc.reset_peak()
+    current_bytes, _ = tracemalloc.get_traced_memory()
+    return (current_bytes, sys.getallocatedblocks())
+
+def finish_memory_measurement(memory_start: tuple[int, int]) -> dict[str, int]:
+    start_bytes, start_blocks = memory_start
+    current_bytes, peak_bytes = tracemalloc.get_traced_memory()
+    return {
+        "peak_bytes": peak_bytes - start_bytes,
+        "retained_bytes": current_bytes - start_bytes,
+        "net_blocks": sys.getallocatedblocks() - start_blocks
+    }
+
+def get_rss_bytes() -> int | None:
+    # The current RSS; None where there is no /proc (other than Linux)
+    try:
+        with open("/proc/self/statm", mode="r") as file:
+            resident_pages = int(file.read().split()[1])
+    except OSError:
+        return None
+
+    return resident_pages * os.sysconf("SC_PAGE_SIZE")
+
+def get_peak_rss_bytes() -> int | None:
+    # The peak RSS of the process so far; None where the resource module is missing (Windows)
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak_rss if sys.platform == "darwin" else peak_rss * 1024 # Kilobytes, except on macOS
+
+def stage_order(stage: str) -> tuple[int, str]:
+    return (STAGES.index(stage) if stage in STAGES else len(STAGES), stage)
@@ -1,6 +1,10 @@
 import logging
 from nltk import Tree
 import re
+from .node import NodeRecord
+from .utils import get_surface_text
+
+logger = logging.getLogger(__name__)
 
 MASCULINE_TITLES = ["tuan", "pangeran", "raja", "kaisar", "bapak", "pak"]
 FEMININE_TITLES = ["nyonya", "nona", "ratu", "permaisuri", "ibu", "bu"]
@@ -74,37 +78,88 @@ PLACE_TIME_KEYWORD_LIST = [
     "lusa"
 ]
 
-def extract_agreements_from_head_noun(tree_list: list[Tree]) -> list[Tree]:
-    new_tree_list: list[Tree] = []
-    for tree in tree_list:
-        subtrees: list[Tree] = [subtree for subtree in tree]
-        for subtree in subtrees:
-            if subtree.label().startswith("NP"):
-                head_noun = get_head_noun(subtree)
-                head_noun_feats = head_noun.label().split(";")[1]
+TITLE_WORDS = MASCULINE_TITLES + FEMININE_TITLES + COMMON_TITLES + COMPANY_KEYWORDS
+
+def load_lexicon(file_path: str) -> list[str]:
+    # One entry per line; blank lines and lines starting with "#" are skipped.
+    with open(file_path, mode="r", encoding="utf-8") as file:
+        return [
+            line.strip()
+            for line in file
+            if line.strip() != "" and not line.strip().startswith("#")
+        ]
+
+def compile_keyword_pattern(keywords: list[str]) -> re.Pattern:
+    # Same matches as trying re.search(rf"\b{keyword}\b", text, re.IGNORECASE) for each keyword,
+    # but in one scan: the keywords are merged into a trie-shaped alternation, so a longer
+    # gazetteer adds branches instead of whole extra searches.
+    trie: dict = {}
+    for keyword in keywords:
+        node = trie
+        for character in keyword:
+            node = node.setdefault(character, {})
+
+        node[""] = {}
+
+    def trie_to_pattern(node: dict) -> str:
+        branches = [re.escape(character) + trie_to_pattern(child) for character, child in node.items() if character != ""]
+        if len(branches) == 0:
+            return ""
+
+        pattern = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            return f"(?:{pattern})?"
+
+        return pattern
 
-                for place_time_keyword in PLACE_TIME_KEYWORD_LIST:
-                    if re.search(rf"\b{place_time_keyword}\b", " ".join(subtree.leaves()), re.IGNORECASE):
-                        if head_noun_feats != "":
-                            head_noun_feats += "|"
-                        head_noun_feats += "LocationTime=Yes"
+    if len(trie) == 0:
+        return re.compile(r"(?!)") # Matches nothing
 
-                        break
+    return re.compile(rf"\b{trie_to_pattern(trie)}\b", re.IGNORECASE)
+
+def init_agreement_pipeline(place_time_keywords: list[str] = PLACE_TIME_KEYWORD_LIST, title_words: list[str] = TITLE_WORDS):
+    place_time_pattern = compile_keyword_pattern(place_time_keywords)
+    title_word_set = frozenset(title_words)
+
+    def agreement_process(tree_list: list[Tree]) -> list[Tree]:
+        return extract_agreements_from_head_noun(tree_list, place_time_pattern=place_time_pattern, title_words=title_word_set)
+
+    return agreement_process
+
+_DEFAULT_PLACE_TIME_PATTERN = compile_keyword_pattern(PLACE_TIME_KEYWORD_LIST)
+_DEFAULT_TITLE_WORDS = frozenset(TITLE_WORDS)
+
+def extract_agreements_from_head_noun(tree_list: list[Tree], place_time_pattern: re.Pattern | None = None, title_words: frozenset[str] | None = None) -> list[Tree]:
+    # Annotates the trees in place and returns the same list.
+    if place_time_pattern is None:
+        place_time_pattern = _DEFAULT_PLACE_TIME_PATTERN
+
+    if title_words is None:
+        title_words = _DEFAULT_TITLE_WORDS
+
+    for tree in tree_list:
+        for subtree in tree:
+            if subtree.label().tag == "NP":
+                head_noun = get_head_noun(subtree, title_words=title_words)
+                head_noun_feats = dict(head_noun.label().feats)
+                if place_time_pattern.search(get_surface_text(subtree)):
+                    head_noun_feats["LocationTime"] = "Yes"
 
-                subtree.set_label(subtree.label() + f";{head_noun_feats}")
+                subtree.label().agreements = head_noun_feats
 
             # else: no modification
 
-        new_tree_list.append(Tree(tree.label(), subtrees))
+    return tree_list
 
-    return new_tree_list
+def get_head_noun(subtree: Tree, title_words: frozenset[str] | None = None) -> Tree:
+    if title_words is None:
+        title_words = _DEFAULT_TITLE_WORDS
 
-def get_head_noun(subtree: Tree) -> Tree:
     head_noun = None
     possibly_title_head_noun = None
     for word in subtree:
-        if any([word.label().startswith(noun_tag) for noun_tag in ["NOUN", "PROPN", "PRON"]]):
-            if (possibly_title_head_noun is None) and word[0].lower() in (MASCULINE_TITLES + FEMININE_TITLES + COMMON_TITLES + COMPANY_KEYWORDS):
+        if word.label().tag in ["NOUN", "PROPN", "PRON"]:
+            if (possibly_title_head_noun is None) and word[0].lower() in title_words:
                 possibly_title_head_noun = word
             else:
                 head_noun = word
@@ -118,14 +173,14 @@ def get_head_noun(subtree: Tree) -> Tree:
     
     return head_noun
 
-def is_unification_possible(subtree_label, np_agreement_list):
+def is_unification_possible(subtree_label: NodeRecord, np_agreements: dict[str, str]):
     unification_possible = True
-    for np_agreement in np_agreement_list:
-        np_agreement_type, _ = np_agreement.split("=")
-        logging.debug(f"Checking {np_agreement=}")
-        if f"{np_agreement_type}=" in subtree_label:
-            if np_agreement not in subtree_label:
-                logging.debug(f"{np_agreement=} conflicts with {subtree_label=}")
+    for np_agreement_type, np_agreement_value in np_agreements.items():
+        logger.debug("Checking %s=%s", np_agreement_type, np_agreement_value)
+        subtree_agreement_value = subtree_label.get_feature(np_agreement_type)
+        if subtree_agreement_value is not None:
+            if subtree_agreement_value != np_agreement_value:
+                logger.debug("%s=%s conflicts with %s", np_agreement_type, np_agreement_value, subtree_label)
                 unification_possible = False
 
         if not unification_possible:
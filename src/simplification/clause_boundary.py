@@ -2,11 +2,29 @@ import logging
 from nltk import Tree
 from .agreement import is_unification_possible
 from .grammatical_function import is_subject
+from .node import NodeRecord
+from .sentence_index import (
+    COMMA,
+    NP_OR_RELATIVE,
+    PERIOD,
+    RELATIVE_PRONOUN,
+    SUBJECT,
+    VALID_CONJUNCTION,
+    get_sentence_index,
+    lowercase_word_kind,
+    not_tag_kind,
+    not_word_kind,
+    tag_kind,
+    word_kind
+)
 
 from .resolve_third_person_pronouns import get_salience
+from .trace import trace_decision
+
+logger = logging.getLogger(__name__)
 
 def extract_boundaries(tree_list: list[Tree], strategy=1):
-    logging.info("Relative clause boundary starts.")
+    logger.info("Relative clause boundary starts.")
 
     new_tree_list: list[Tree] = []
     for tree in tree_list:
@@ -21,9 +39,14 @@ def extract_boundaries_for_single_tree(initial_tree: Tree, start_index: int, str
     tree = initial_tree
     subtree_index = start_index
     while subtree_index < len(tree):
-        logging.debug(f"Checking {tree[subtree_index]}")
+        # Only NPs and relative pronouns start a structure, so skip to the next one.
+        subtree_index = get_sentence_index(tree).next(NP_OR_RELATIVE, subtree_index)
+        if subtree_index == len(tree):
+            break
 
-        if tree[subtree_index].label().startswith("NP"):
+        logger.debug("Checking %s", tree[subtree_index])
+
+        if tree[subtree_index].label().tag == "NP":
             if subtree_index > 0 and tree[subtree_index - 1, 0] == ",":
                 new_tree, stop_index = extract_appositive_structure(tree, subtree_index, strategy=strategy)
                 if stop_index != -1:
@@ -35,7 +58,7 @@ def extract_boundaries_for_single_tree(initial_tree: Tree, start_index: int, str
             else:
                 subtree_index += 1
 
-        elif "PronType=Rel" in tree[subtree_index].label():
+        elif tree[subtree_index].label().has_feature("PronType", "Rel"):
             if subtree_index > 0 and tree[subtree_index - 1, 0] != ",":
                 new_tree, stop_index = extract_restrictive_relative_clause_structure(tree, subtree_index)
                 if stop_index != -1:
@@ -67,29 +90,33 @@ def extract_boundaries_for_single_tree(initial_tree: Tree, start_index: int, str
 def extract_appositive_structure(tree: Tree, start_index: int, strategy=1) -> tuple[Tree, int]:
     new_tree, boundary_index = detect_appositive_boundary(tree, start_index, keep_structure=False, strategy=strategy)
     if boundary_index == -1:
-        logging.info("End extract_appositive_structure because no boundary (index: -1)")
+        logger.info("End extract_appositive_structure because no boundary (index: -1)")
+        trace_decision("appositive", tree, start_index, "not extracted", "no boundary (index: -1)")
         return (tree, -1)
     
     clause_tree = Tree(
-        node="SIMP-APPOS",
+        node=NodeRecord("SIMP-APPOS"),
         children=new_tree[start_index:boundary_index]
     )
 
     # Do not simplify for one-or-two words appositive
     if len(clause_tree.leaves()) <= 2:
-        logging.info("End extract_appositive_structure because few words")
+        logger.info("End extract_appositive_structure because few words")
+        trace_decision("appositive", tree, start_index, "not extracted", "few words")
         return (new_tree, boundary_index)
     
     # Do not simplify for appositive that following "and" before verb or EOS.
-    check_index = start_index + 1
-
-    while check_index < len(new_tree) and not (new_tree[check_index].label().startswith("VERB") or new_tree[check_index, 0] == "." or new_tree[check_index, 0] in ["dan", "atau"]):
-        check_index += 1
+    sentence_index = get_sentence_index(new_tree)
+    check_index = min(
+        sentence_index.next(tag_kind("VERB"), start_index + 1),
+        sentence_index.next(word_kind(".", "dan", "atau"), start_index + 1)
+    )
 
     # EOS, or new_tree[check_index] is verb, period, or and.
 
     if check_index < len(new_tree) and new_tree[check_index, 0] in ["dan", "atau"]:
-        logging.info("End extract_appositive_structure because dan/atau exists")
+        logger.info("End extract_appositive_structure because dan/atau exists")
+        trace_decision("appositive", tree, start_index, "not extracted", "dan/atau exists")
         return (new_tree, boundary_index)
     
     # Find the attachment
@@ -97,12 +124,12 @@ def extract_appositive_structure(tree: Tree, start_index: int, strategy=1) -> tu
     check_index = start_index - 2
 
     # Find trailing prep phrase, if any
-    while check_index >= 2 and new_tree[check_index].label().startswith("NP") and new_tree[check_index - 1].label().startswith("ADP"):
+    while check_index >= 2 and new_tree[check_index].label().tag == "NP" and new_tree[check_index - 1].label().tag == "ADP":
         referred_candidates.append(new_tree[check_index])
         check_index -= 2
 
-    # check_index < 2 or not (new_tree[check_index].label().startswith("NP") and new_tree[check_index - 1].label().startswith("ADP"))
-    if new_tree[check_index].label().startswith("NP"):
+    # check_index < 2 or not (new_tree[check_index].label().tag == "NP" and new_tree[check_index - 1].label().tag == "ADP")
+    if new_tree[check_index].label().tag == "NP":
         referred_candidates.append(new_tree[check_index])
 
     appositive_np = new_tree[start_index]
@@ -112,34 +139,29 @@ def extract_appositive_structure(tree: Tree, start_index: int, strategy=1) -> tu
     referred_candidates.sort(key=lambda x: get_salience(x.label()), reverse=True)
     for np in referred_candidates:
         unification_possible = True
-        _, np_id_string, _, np_agreement_list_string, *_ = np.label().split(";")
-        np_id = np_id_string[3:]
+        np_label = np.label()
+        np_id = np_label.np_id
 
-        logging.debug(f"Agreement filtering: {np_agreement_list_string=}")
-        if np_agreement_list_string != "":
-            np_agreement_list = np_agreement_list_string.split("|")
-            unification_possible = is_unification_possible(appositive_np_label, np_agreement_list)
+        logger.debug("Agreement filtering: np_label.agreements=%r", np_label.agreements)
+        if len(np_label.agreements) > 0:
+            unification_possible = is_unification_possible(appositive_np_label, np_label.agreements)
 
         if unification_possible:
-            # NP;id=0;gfunc=SUBJ;<agreements>;coref
-            splitted_appositive_np_labels = appositive_np_label.split(";")
-            if len(splitted_appositive_np_labels) != 5:
-                splitted_appositive_np_labels.append(f"coref={np_id}")
-            elif splitted_appositive_np_labels[4] != f"coref={np_id}":
-                splitted_appositive_np_labels[4] = "coref=-2" # Multi referring
+            if appositive_np_label.coref is None:
+                appositive_np_label.coref = np_id
+            elif appositive_np_label.coref != np_id:
+                appositive_np_label.coref = -2 # Multi referring
             # else: ignore
-            appositive_np.set_label(";".join(splitted_appositive_np_labels))
 
             referred = np
             break
 
     if referred is None:
-        splitted_appositive_np_labels = appositive_np_label.split(";")
-        if len(splitted_appositive_np_labels) != 5:
-            splitted_appositive_np_labels.append(f"coref=-1")
+        if appositive_np_label.coref is None:
+            appositive_np_label.coref = -1
         # else: ignore
 
-        appositive_np.set_label(";".join(splitted_appositive_np_labels))
+    trace_decision("appositive", tree, start_index, "extracted", "SIMP-APPOS", boundary=boundary_index, coref=appositive_np_label.coref)
 
     extracted_tree = Tree(
         node=new_tree.label(),
@@ -148,46 +170,95 @@ def extract_appositive_structure(tree: Tree, start_index: int, strategy=1) -> tu
 
     return (extracted_tree, start_index + 1)
 
+def appositive_boundary_cache_info(tree_list: list[Tree]) -> dict[str, int]:
+    # Lookups of the appositive boundary cache made for these sentences so far, by relative clause
+    # attachment and clause boundary extraction. The counts are kept on the sentence indexes, so
+    # documents simplified at the same time in other threads do not add to them.
+    counts = {"hits": 0, "misses": 0}
+    for tree in tree_list:
+        sentence_index = tree.label().sentence_index
+        if sentence_index is not None:
+            for key, value in sentence_index.appositive_boundary_cache_counts.items():
+                counts[key] += value
+
+    return counts
+
 def detect_appositive_boundary(tree: Tree, start_index: int, keep_structure=True, strategy=1):
     """Detect appostive boundary. Return -1 if it is not appositive.
     
     """
-    logging.info(f"Start detect_appositive_boundary")
-    logging.info(f"Tree: {tree}")
-    logging.info(f"Start pointer: index={start_index}, node={tree[start_index]}")
+    new_tree, boundary_index, _ = find_appositive_boundary(tree, start_index, keep_structure=keep_structure, strategy=strategy)
+    return (new_tree, boundary_index)
+
+def find_appositive_boundary(tree: Tree, start_index: int, keep_structure=True, strategy=1) -> tuple[Tree, int, bool]:
+    # Like detect_appositive_boundary, but also tells whether the boundary was found without
+    # reaching a relative clause. Only then does keep_structure not matter: the tree is not changed
+    # and the boundary is the same either way.
+    #
+    # Boundaries are cached on the sentence index of the tree, by (start index, strategy), so a
+    # start position is analysed once per tree however many candidates (relative clause
+    # attachment) or stages (clause boundary extraction) ask. A boundary that depends on
+    # keep_structure is only reused with keep_structure=True.
+    sentence_index = get_sentence_index(tree)
+    boundaries = sentence_index.appositive_boundaries
+    cache_counts = sentence_index.appositive_boundary_cache_counts
+    key = (start_index, strategy)
+    cached = boundaries.get(key)
+    if cached is not None:
+        boundary_index, structure_independent = cached
+        if keep_structure or structure_independent:
+            cache_counts["hits"] += 1
+            trace_decision("appositive", tree, start_index, "cached", "boundary found before", boundary=boundary_index)
+            return (tree, boundary_index, structure_independent)
+
+    cache_counts["misses"] += 1
+    new_tree, boundary_index, structure_independent = analyse_appositive_boundary(tree, start_index, keep_structure=keep_structure, strategy=strategy)
+    if keep_structure or structure_independent:
+        boundaries[key] = (boundary_index, structure_independent)
+
+    return (new_tree, boundary_index, structure_independent)
+
+def analyse_appositive_boundary(tree: Tree, start_index: int, keep_structure=True, strategy=1) -> tuple[Tree, int, bool]:
+    logger.info("Start detect_appositive_boundary")
+    logger.info("Tree: %s", tree)
+    logger.info("Start pointer: index=%s, node=%s", start_index, tree[start_index])
 
     index = start_index
     if index == 0 or tree[index - 1, 0] != ",":
-        logging.info(f"End detect_appositive_boundary (expect previous token is comma)")
-        return (tree, -1)
+        logger.info("End detect_appositive_boundary (expect previous token is comma)")
+        trace_decision("appositive", tree, start_index, "not appositive", "expect previous token is comma")
+        return (tree, -1, True)
     
-    elif not tree[index].label().startswith("NP"):
-        logging.info(f"End detect_appositive_boundary (expect NP as first element)")
-        return (tree, -1)
-
-    elif strategy == 5 and "LocationTime=Yes" in tree[index].label():
-        logging.info(f"End detect_appositive_boundary (expect non-location NP)")
-        return (tree, -1)
+    elif tree[index].label().tag != "NP":
+        logger.info("End detect_appositive_boundary (expect NP as first element)")
+        trace_decision("appositive", tree, start_index, "not appositive", "expect NP as first element")
+        return (tree, -1, True)
+
+    elif strategy == 5 and tree[index].label().has_feature("LocationTime", "Yes"):
+        logger.info("End detect_appositive_boundary (expect non-location NP)")
+        trace_decision("appositive", tree, start_index, "not appositive", "expect non-location NP")
+        return (tree, -1, True)
     
     index += 1
     finding_repeated_prep_phrases = True
     mismatch = False
     while index < len(tree) and finding_repeated_prep_phrases:
-        if tree[index].label().startswith("ADP"):
-            if index < len(tree) - 1 and tree[index + 1].label().startswith("NP"):
+        if tree[index].label().tag == "ADP":
+            if index < len(tree) - 1 and tree[index + 1].label().tag == "NP":
                 index += 2
             else:
-                logging.info(f"End detect_appositive_boundary (expect NP after ADP)")
+                logger.info("End detect_appositive_boundary (expect NP after ADP)")
+                trace_decision("appositive", tree, start_index, "not appositive", "expect NP after ADP")
                 mismatch = True
                 finding_repeated_prep_phrases = False
 
-        elif tree[index].label().startswith("PRON") and "PronType=Rel" in tree[index].label():
+        elif tree[index].label().tag == "PRON" and tree[index].label().has_feature("PronType", "Rel"):
             finding_repeated_prep_phrases = False
         
         elif tree[index, 0] in [",", "."]:
             finding_repeated_prep_phrases = False
         
-        elif strategy in [4, 5] and tree[index].label().startswith("VERB"):
+        elif strategy in [4, 5] and tree[index].label().tag == "VERB":
             finding_repeated_prep_phrases = False
 
         else:
@@ -195,9 +266,12 @@ def detect_appositive_boundary(tree: Tree, start_index: int, keep_structure=True
             finding_repeated_prep_phrases = False
 
     if mismatch or index >= len(tree):
-        return (tree, -1)
+        trace_decision("appositive", tree, start_index, "not appositive", "expect prepositional phrases, then comma, period or relative pronoun")
+        return (tree, -1, True)
     
-    if tree[index].label().startswith("PRON") and "PronType=Rel" in tree[index].label():
+    structure_independent = True
+    if tree[index].label().tag == "PRON" and tree[index].label().has_feature("PronType", "Rel"):
+        structure_independent = False
         if keep_structure:
             new_tree, boundary_index = detect_restrictive_relative_clause_boundary(tree, index, keep_structure=keep_structure)
             if boundary_index != -1:
@@ -210,45 +284,57 @@ def detect_appositive_boundary(tree: Tree, start_index: int, keep_structure=True
                 index = boundary_index
 
     if index == len(tree):
-        logging.info(f"End detect_appositive_boundary")
-        return (tree, index)
+        logger.info("End detect_appositive_boundary")
+        trace_decision("appositive", tree, start_index, "appositive", "ends at end of sentence", boundary=index)
+        return (tree, index, structure_independent)
     
     elif tree[index, 0] == ".":
-        logging.info(f"End detect_appositive_boundary")
-        return (tree, index)
+        logger.info("End detect_appositive_boundary")
+        trace_decision("appositive", tree, start_index, "appositive", "ends at period", boundary=index)
+        return (tree, index, structure_independent)
     
-    elif strategy in [4, 5] and tree[index].label().startswith("VERB"):
-        logging.info(f"End detect_appositive_boundary")
-        return (tree, index)
+    elif strategy in [4, 5] and tree[index].label().tag == "VERB":
+        logger.info("End detect_appositive_boundary")
+        trace_decision("appositive", tree, start_index, "appositive", "ends at verb", boundary=index)
+        return (tree, index, structure_independent)
     
     elif tree[index, 0] == ",":
-        new_tree, boundary_index = detect_appositive_boundary(tree, index + 1, keep_structure=keep_structure, strategy=strategy)
-        logging.info(f"End detect_appositive_boundary")
+        new_tree, boundary_index, rest_structure_independent = find_appositive_boundary(tree, index + 1, keep_structure=keep_structure, strategy=strategy)
+        logger.info("End detect_appositive_boundary")
 
+        structure_independent = structure_independent and rest_structure_independent
         if boundary_index == -1:
-            return (tree, index)
-        elif keep_structure:
-            return (tree, boundary_index)
+            trace_decision("appositive", tree, start_index, "appositive", "ends at comma", boundary=index)
+            return (tree, index, structure_independent)
+
+        trace_decision("appositive", tree, start_index, "appositive", "followed by another appositive", boundary=boundary_index)
+        if keep_structure:
+            return (tree, boundary_index, structure_independent)
         else:
-            return (new_tree, boundary_index)
+            return (new_tree, boundary_index, structure_independent)
     
     else:
-        logging.info(f"End detect_appositive_boundary")
-        return (tree, -1)
+        logger.info("End detect_appositive_boundary")
+        trace_decision("appositive", tree, start_index, "not appositive", "expect comma, period or verb after the appositive")
+        return (tree, -1, structure_independent)
 
 def detect_restrictive_relative_clause_boundary(tree: Tree, start_index: int, predefined_stop_index: int | None = None, keep_structure=True) -> tuple[Tree, int]:
     """Detect relative clause boundary in restrictive case. Return -1 if it is not appositive.
     
     """
     
-    logging.info(f"Start detect_restrictive_relative_clause_boundary")
-    logging.info(f"Tree: {tree}")
-    logging.info(f"Start pointer: index={start_index}, node={tree[start_index]}")
-    logging.info(f"Stop pointer: {'-' if predefined_stop_index is None else f'index={predefined_stop_index}, node={tree[predefined_stop_index]}'}")
+    logger.info("Start detect_restrictive_relative_clause_boundary")
+    logger.info("Tree: %s", tree)
+    logger.info("Start pointer: index=%s, node=%s", start_index, tree[start_index])
+    if predefined_stop_index is None:
+        logger.info("Stop pointer: -")
+    else:
+        logger.info("Stop pointer: index=%s, node=%s", predefined_stop_index, tree[predefined_stop_index])
 
 
-    if not (tree[start_index].label().startswith("PRON") and "PronType=Rel" in tree[start_index].label()):
-        logging.info(f"End detect_restrictive_relative_clause_boundary (not starts with relative pronoun)")
+    if not (tree[start_index].label().tag == "PRON" and tree[start_index].label().has_feature("PronType", "Rel")):
+        logger.info("End detect_restrictive_relative_clause_boundary (not starts with relative pronoun)")
+        trace_decision("restrictive relative clause", tree, start_index, "not a relative clause", "not starts with relative pronoun")
         return (tree, -1)
 
     index = start_index + 1
@@ -257,33 +343,34 @@ def detect_restrictive_relative_clause_boundary(tree: Tree, start_index: int, pr
     else:
         stop_index = predefined_stop_index
 
+    sentence_index = get_sentence_index(tree)
+
     # Step 1
     if index < len(tree) and tree[index, 0] == ",":
-        index += 1
-        while index < len(tree) and (not tree[index, 0] == ","):
-            index += 1
+        index = sentence_index.next(COMMA, index + 1)
 
         if index == len(tree):
-            logging.info(f"End detect_restrictive_relative_clause_boundary (fail to satisfy step 1)")
+            logger.info("End detect_restrictive_relative_clause_boundary (fail to satisfy step 1)")
+            trace_decision("restrictive relative clause", tree, start_index, "not a relative clause", "fail to satisfy step 1")
             return (tree, -1)
 
-    logging.info(f"Pointer after step 1: {index=}, node{tree[index] if index < len(tree) else 'EOS'}")
+    logger.info("Pointer after step 1: index=%r, node=%s", index, tree[index] if index < len(tree) else 'EOS')
 
     # Step 2
     verb_group_contains_saying_verb = False
     SAYING_VERB_WORDS = ["katakan", "kata", "mengatakan", "berkata", "dikatakan", "sampaikan", "menyampaikan", "disampaikan", "ucapkan", "ucap", "mengucapkan", "diucapkan"]
 
     # Find start of verb group
-    while index < len(tree) and (not tree[index].label().startswith("VERB")):
-        index += 1
+    index = sentence_index.next(tag_kind("VERB"), index)
 
     if index == len(tree):
-        logging.info(f"End detect_restrictive_relative_clause_boundary (fail to find verb group in step 2)")
+        logger.info("End detect_restrictive_relative_clause_boundary (fail to find verb group in step 2)")
+        trace_decision("restrictive relative clause", tree, start_index, "not a relative clause", "fail to find verb group in step 2")
         return (tree, -1)
 
     # Find end of verb group
-    while index < len(tree) and (tree[index].label().startswith("VERB")):
-        if tree[index].label().startswith("VERB") and tree[index, 0].lower() in SAYING_VERB_WORDS:
+    while index < len(tree) and (tree[index].label().tag == "VERB"):
+        if tree[index].label().tag == "VERB" and tree[index, 0].lower() in SAYING_VERB_WORDS:
             verb_group_contains_saying_verb = True
         index += 1
 
@@ -291,40 +378,40 @@ def detect_restrictive_relative_clause_boundary(tree: Tree, start_index: int, pr
     COMPLEMENTIZER_WORDS = ["bahwa", "agar", "sebab", "karena", "meskipun", "meski"]
 
     # Find noun group
-    while index < len(tree) and (not tree[index].label().startswith("NP")):
-        if tree[index, 0].lower() in COMPLEMENTIZER_WORDS:
-            complementizer_encountered = True
-        index += 1
+    np_index = sentence_index.next(tag_kind("NP"), index)
+    if sentence_index.next(lowercase_word_kind(*COMPLEMENTIZER_WORDS), index) < np_index:
+        complementizer_encountered = True
+
+    index = np_index
 
     if index == len(tree):
-        logging.info(f"End detect_restrictive_relative_clause_boundary (fail to find noun group [NP])")
+        logger.info("End detect_restrictive_relative_clause_boundary (fail to find noun group [NP])")
+        trace_decision("restrictive relative clause", tree, start_index, "not a relative clause", "fail to find noun group [NP]")
         return (tree, -1)
 
     # Pass noun group
     index += 1
 
     if index < len(tree):
-        logging.info(f"Pointer after step 2: {index=}, node{tree[index] if index < len(tree) else 'EOS'}")
+        logger.info("Pointer after step 2: index=%r, node=%s", index, tree[index] if index < len(tree) else 'EOS')
     else:
-        logging.info(f"Pointer after step 2: {index=}, EOS")
+        logger.info("Pointer after step 2: index=%r, EOS", index)
 
     # Step 3
     if complementizer_encountered or verb_group_contains_saying_verb:
         # Find start of verb group
-        while index < len(tree) and (not tree[index].label().startswith("VERB")):
-            index += 1
+        index = sentence_index.next(tag_kind("VERB"), index)
 
         # Find end of verb group
-        while index < len(tree) and (tree[index].label().startswith("VERB")):
-            index += 1
+        index = sentence_index.next(not_tag_kind("VERB"), index)
 
     if index < len(tree):
-        logging.info(f"Pointer after step 3: {index=}, node{tree[index] if index < len(tree) else 'EOS'}")
+        logger.info("Pointer after step 3: index=%r, node=%s", index, tree[index] if index < len(tree) else 'EOS')
     else:
-        logging.info(f"Pointer after step 3: {index=}, EOS")
+        logger.info("Pointer after step 3: index=%r, EOS", index)
 
     # Step 4
-    logging.info(f"Step 4.c will be skipped because there is no equivalent of VBG and VBN in Indonesia language.")
+    logger.info("Step 4.c will be skipped because there is no equivalent of VBG and VBN in Indonesia language.")
 
     end_clause = False
     mismatch = False
@@ -332,20 +419,24 @@ def detect_restrictive_relative_clause_boundary(tree: Tree, start_index: int, pr
         # Specific to step 4
         # Find next_index
         prev_index = index
-        while index < len(tree) and not (tree[index, 0] in [",", ":", ";"] or tree[index].label().startswith("VERB") or (tree[index].label().startswith("PRON") and "PronType=Rel" in tree[index].label())):
-            index += 1
+        sentence_index = get_sentence_index(tree) # The tree may have changed in the previous iteration
+        index = min(
+            sentence_index.next(word_kind(",", ":", ";"), index),
+            sentence_index.next(tag_kind("VERB"), index),
+            sentence_index.next(RELATIVE_PRONOUN, index)
+        )
 
         # Saya pergi ke tempat yang diminati orang dan yang diinginkan kakak saya pada hari ini.
         # Saya pergi ke tempat yang diminati orang dan diinginkan kakak saya pada hari ini.
 
         step_4_occured = False
         if index < len(tree):
-            logging.debug(f"{index=}, node={tree[index]}")
+            logger.debug("index=%r, node=%s", index, tree[index])
 
             # Step 4.a
             if tree[index, 0] in [":", ";"] or index == stop_index:
                 end_clause = True
-                logging.info(f"End clause because of step 4.a.")
+                logger.info("End clause because of step 4.a.")
                 step_4_occured = True
 
             if not step_4_occured:
@@ -355,17 +446,17 @@ def detect_restrictive_relative_clause_boundary(tree: Tree, start_index: int, pr
                         new_tree, boundary_index = detect_appositive_boundary(tree, index + 1, keep_structure=keep_structure)
                         if boundary_index != -1:
                             index = boundary_index
-                            logging.info(f"Pointer after step 4.b: {index=}, node{tree[index] if index < len(tree) else 'EOS'}")
+                            logger.info("Pointer after step 4.b: index=%r, node=%s", index, tree[index] if index < len(tree) else 'EOS')
                             step_4_occured = True
 
                     else:
                         new_tree, boundary_index = extract_appositive_structure(tree, index + 1)
                         if boundary_index != -1:
-                            logging.info(f"Tree changed because of 4.b:\n{tree}")
+                            logger.info("Tree changed because of 4.b:\n%s", tree)
                             tree = new_tree
 
                             index = boundary_index
-                            logging.info(f"Pointer after step 4.b: {index=}, node{tree[index] if index < len(tree) else 'EOS'}")
+                            logger.info("Pointer after step 4.b: index=%r, node=%s", index, tree[index] if index < len(tree) else 'EOS')
                             step_4_occured = True
 
             # Step 4.c (skipped, because there is no equivalent of VBG and VBN)
@@ -374,21 +465,21 @@ def detect_restrictive_relative_clause_boundary(tree: Tree, start_index: int, pr
                 # Step 4.d (ADV is not tested yet.)
                 if is_comma_for_implicit_conjunction_of_adjectives_or_adverbs(tree, index):
                     index += 2
-                    logging.info(f"Pointer after step 4.d: {index=}, node{tree[index] if index < len(tree) else 'EOS'}")
+                    logger.info("Pointer after step 4.d: index=%r, node=%s", index, tree[index] if index < len(tree) else 'EOS')
                     step_4_occured = True
 
             if not step_4_occured:
                 if tree[index, 0] == ",":
                     delete_relpron_token = True
-                    if index < len(tree) - 1 and tree[index + 1].label().startswith("PRON") and "PronType=Rel" in tree[index + 1].label():
+                    if index < len(tree) - 1 and tree[index + 1].label().tag == "PRON" and tree[index + 1].label().has_feature("PronType", "Rel"):
                         delete_relpron_token = False
-                    elif index < len(tree) - 2 and ("CCONJ" in tree[index + 1].label() or "SCONJ" in tree[index + 1].label()) and tree[index + 2].label().startswith("PRON") and "PronType=Rel" in tree[index + 2].label():
+                    elif index < len(tree) - 2 and (tree[index + 1].label().tag == "CCONJ" or tree[index + 1].label().tag == "SCONJ") and tree[index + 2].label().tag == "PRON" and tree[index + 2].label().has_feature("PronType", "Rel"):
                         delete_relpron_token = True
                     else:
                         delete_relpron_token = None
 
                     if delete_relpron_token is not None:
-                        logging.info(f"Step 4.e.i and 4.e.ii started.")
+                        logger.info("Step 4.e.i and 4.e.ii started.")
                         if keep_structure:
                             if delete_relpron_token:
                                 new_tree, boundary_index = detect_nonrestrictive_relative_clause_boundary(tree, index + 2, keep_structure=keep_structure)
@@ -396,7 +487,8 @@ def detect_restrictive_relative_clause_boundary(tree: Tree, start_index: int, pr
                                 new_tree, boundary_index = detect_nonrestrictive_relative_clause_boundary(tree, index + 1, keep_structure=keep_structure)
 
                             if boundary_index == -1:
-                                logging.info(f"End detect_restrictive_relative_clause_boundary (fail to find end of relative clause in step 4.e)")
+                                logger.info("End detect_restrictive_relative_clause_boundary (fail to find end of relative clause in step 4.e)")
+                                trace_decision("restrictive relative clause", tree, start_index, "not a relative clause", "fail to find end of relative clause in step 4.e")
                                 mismatch = True
 
                             else:
@@ -406,13 +498,14 @@ def detect_restrictive_relative_clause_boundary(tree: Tree, start_index: int, pr
                             new_tree, boundary_index = detect_nonrestrictive_relative_clause_boundary(tree, index + 2, keep_structure=keep_structure)
 
                             if boundary_index == -1:
-                                logging.info(f"End detect_restrictive_relative_clause_boundary (fail to find end of relative clause in step 4.e)")
+                                logger.info("End detect_restrictive_relative_clause_boundary (fail to find end of relative clause in step 4.e)")
+                                trace_decision("restrictive relative clause", tree, start_index, "not a relative clause", "fail to find end of relative clause in step 4.e")
                                 mismatch = True
 
                             else:
                                 tree = new_tree
                                 tree = Tree(tree.label(), tree[:index + 2] + tree[index + 3:])
-                                logging.info(f"Tree changed because of 4.e.i:\n{tree}")
+                                logger.info("Tree changed because of 4.e.i:\n%s", tree)
                                 index = boundary_index - 1
                                 stop_index -= 1
 
@@ -420,7 +513,8 @@ def detect_restrictive_relative_clause_boundary(tree: Tree, start_index: int, pr
                             new_tree, boundary_index = extract_nonrestrictive_relative_clause_structure(tree, index + 1)
 
                             if boundary_index == -1:
-                                logging.info(f"End detect_restrictive_relative_clause_boundary (fail to find end of relative clause in step 4.e)")
+                                logger.info("End detect_restrictive_relative_clause_boundary (fail to find end of relative clause in step 4.e)")
+                                trace_decision("restrictive relative clause", tree, start_index, "not a relative clause", "fail to find end of relative clause in step 4.e")
                                 mismatch = True
 
                             else:
@@ -428,20 +522,21 @@ def detect_restrictive_relative_clause_boundary(tree: Tree, start_index: int, pr
                                 index = boundary_index
                         
                         if not mismatch:
-                            logging.info(f"Pointer after step 4.e: {index=}, node{tree[index] if index < len(tree) else 'EOS'}")
+                            logger.info("Pointer after step 4.e: index=%r, node=%s", index, tree[index] if index < len(tree) else 'EOS')
                             step_4_occured = True
                 
-                elif tree[index].label().startswith("PRON") and "PronType=Rel" in tree[index].label():
-                    logging.info(f"Step 4.e.i and 4.e.iii started.")
+                elif tree[index].label().tag == "PRON" and tree[index].label().has_feature("PronType", "Rel"):
+                    logger.info("Step 4.e.i and 4.e.iii started.")
                     delete_relpron_token = False
-                    if index > 0 and ("CCONJ" in tree[index - 1].label() or "SCONJ" in tree[index - 1].label()):
+                    if index > 0 and (tree[index - 1].label().tag == "CCONJ" or tree[index - 1].label().tag == "SCONJ"):
                         delete_relpron_token = True
 
                     if keep_structure:
                         new_tree, boundary_index = detect_restrictive_relative_clause_boundary(tree, index, keep_structure=keep_structure)
 
                         if boundary_index == -1:
-                            logging.info(f"End detect_restrictive_relative_clause_boundary (fail to find end of relative clause in step 4.e)")
+                            logger.info("End detect_restrictive_relative_clause_boundary (fail to find end of relative clause in step 4.e)")
+                            trace_decision("restrictive relative clause", tree, start_index, "not a relative clause", "fail to find end of relative clause in step 4.e")
                             mismatch = True
 
                         else:
@@ -451,13 +546,14 @@ def detect_restrictive_relative_clause_boundary(tree: Tree, start_index: int, pr
                         new_tree, boundary_index = detect_restrictive_relative_clause_boundary(tree, index)
 
                         if boundary_index == -1:
-                            logging.info(f"End detect_restrictive_relative_clause_boundary (fail to find end of relative clause in step 4.e)")
+                            logger.info("End detect_restrictive_relative_clause_boundary (fail to find end of relative clause in step 4.e)")
+                            trace_decision("restrictive relative clause", tree, start_index, "not a relative clause", "fail to find end of relative clause in step 4.e")
                             mismatch = True
 
                         else:
                             tree = new_tree
                             tree = Tree(tree.label(), tree[:index] + tree[index + 1:])
-                            logging.info(f"Tree changed because of 4.e.i:\n{tree}")
+                            logger.info("Tree changed because of 4.e.i:\n%s", tree)
 
                             index = boundary_index - 1
                             stop_index -= 1
@@ -466,96 +562,95 @@ def detect_restrictive_relative_clause_boundary(tree: Tree, start_index: int, pr
                         new_tree, boundary_index = extract_restrictive_relative_clause_structure(tree, index)
 
                         if boundary_index == -1:
-                            logging.info(f"End detect_restrictive_relative_clause_boundary (fail to find end of relative clause in step 4.e)")
+                            logger.info("End detect_restrictive_relative_clause_boundary (fail to find end of relative clause in step 4.e)")
+                            trace_decision("restrictive relative clause", tree, start_index, "not a relative clause", "fail to find end of relative clause in step 4.e")
                             mismatch = True
 
                         else:
                             tree = new_tree
-                            logging.info(f"Tree changed:\n{tree}")
+                            logger.info("Tree changed:\n%s", tree)
 
                             index = boundary_index
 
                     if not mismatch:
-                        logging.info(f"Pointer after step 4.e: {index=}, node{tree[index] if index < len(tree) else 'EOS'}")
+                        logger.info("Pointer after step 4.e: index=%r, node=%s", index, tree[index] if index < len(tree) else 'EOS')
                         step_4_occured = True
 
         if not step_4_occured:
             index = prev_index
-            logging.debug(f"Step 4 not occured.")
-            logging.debug(f"{index=}, node={tree[index]}")
+            logger.debug("Step 4 not occured.")
+            logger.debug("index=%r, node=%s", index, tree[index])
             # Step 5
-            if "CCONJ" in tree[index - 1].label() or "SCONJ" in tree[index - 1].label() or (tree[index - 1].label().startswith("NP") and tree[index - 1, 0].label().startswith("PRON") and "gfunc=SUBJ" in tree[index - 1].label()):
+            if tree[index - 1].label().tag == "CCONJ" or tree[index - 1].label().tag == "SCONJ" or (tree[index - 1].label().tag == "NP" and tree[index - 1, 0].label().tag == "PRON" and tree[index - 1].label().gfunc == "SUBJ"):
                 # # Internal comma
-                while index < len(tree) and tree[index, 0] != ",":
-                    index += 1
+                index = get_sentence_index(tree).next(COMMA, index)
 
                 if index == len(tree):
-                    logging.info(f"End detect_restrictive_relative_clause_boundary (fail to find comma in step 5)")
+                    logger.info("End detect_restrictive_relative_clause_boundary (fail to find comma in step 5)")
+                    trace_decision("restrictive relative clause", tree, start_index, "not a relative clause", "fail to find comma in step 5")
                     mismatch = True
                 
                 else:
                     index += 1
-                    logging.info(f"Pointer after step 5: {index=}, node{tree[index] if index < len(tree) else 'EOS'}")
+                    logger.info("Pointer after step 5: index=%r, node=%s", index, tree[index] if index < len(tree) else 'EOS')
 
             # Step 6
             else:
                 end_clause = True
-                logging.info(f"End clause because of step 6.")
+                logger.info("End clause because of step 6.")
 
     if mismatch:
         return (tree, -1)
 
-    logging.info(f"End detect_restrictive_relative_clause_boundary")
+    logger.info("End detect_restrictive_relative_clause_boundary")
+    trace_decision("restrictive relative clause", tree, start_index, "relative clause", "", boundary=index)
     
     return (tree, index)
 
 def is_comma_for_implicit_conjunction_of_adjectives_or_adverbs(tree, index):
-    return index < len(tree) - 1 and tree[index, 0] == "," and ((tree[index - 1].label().startswith("ADJ") and tree[index + 1].label().startswith("ADJ")) or (tree[index - 1].label().startswith("ADV") and tree[index + 1].label().startswith("ADV")))
+    return index < len(tree) - 1 and tree[index, 0] == "," and ((tree[index - 1].label().tag == "ADJ" and tree[index + 1].label().tag == "ADJ") or (tree[index - 1].label().tag == "ADV" and tree[index + 1].label().tag == "ADV"))
 
 def detect_nonrestrictive_relative_clause_boundary(tree: Tree, start_index: int, keep_structure=True):
     """Detect relative clause boundary in nonrestrictive case. Return -1 if it is not relative clause.
     
     """
     
-    logging.info(f"Start detect_restrictive_relative_clause_boundary")
-    logging.info(f"Tree: {tree}")
-    logging.info(f"Start pointer: index={start_index}, node={tree[start_index]}")
+    logger.info("Start detect_restrictive_relative_clause_boundary")
+    logger.info("Tree: %s", tree)
+    logger.info("Start pointer: index=%s, node=%s", start_index, tree[start_index])
 
-    if not (tree[start_index].label().startswith("PRON") and "PronType=Rel" in tree[start_index].label()):
-        logging.info(f"End detect_nonrestrictive_relative_clause_boundary (not starts with relative pronoun)")
+    if not (tree[start_index].label().tag == "PRON" and tree[start_index].label().has_feature("PronType", "Rel")):
+        logger.info("End detect_nonrestrictive_relative_clause_boundary (not starts with relative pronoun)")
+        trace_decision("nonrestrictive relative clause", tree, start_index, "not a relative clause", "not starts with relative pronoun")
         return (tree, -1)
     
     # Check comma existence
-    index = start_index + 1
-    while index < len(tree) and tree[index, 0] != "." and tree[index, 0] != ",":
-        index += 1
+    index = get_sentence_index(tree).next(word_kind(".", ","), start_index + 1)
 
     if index != len(tree) and tree[index, 0] != ".":
         if index == start_index + 1:
             # Jump to next comma
-            index += 1
-            while index < len(tree) and tree[index, 0] == ",":
-                index += 1
+            index = get_sentence_index(tree).next(not_word_kind(","), index + 1)
 
             if index == len(tree):
-                logging.info(f"End detect_nonrestrictive_relative_clause_boundary: fail to find next comma in step 4.")
+                logger.info("End detect_nonrestrictive_relative_clause_boundary: fail to find next comma in step 4.")
+                trace_decision("nonrestrictive relative clause", tree, start_index, "not a relative clause", "fail to find next comma in step 4")
                 return (tree, -1)
             
             index += 1
         
-        logging.info(f"Pointer after step 4: {index=}, node{tree[index] if index < len(tree) else 'EOS'}")
+        logger.info("Pointer after step 4: index=%r, node=%s", index, tree[index] if index < len(tree) else 'EOS')
 
         # Step 5
-        logging.info(f"Step 5.b will be skipped because there is no equivalent of VBG and VBN in Indonesia language.")
+        logger.info("Step 5.b will be skipped because there is no equivalent of VBG and VBN in Indonesia language.")
 
         end_clause = False
         while index < len(tree) and (not end_clause):
-            logging.debug(f"{index=}")
+            logger.debug("index=%r", index)
 
             # Specific to step 5
             prev_index = index
-            while index < len(tree) and tree[index, 0] != ",":
-                index += 1
+            index = get_sentence_index(tree).next(COMMA, index) # The tree may have changed in the previous iteration
 
             step_5_occured = False
             if index < len(tree):
@@ -565,17 +660,17 @@ def detect_nonrestrictive_relative_clause_boundary(tree: Tree, start_index: int,
                         _, boundary_index = detect_appositive_boundary(tree, index + 1, keep_structure=keep_structure)
                         if boundary_index != -1:
                             index = boundary_index
-                            logging.info(f"Pointer after step 5.a: {index=}, node{tree[index] if index < len(tree) else 'EOS'}")
+                            logger.info("Pointer after step 5.a: index=%r, node=%s", index, tree[index] if index < len(tree) else 'EOS')
                             step_5_occured = True
 
                     else:
                         new_tree, boundary_index = extract_appositive_structure(tree, index + 1)
                         if boundary_index != -1:
                             tree = new_tree
-                            logging.info(f"Tree changed because of 5.a:\n{tree}")
+                            logger.info("Tree changed because of 5.a:\n%s", tree)
 
                             index = boundary_index
-                            logging.info(f"Pointer after step 5.a: {index=}, node{tree[index] if index < len(tree) else 'EOS'}")
+                            logger.info("Pointer after step 5.a: index=%r, node=%s", index, tree[index] if index < len(tree) else 'EOS')
                             step_5_occured = True
 
                 # Step 5.b (skipped, because there is no equivalent of VBG and VBN)
@@ -584,28 +679,28 @@ def detect_nonrestrictive_relative_clause_boundary(tree: Tree, start_index: int,
                 if not step_5_occured:
                     if is_comma_for_implicit_conjunction_of_adjectives_or_adverbs(tree, index):
                         index += 2
-                        logging.info(f"Pointer after step 5.c: {index=}, node{tree[index] if index < len(tree) else 'EOS'}")
+                        logger.info("Pointer after step 5.c: index=%r, node=%s", index, tree[index] if index < len(tree) else 'EOS')
                         step_5_occured = True
 
                 # Step 5.d
                 if not step_5_occured:
                     if tree[index, 0] == ",":
                         delete_current_token = True
-                        if index < len(tree) - 1 and tree[index + 1].label().startswith("PRON") and "PronType=Rel" in tree[index + 1].label():
+                        if index < len(tree) - 1 and tree[index + 1].label().tag == "PRON" and tree[index + 1].label().has_feature("PronType", "Rel"):
                             delete_current_token = False
-                        elif index < len(tree) - 2 and ("CCONJ" in tree[index + 1].label() or "SCONJ" in tree[index + 1].label()) and tree[index + 2].label().startswith("PRON") and "PronType=Rel" in tree[index + 2].label():
+                        elif index < len(tree) - 2 and (tree[index + 1].label().tag == "CCONJ" or tree[index + 1].label().tag == "SCONJ") and tree[index + 2].label().tag == "PRON" and tree[index + 2].label().has_feature("PronType", "Rel"):
                             delete_current_token = True
                         else:
                             delete_current_token = None
 
                         if delete_current_token is not None:
-                            logging.info(f"Step 5.d started.")
+                            logger.info("Step 5.d started.")
                             if delete_current_token and (not keep_structure):
                                 tree = Tree(tree.label(), tree[:index + 2] + tree[index + 3:])
-                                logging.info(f"Tree changed because of 4.e.i:\n{tree}")
+                                logger.info("Tree changed because of 4.e.i:\n%s", tree)
                             
                             index += 1
-                            logging.info(f"Pointer after step 4.e: {index=}, node{tree[index] if index < len(tree) else 'EOS'}")
+                            logger.info("Pointer after step 4.e: index=%r, node=%s", index, tree[index] if index < len(tree) else 'EOS')
                             step_5_occured = True
 
             if not step_5_occured:
@@ -613,13 +708,15 @@ def detect_nonrestrictive_relative_clause_boundary(tree: Tree, start_index: int,
 
                 # Step 6
                 end_clause = True
-                logging.info(f"End clause because of step 6.")
+                logger.info("End clause because of step 6.")
 
-        logging.info(f"End detect_nonrestrictive_relative_clause_boundary")
+        logger.info("End detect_nonrestrictive_relative_clause_boundary")
+        trace_decision("nonrestrictive relative clause", tree, start_index, "relative clause", "", boundary=index)
         return (tree, index)
 
     else:
-        logging.info(f"End detect_nonrestrictive_relative_clause_boundary (no further comma) at end of sentence or dot in step 2.")
+        logger.info("End detect_nonrestrictive_relative_clause_boundary (no further comma) at end of sentence or dot in step 2.")
+        trace_decision("nonrestrictive relative clause", tree, start_index, "relative clause", "no further comma", boundary=index)
         return (tree, index)
     
 def extract_nonrestrictive_relative_clause_structure(tree: Tree, start_index: int) -> tuple[Tree, int]:
@@ -628,7 +725,7 @@ def extract_nonrestrictive_relative_clause_structure(tree: Tree, start_index: in
         return (tree, -1)
     
     clause_tree = Tree(
-        node="SIMP-NONREST-CL",
+        node=NodeRecord("SIMP-NONREST-CL"),
         children=new_tree[start_index:boundary_index]
     )
 
@@ -645,7 +742,7 @@ def extract_restrictive_relative_clause_structure(tree: Tree, start_index: int)
         return (tree, -1)
     
     clause_tree = Tree(
-        node="SIMP-REST-CL",
+        node=NodeRecord("SIMP-REST-CL"),
         children=new_tree[start_index:boundary_index]
     )
 
@@ -657,37 +754,33 @@ def extract_restrictive_relative_clause_structure(tree: Tree, start_index: int)
     return (extracted_tree, start_index + 1)
 
 def extract_prefix_conjunctions(tree: Tree, strategy=1) -> Tree:
-    if not tree[0].label().startswith("SCONJ"):
+    if tree[0].label().tag != "SCONJ":
         return tree
     
+    sentence_index = get_sentence_index(tree)
     check_index = 1
     # If starts with comma, go to next comma
     if tree[check_index, 0] == ",":
-        check_index += 1
-        while check_index < len(tree) and tree[check_index, 0] != ",":
-            check_index += 1
+        check_index = sentence_index.next(COMMA, check_index + 1)
 
         if check_index == len(tree):
             return tree
 
-    # Find NP, verb, and comma
-    first_subject_exists = False
-    first_predicate_exists = False
-    
-    stop_clause = False
-    while check_index < len(tree) and tree[check_index, 0] != "." and not stop_clause:
-        if tree[check_index, 0] == "," and first_predicate_exists and first_subject_exists:
-            if is_comma_for_implicit_conjunction_of_adjectives_or_adverbs(tree, check_index):
-                check_index += 2
-            else:
-                stop_clause = True
-        else:
-            if is_subject(tree[check_index]):
-                first_subject_exists = True
-            elif is_predicate(tree[check_index], strategy=strategy):
-                first_predicate_exists = True
+    # Find NP, verb, and comma: the first clause ends at the first comma after both its subject and
+    # its predicate (skipping commas between adjectives or adverbs), or at the period.
+    period_index = sentence_index.next(PERIOD, check_index)
+    subject_index = sentence_index.next(SUBJECT, check_index)
+    predicate_index = sentence_index.next(predicate_kind(strategy), check_index)
+    first_subject_exists = subject_index < period_index
+    first_predicate_exists = predicate_index < period_index
 
-            check_index += 1
+    check_index = period_index
+    if first_subject_exists and first_predicate_exists:
+        comma_index = sentence_index.next(COMMA, max(subject_index, predicate_index) + 1)
+        while comma_index < period_index and is_comma_for_implicit_conjunction_of_adjectives_or_adverbs(tree, comma_index):
+            comma_index = sentence_index.next(COMMA, comma_index + 2)
+
+        check_index = min(comma_index, period_index)
 
     # check_index == len(tree) or comma or period detected
 
@@ -697,7 +790,7 @@ def extract_prefix_conjunctions(tree: Tree, strategy=1) -> Tree:
     first_clause_stop_index = check_index
 
     check_index += 1
-    if tree[check_index].label().startswith("SCONJ"):
+    if tree[check_index].label().tag == "SCONJ":
         check_index += 1
 
     second_clause_start_index = check_index
@@ -711,35 +804,42 @@ def extract_prefix_conjunctions(tree: Tree, strategy=1) -> Tree:
         first_clause_tree_children.insert(0, second_subject)
 
     first_clause_tree = Tree(
-        node="CONJ-CLAUSE-1",
+        node=NodeRecord("CONJ-CLAUSE-1"),
         children=first_clause_tree_children
     )
     
     second_clause_tree = Tree(
-        node="CONJ-CLAUSE-2",
+        node=NodeRecord("CONJ-CLAUSE-2"),
         children=tree[second_clause_start_index:check_index]
     )
 
+    trace_decision("prefix conjunction", tree, 0, "split", "CONJ-CLAUSE-1 and CONJ-CLAUSE-2", second_clause=second_clause_start_index)
     return Tree(
         node=tree.label(),
         children=[tree[0], first_clause_tree, *tree[first_clause_stop_index:second_clause_start_index], second_clause_tree, *tree[check_index:]]
     )
 
 def identify_second_conjoined_clause(tree: Tree, start_index: int, strategy=1):
-    check_index = start_index
+    sentence_index = get_sentence_index(tree)
     subject: Tree | None = None
     predicate: Tree | None = None
     
-    # Find period, verb, and comma
-    while check_index < len(tree) and tree[check_index, 0] != ".":
-        if is_subject(tree[check_index]):
-            subject = tree[check_index]
-        elif is_predicate(tree[check_index]):
-            if strategy != 5 or predicate is None:
-                predicate = tree[check_index]
+    # Find period, then the last subject and the last (strategy 5: first) verb before it
+    check_index = sentence_index.next(PERIOD, start_index)
 
-        check_index += 1
-    # check_index == len(tree) or comma or period detected
+    subject_index = sentence_index.previous(SUBJECT, check_index)
+    if subject_index >= start_index:
+        subject = tree[subject_index]
+
+    if strategy != 5:
+        predicate_index = sentence_index.previous(predicate_kind(), check_index)
+    else:
+        predicate_index = sentence_index.next(predicate_kind(), start_index)
+
+    if start_index <= predicate_index < check_index:
+        predicate = tree[predicate_index]
+
+    # check_index == len(tree) or period detected
 
     if check_index == len(tree):
         check_index = -1
@@ -747,26 +847,25 @@ def identify_second_conjoined_clause(tree: Tree, start_index: int, strategy=1):
     return check_index, subject, predicate
 
 def extract_infix_conjunctions(tree: Tree, strategy=1) -> Tree:
-    # Find conjunction
-    check_index = 0
-    stop_clause = False
+    # Find conjunction: the first one after both a subject and a predicate, before the period
+    sentence_index = get_sentence_index(tree)
     subject: Tree | None = None
     predicate: Tree | None = None
 
-    while check_index < len(tree) and tree[check_index, 0] != "." and not stop_clause:
-        subtree = tree[check_index]
-        if is_valid_conjunction(subtree):
-            if subject is not None and predicate is not None:
-                stop_clause = True
-            else:
-                check_index += 1
-        else:
-            if is_subject(subtree):
-                subject = subtree
-            elif is_predicate(subtree, strategy=strategy):
-                if strategy != 5 or predicate is None:
-                    predicate = subtree
-            check_index += 1
+    period_index = sentence_index.next(PERIOD, 0)
+    subject_index = sentence_index.next(SUBJECT, 0)
+    predicate_index = sentence_index.next(predicate_kind(strategy), 0)
+
+    check_index = period_index
+    if subject_index < period_index and predicate_index < period_index:
+        check_index = min(sentence_index.next(VALID_CONJUNCTION, max(subject_index, predicate_index) + 1), period_index)
+
+        # The last subject and the last (strategy 5: first) predicate before the conjunction
+        subject = tree[sentence_index.previous(SUBJECT, check_index)]
+        if strategy != 5:
+            predicate_index = sentence_index.previous(predicate_kind(strategy), check_index)
+
+        predicate = tree[predicate_index]
 
     if check_index == len(tree) or tree[check_index, 0] == ".":
         return tree
@@ -777,7 +876,7 @@ def extract_infix_conjunctions(tree: Tree, strategy=1) -> Tree:
         first_clause_stop_index -= 1
     
     first_clause_tree = Tree(
-        node="CONJ-CLAUSE-1",
+        node=NodeRecord("CONJ-CLAUSE-1"),
         children=tree[:first_clause_stop_index]
     )
 
@@ -799,20 +898,28 @@ def extract_infix_conjunctions(tree: Tree, strategy=1) -> Tree:
             second_clause_tree_children.insert(1, predicate)
 
     second_clause_tree = Tree(
-        node="CONJ-CLAUSE-2",
+        node=NodeRecord("CONJ-CLAUSE-2"),
         children=second_clause_tree_children
     )
 
+    trace_decision("infix conjunction", tree, conjunction_index, "split", "CONJ-CLAUSE-1 and CONJ-CLAUSE-2", second_clause=second_clause_start_index)
     return Tree(
         node=tree.label(),
         children=[first_clause_tree, *tree[first_clause_stop_index:conjunction_index + 1], second_clause_tree, *tree[check_index:]]
     )
 
+def predicate_kind(strategy=1) -> tuple:
+    # The children is_predicate accepts
+    if strategy != 5:
+        return tag_kind("VERB")
+    else:
+        return tag_kind("VERB", "ADJ")
+
 def is_predicate(subtree, strategy=1):
     if strategy != 5:
-        return subtree.label().startswith("VERB")
+        return subtree.label().tag == "VERB"
     else:
-        return subtree.label().startswith("VERB") or subtree.label().startswith("ADJ")
+        return subtree.label().tag == "VERB" or subtree.label().tag == "ADJ"
 
 def is_valid_conjunction(tree: Tree):
-    return (tree.label().startswith("SCONJ") or tree.label().startswith("CCONJ")) and tree[0] != "untuk"
+    return (tree.label().tag == "SCONJ" or tree.label().tag == "CCONJ") and tree[0] != "untuk"
@@ -0,0 +1,92 @@
+"""Read tagged documents from CoNLL-U, so text tagged elsewhere skips Stanza.
+
+Only the FORM, UPOS and FEATS columns are used. A "# newdoc" comment starts a new document;
+without one, the whole input is a single document. A multiword token is read as its surface form
+with the tags of its first word, as stanza_pipeline does with Stanza's tokens; empty nodes are
+skipped. The tokens are the (text, upos, feats string) tuples of tagged_sentence, so the tag
+corrections of each strategy are made when the trees are built.
+"""
+
+from collections.abc import Iterable, Iterator
+from typing import TextIO
+
+COLUMN_COUNT = 10
+
+def read_conllu_documents(lines: Iterable[str]) -> Iterator[tuple[str | None, list[list[tuple[str, str, str]]]]]:
+    # Yields (document id, sentences) as soon as each document ends, so a large file is never
+    # read at once. The id is the one of "# newdoc id = ...", if any.
+    document_id: str | None = None
+    sentences: list[list[tuple[str, str, str]]] = []
+    sentence: list[tuple[str, str, str]] = []
+    # The surface form of the current multiword token, and the id of its last word
+    multiword_text: str | None = None
+    multiword_end = 0
+    for line_number, line in enumerate(lines, start=1):
+        line = line.rstrip("\r\n")
+        if line.strip() == "":
+            if len(sentence) > 0:
+                sentences.append(sentence)
+                sentence = []
+
+            multiword_text = None
+            multiword_end = 0
+            continue
+
+        if line.startswith("#"):
+            if line[1:].lstrip().startswith("newdoc"):
+                if len(sentence) > 0:
+                    sentences.append(sentence)
+                    sentence = []
+
+                if len(sentences) > 0:
+                    yield (document_id, sentences)
+                    sentences = []
+
+                _, separator, value = line.partition("=")
+                document_id = value.strip() if separator != "" else None
+
+            continue
+
+        columns = line.split("\t")
+        if len(columns) != COLUMN_COUNT:
+            raise ValueError(f"line {line_number}: expected {COLUMN_COUNT} tab-separated columns, got {len(columns)}")
+
+        token_id, form, _, upos, _, feats, *_ = columns
+        if "." in token_id:
+            continue
+
+        if "-" in token_id:
+            _, _, end = token_id.partition("-")
+            multiword_text = form
+            multiword_end = int(end)
+            continue
+
+        if upos == "_":
+            raise ValueError(f"line {line_number}: token {form!r} has no UPOS tag")
+
+        feats_string = "" if feats == "_" else feats
+        if multiword_text is not None:
+            sentence.append((multiword_text, upos, feats_string))
+            multiword_text = None
+        elif int(token_id) > multiword_end:
+            sentence.append((form, upos, feats_string))
+
+    if len(sentence) > 0:
+        sentences.append(sentence)
+
+    if len(sentences) > 0:
+        yield (document_id, sentences)
+
+def write_conllu_documents(documents: Iterable[tuple[str | None, list[list[tuple[str, str, str]]]]], file: TextIO):
+    # Writes documents in the form read_conllu_documents reads, e.g. to keep the tags of a run.
+    # CoNLL-U has no empty sentences, so they are left out.
+    for document_id, sentences in documents:
+        print("# newdoc" if document_id is None else f"# newdoc id = {document_id}", file=file)
+        for sentence in sentences:
+            if len(sentence) == 0:
+                continue
+
+            for index, (text, upos, feats_string) in enumerate(sentence, start=1):
+                print(index, text, "_", upos, "_", feats_string if feats_string != "" else "_", "_", "_", "_", "_", sep="\t", file=file)
+
+            print(file=file)
@@ -1,16 +1,16 @@
 from nltk import Tree
+from .sentence_index import build_sentence_index
 
 def extract_grammatical_function(tree_list: list[Tree], strategy=1):
-    extracted_tree_list = tree_list
+    # Annotates the NP labels in place and returns the same list.
 
     # Extract pattern 1
-    new_extracted_tree_list: list[Tree] = []
-    for tree in extracted_tree_list:
+    for tree in tree_list:
         start_index_list = []
-        subtrees = [subtree for subtree in tree]
+        subtrees: Tree = tree
 
         for index, subtree in enumerate(subtrees):
-            if subtree.label().startswith("ADP"):
+            if subtree.label().tag == "ADP":
                 start_index_list.append(index)
 
         for start_index in start_index_list:
@@ -19,27 +19,19 @@ def extract_grammatical_function(tree_list: list[Tree], strategy=1):
                 continue
 
             subtree = subtrees[index]
-            old_subtree_label = subtree.label()
-            if (not old_subtree_label.startswith("NP")) or "gfunc" in old_subtree_label: # Including occupied NP
+            subtree_label = subtree.label()
+            if (subtree_label.tag != "NP") or subtree_label.gfunc is not None: # Including occupied NP
                 continue
             
-            subtree.set_label(f"{old_subtree_label};gfunc=OBLIQ")
-
-        new_extracted_tree_list.append(Tree(
-            tree.label(),
-            subtrees
-        ))
-
-    extracted_tree_list = new_extracted_tree_list
+            subtree_label.gfunc = "OBLIQ"
 
     # Extract pattern 2
-    new_extracted_tree_list = []
-    for tree in extracted_tree_list:
+    for tree in tree_list:
         start_index_list = []
-        subtrees = [subtree for subtree in tree]
+        subtrees: Tree = tree
 
         for index, subtree in enumerate(subtrees):
-            if subtree.label().startswith("NP"):
+            if subtree.label().tag == "NP":
                 start_index_list.append(index)
 
         for start_index in start_index_list:
@@ -48,27 +40,27 @@ def extract_grammatical_function(tree_list: list[Tree], strategy=1):
             mismatch = False
             while index < len(subtrees) - 1:
                 subtree = subtrees[index]
-                if subtree.label().startswith("VERB"):
+                if subtree.label().tag == "VERB":
                     break
 
-                elif subtree.label().startswith("PUNCT"):
+                elif subtree.label().tag == "PUNCT":
                     index += 1
                     if index == len(subtrees):
                         mismatch = True
                         break
 
                     subtree = subtrees[index]
-                    if subtree.label().startswith("PUNCT"):
+                    if subtree.label().tag == "PUNCT":
                         mismatch = True
                         break
 
                     index += 1
                     while index < len(subtrees):
                         subtree = subtrees[index]
-                        if subtree.label().startswith("VERB"):
+                        if subtree.label().tag == "VERB":
                             mismatch = True
                             break
-                        elif subtree.label().startswith("PUNCT"):
+                        elif subtree.label().tag == "PUNCT":
                             break
                         
                         index += 1
@@ -79,14 +71,14 @@ def extract_grammatical_function(tree_list: list[Tree], strategy=1):
 
                     # else: good to go
 
-                elif subtree.label().startswith("ADP"):
+                elif subtree.label().tag == "ADP":
                     index += 1
                     if index == len(subtrees):
                         mismatch = True
                         break
 
                     subtree = subtrees[index]
-                    if not subtree.label().startswith("NP"):
+                    if subtree.label().tag != "NP":
                         mismatch = True
                         break
 
@@ -103,31 +95,23 @@ def extract_grammatical_function(tree_list: list[Tree], strategy=1):
 
             else:
                 subtree = subtrees[index]
-                if not subtree.label().startswith("VERB"):
+                if subtree.label().tag != "VERB":
                     mismatch = True
 
             if mismatch:
                 continue
 
-            old_subtree_label = subtrees[start_index].label()
-            if "gfunc" not in old_subtree_label: 
-                subtrees[start_index].set_label(f"{old_subtree_label};gfunc=SUBJ")
-
-        new_extracted_tree_list.append(Tree(
-            tree.label(),
-            subtrees
-        ))
-
-    extracted_tree_list = new_extracted_tree_list
+            subtree_label = subtrees[start_index].label()
+            if subtree_label.gfunc is None: 
+                subtree_label.gfunc = "SUBJ"
 
     # Extract pattern 3 and 4
-    new_extracted_tree_list = []
-    for tree in extracted_tree_list:
+    for tree in tree_list:
         start_index_list = []
-        subtrees = [subtree for subtree in tree]
+        subtrees: Tree = tree
 
         for index, subtree in enumerate(subtrees):
-            if subtree.label().startswith("VERB"):
+            if subtree.label().tag == "VERB":
                 start_index_list.append(index)
 
         for start_index in start_index_list:
@@ -136,91 +120,61 @@ def extract_grammatical_function(tree_list: list[Tree], strategy=1):
                 continue
 
             subtree = subtrees[index]
-            old_subtree_label = subtree.label()
+            subtree_label = subtree.label()
 
-            if not subtree.label().startswith("NP"):
+            if subtree.label().tag != "NP":
                 continue
             
-            if "gfunc" not in old_subtree_label:
-                subtree.set_label(f"{old_subtree_label};gfunc=DOBJ")
+            if subtree_label.gfunc is None:
+                subtree_label.gfunc = "DOBJ"
 
             index += 1
             while index < len(subtrees):
                 subtree = subtrees[index]
-                old_subtree_label = subtree.label()
+                subtree_label = subtree.label()
 
-                if not old_subtree_label.startswith("NP"):
+                if subtree_label.tag != "NP":
                     break
 
-                if "gfunc" not in old_subtree_label: 
-                    subtree.set_label(f"{old_subtree_label};gfunc=IOBJ")
+                if subtree_label.gfunc is None: 
+                    subtree_label.gfunc = "IOBJ"
 
                 index += 1
 
-        new_extracted_tree_list.append(Tree(
-            tree.label(),
-            subtrees
-        ))
-
-    extracted_tree_list = new_extracted_tree_list
-
     # Extract pattern 5
-    new_extracted_tree_list = []
-    for tree in extracted_tree_list:
+    for tree in tree_list:
         start_index_list = [-1]
-        subtrees = [subtree for subtree in tree]
+        subtrees: Tree = tree
 
         if strategy != 5:
             for index, subtree in enumerate(subtrees):
-                if subtree.label().startswith("PUNCT"):
+                if subtree.label().tag == "PUNCT":
                     start_index_list.append(index)
 
         for start_index in start_index_list:
             index = start_index + 1
             while index < len(subtrees):
                 subtree = subtrees[index]
-                old_subtree_label = subtree.label()
-                if old_subtree_label.startswith("NP"):
-                    if "gfunc" not in old_subtree_label:
-                        subtree.set_label(f"{old_subtree_label};gfunc=SUBJ")
+                subtree_label = subtree.label()
+                if subtree_label.tag == "NP":
+                    if subtree_label.gfunc is None:
+                        subtree_label.gfunc = "SUBJ"
 
                     break
 
                 index += 1
 
-        new_extracted_tree_list.append(Tree(
-            tree.label(),
-            subtrees
-        ))
-
     # Set default
-    new_extracted_tree_list = []
-    for tree in extracted_tree_list:
-        start_index_list = [-1]
-        subtrees = list([subtree for subtree in tree])
-
-        for subtree in subtrees:
-            old_subtree_label = subtree.label()
-            if old_subtree_label.startswith("NP") and "gfunc" not in old_subtree_label:
-                subtree.set_label(f"{old_subtree_label};") # Blank gfunc
-
-        new_extracted_tree_list.append(Tree(
-            tree.label(),
-            subtrees
-        ))
-
-    extracted_tree_list = new_extracted_tree_list
-
-    return extracted_tree_list
+    for tree in tree_list:
+        for subtree in tree:
+            subtree_label = subtree.label()
+            if subtree_label.tag == "NP" and subtree_label.gfunc is None:
+                subtree_label.gfunc = "" # Blank gfunc
 
-def extract_gfunc_from_label(label: str):
-    _, _, gfunc_string, _ = label.split(";")
+        # The subjects are known now, so the later stages can look things up instead of scanning.
+        build_sentence_index(tree)
 
-    if gfunc_string == "":
-        return ""
-    else:
-        _, gfunc = gfunc_string.split("=")
-        return gfunc
+    return tree_list
 
 def is_subject(np_tree: Tree):
-    return np_tree.label().startswith("NP") and "gfunc=SUBJ" in np_tree.label()
+    return np_tree.label().tag == "NP" and np_tree.label().gfunc == "SUBJ"
@@ -0,0 +1,125 @@
+class NodeRecord:
+    """Annotations of a tree node, used as the label of every `nltk.Tree` in the pipeline.
+
+    Tokens carry `feats`; noun phrases carry `np_id`, `gfunc`, `agreements`, `coref` and a cached
+    surface `text`; sentences carry `sentence_id` and a cached `sentence_index`. Other nodes (clause markers, inserted AUX) only
+    have a `tag`.
+
+    Token records come from `get_token_record` and are shared between tokens with the same tag,
+    so copy a token record before changing it.
+
+    `str(record)` renders the old semicolon-encoded label, e.g.
+    "NP;id=3;gfunc=SUBJ;Number=Sing|LocationTime=Yes;coref=1".
+    """
+
+    __slots__ = ("tag", "feats", "np_id", "gfunc", "agreements", "coref", "sentence_id", "text", "sentence_index")
+
+    def __init__(
+        self,
+        tag: str,
+        feats: dict[str, str] | None = None,
+        np_id: int | None = None,
+        gfunc: str | None = None,
+        agreements: dict[str, str] | None = None,
+        coref: int | None = None,
+        sentence_id: str | None = None
+    ):
+        self.tag = tag
+        self.feats = feats # Token only
+        self.np_id = np_id
+        self.gfunc = gfunc # None: not extracted yet, "": no grammatical function
+        self.agreements = agreements # Features of the head noun
+        self.coref = coref
+        self.sentence_id = sentence_id # S only, e.g. "0" or "0.1" after splitting
+        self.text: str | None = None # NP only, filled by utils.get_surface_text
+        self.sentence_index = None # S only, filled by sentence_index.get_sentence_index
+
+    def has_feature(self, key: str, value: str) -> bool:
+        # Token features for tokens, agreement features for NPs.
+        features = self.feats if self.feats is not None else self.agreements
+        return features is not None and features.get(key) == value
+
+    def get_feature(self, key: str) -> str | None:
+        features = self.feats if self.feats is not None else self.agreements
+        return None if features is None else features.get(key)
+
+    def copy(self) -> "NodeRecord":
+        record = NodeRecord(
+            self.tag,
+            feats=None if self.feats is None else dict(self.feats),
+            np_id=self.np_id,
+            gfunc=self.gfunc,
+            agreements=None if self.agreements is None else dict(self.agreements),
+            coref=self.coref,
+            sentence_id=self.sentence_id
+        )
+        record.text = self.text
+        return record
+
+    def label_string(self) -> str:
+        if self.sentence_id is not None:
+            return f"{self.tag};id={self.sentence_id}"
+
+        parts = [self.tag]
+        if self.feats is not None:
+            parts.append(feats_to_string(self.feats))
+
+        elif self.np_id is not None:
+            parts.append(f"id={self.np_id}")
+            if self.gfunc is not None:
+                parts.append("" if self.gfunc == "" else f"gfunc={self.gfunc}")
+
+            if self.agreements is not None:
+                parts.append(feats_to_string(self.agreements))
+
+        if self.coref is not None:
+            parts.append(f"coref={self.coref}")
+
+        return ";".join(parts)
+
+    def __str__(self):
+        return self.label_string()
+
+    def __repr__(self):
+        # nltk.Tree prints non-string labels with repr(), so keep the trees readable.
+        return self.label_string()
+
+    def __eq__(self, other):
+        if not isinstance(other, NodeRecord):
+            return NotImplemented
+
+        return (
+            self.tag == other.tag
+            and self.feats == other.feats
+            and self.np_id == other.np_id
+            and self.gfunc == other.gfunc
+            and self.agreements == other.agreements
+            and self.coref == other.coref
+            and self.sentence_id == other.sentence_id
+        )
+
+    __hash__ = None
+
+_token_records: dict[tuple[str, str], NodeRecord] = {}
+
+def get_token_record(upos: str, feats_string: str) -> NodeRecord:
+    # There are only a few hundred distinct UPOS/feats combinations, so one record each is enough.
+    key = (upos, feats_string)
+    record = _token_records.get(key)
+    if record is None:
+        record = NodeRecord(upos, feats=feats_from_string(feats_string))
+        _token_records[key] = record
+
+    return record
+
+def feats_from_string(feats_string: str | None) -> dict[str, str]:
+    feats: dict[str, str] = {}
+    if feats_string:
+        for feat in feats_string.split("|"):
+            key, value = feat.split("=", 1)
+            feats[key] = value
+
+    return feats
+
+def feats_to_string(feats: dict[str, str]) -> str:
+    return "|".join(f"{key}={value}" for key, value in feats.items())
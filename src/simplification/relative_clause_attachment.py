@@ -2,75 +2,75 @@ import logging
 from nltk import Tree
 from .clause_boundary import detect_appositive_boundary
 from .resolve_third_person_pronouns import get_salience
+from .salience import SalienceStore
+from .trace import trace_decision
 
-def relative_clause_attachment(tree_list: list[Tree]) -> list[Tree]:
-    logging.info("Relative clause attachment start.")
+logger = logging.getLogger(__name__)
 
-    new_tree_list: list[Tree] = []
-    coref_classes = {}
+def relative_clause_attachment(tree_list: list[Tree], max_sentence_distance: int | None = None, min_salience: float | None = None, stats: dict[str, int] | None = None) -> list[Tree]:
+    # Annotates the trees in place and returns the same list.
+    # See SalienceStore for the eviction policy; by default no antecedent is ever evicted.
+    # The number of evicted antecedents is added to stats["evicted_relative_clause_antecedents"].
+    logger.info("Relative clause attachment start.")
+
+    coref_classes = SalienceStore(max_sentence_distance=max_sentence_distance, min_salience=min_salience)
+    evicted_count = 0
 
     for tree in tree_list:
-        subtrees: list[Tree] = [subtree for subtree in tree]
+        subtrees: Tree = tree
+        # Only an NP of this sentence before the relative pronoun can be attached to it, so the
+        # NPs of the sentence are searched by themselves instead of walking every antecedent of
+        # the document. (salience, NP index), in the order they were added to coref_classes.
+        sentence_noun_phrases: list[tuple[float, int]] = []
         for subtree_index, subtree in enumerate(subtrees):
-            logging.debug(f"Checking {subtree=}")
+            logger.debug("Checking subtree=%r", subtree)
             subtree_label = subtree.label()
-            if subtree_label.startswith("NP"):
-                if "PronType=Prs" not in subtree_label: # "PronType=Rel" in subtree_label
-                    _, np_id_string, *_ = subtree_label.split(";")
-                    _, np_id = np_id_string.split("=")
-                    np_id = int(np_id)
+            if subtree_label.tag == "NP":
+                if not subtree_label.has_feature("PronType", "Prs"): # "PronType=Rel" in subtree_label
+                    np_id = subtree_label.np_id
 
                     salience = get_salience(subtree_label)
                     # else: no addition
 
-                    coref_classes[np_id] = {
-                        "salience": salience,
-                        "members": [],
-                        "tree": subtree
-                    }
+                    coref_classes.add(np_id, salience, item=subtree)
+                    sentence_noun_phrases.append((salience, subtree_index))
 
                 # else: Salience: include third pronoun or not?
                 # Let's assume we don't first
 
-            elif "PronType=Rel" in subtree_label:
-                found = False
-                for coref_class_id, coref_class_details in sorted(coref_classes.items(), key=lambda x: x[1]["salience"], reverse=True):
-                    np = coref_class_details["tree"]
-                    _, np_id_string, *_ = np.label().split(";")
+            elif subtree_label.has_feature("PronType", "Rel"):
+                # Token records are shared, so give this relative pronoun its own before setting coref.
+                subtree_label = subtree_label.copy()
+                subtree.set_label(subtree_label)
 
+                found = False
+                # Highest salience first, ties in insertion order, as coref_classes.by_salience() gives them
+                for _, np_index in sorted(sentence_noun_phrases, key=lambda noun_phrase: -noun_phrase[0]):
                     # Agreement filtering (skipped because ... no case)
 
                     # Syntax filtering
-                    # Find the np_index first
-                    np_index = subtree_index - 1
-                    while np_index >= 0 and subtrees[np_index] != np:
-                        np_index -= 1
-
-                    # np_index < 0 | subtrees[np_index] == np
-                    if np_index < 0:
-                        continue # Out of sentence
-
+                    coref_class_id = subtrees[np_index].label().np_id
                     np_index += 1
                     while np_index < subtree_index:
-                        logging.debug(f"{np_index=}")
-                        if subtrees[np_index].label().startswith("ADP") and np_index < len(subtrees) - 1:
-                            if subtrees[np_index + 1].label().startswith("NP"):
+                        logger.debug("np_index=%r", np_index)
+                        if subtrees[np_index].label().tag == "ADP" and np_index < len(subtrees) - 1:
+                            if subtrees[np_index + 1].label().tag == "NP":
                                 np_index += 2
                             else:
                                 break
 
                         elif subtrees[np_index][0] == "," and np_index < len(subtrees) - 3:
                             _, boundary_index = detect_appositive_boundary(tree, start_index=np_index + 1)
-                            logging.debug(f"For relative clause attachment: {boundary_index=}")
+                            logger.debug("For relative clause attachment: boundary_index=%r", boundary_index)
                             if boundary_index == -1:
-                                logging.debug("Nope, it is not appostive.")
+                                logger.debug("Nope, it is not appostive.")
                                 break
 
                             if boundary_index >= subtree_index:
-                                logging.debug("Passing subtree_index, not an expected appositive")
+                                logger.debug("Passing subtree_index, not an expected appositive")
                                 break
 
-                            logging.debug("Appositive detected")
+                            logger.debug("Appositive detected")
                             np_index = boundary_index + 1
 
                         else:
@@ -79,33 +79,33 @@ def relative_clause_attachment(tree_list: list[Tree]) -> list[Tree]:
                     if np_index < subtree_index:
                         continue
 
-                    subtree.set_label(f"{subtree_label};coref={coref_class_id}")
+                    subtree_label.coref = coref_class_id
                     # salience = get_salience(subtree_label)
-                    # coref_class_details["salience"] += salience
+                    # coref_classes.increase(coref_class_id, salience)
+                    trace_decision("relative pronoun", subtrees, subtree_index, "antecedent", "most salient NP right before it, up to prepositional phrases and appositives", coref=coref_class_id)
                     found = True
                     break
 
                 if not found:
-                    for coref_class_id, coref_class_details in sorted(coref_classes.items(), key=lambda x: x[1]["salience"], reverse=True):
-                        np = coref_class_details["tree"]
-                        _, np_id_string, *_ = np.label().split(";")
-
+                    for coref_class_id, _ in coref_classes.by_salience():
                         # Agreement filtering (skipped because ... no case)
 
-                        subtree.set_label(f"{subtree_label};coref={coref_class_id}")
+                        subtree_label.coref = coref_class_id
                         # salience = get_salience(subtree_label)
-                        # coref_class_details["salience"] += salience
+                        # coref_classes.increase(coref_class_id, salience)
+                        trace_decision("relative pronoun", subtrees, subtree_index, "antecedent", "no NP right before it, so the most salient one", coref=coref_class_id)
                         found = True
                         break
 
                 if not found:
-                    logging.debug(f"Not found; set coref=-1")
-                    subtree.set_label(f"{subtree_label};coref=-1")
-        
-        new_tree_list.append(Tree(tree.label(), subtrees))
+                    logger.debug("Not found; set coref=-1")
+                    trace_decision("relative pronoun", subtrees, subtree_index, "no antecedent", "no NP so far", coref=-1)
+                    subtree_label.coref = -1
 
         # Update saliences
-        for np_id in coref_classes.keys():
-            coref_classes[np_id]["salience"] /= 2
+        evicted_count += coref_classes.decay()
+
+    if stats is not None:
+        stats["evicted_relative_clause_antecedents"] = stats.get("evicted_relative_clause_antecedents", 0) + evicted_count
 
-    return new_tree_list
+    return tree_list
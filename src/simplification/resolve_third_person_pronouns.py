@@ -1,31 +1,46 @@
 import logging
 from nltk import Tree
 from .agreement import is_unification_possible
-from .grammatical_function import extract_gfunc_from_label
+from .node import NodeRecord
+from .salience import SalienceStore
+from .sentence_index import SUBJECT, SentenceIndex, get_sentence_index
+from .trace import trace_decision
 
-def init_third_person_pronouns_pipeline(strategy: int = 1):
+logger = logging.getLogger(__name__)
+
+def init_third_person_pronouns_pipeline(strategy: int = 1, max_sentence_distance: int | None = None, min_salience: float | None = None):
+    # See SalienceStore for the eviction policy; by default no antecedent is ever evicted.
     if strategy == 2:
-        return resolve_third_person_pronouns_strategy_2
+        resolve = resolve_third_person_pronouns_strategy_2
     else:
-        return resolve_third_person_pronouns_strategy_1
+        resolve = resolve_third_person_pronouns_strategy_1
+
+    def resolve_third_person_pronouns(tree_list: list[Tree], stats: dict[str, int] | None = None) -> list[Tree]:
+        return resolve(tree_list, max_sentence_distance=max_sentence_distance, min_salience=min_salience, stats=stats)
+
+    return resolve_third_person_pronouns
 
-def resolve_third_person_pronouns_strategy_1(tree_list: list[Tree]) -> list[Tree]:
-    logging.info("Resolve third person pronouns start.")
+def resolve_third_person_pronouns_strategy_1(tree_list: list[Tree], max_sentence_distance: int | None = None, min_salience: float | None = None, stats: dict[str, int] | None = None) -> list[Tree]:
+    # Annotates the trees in place and returns the same list.
+    # The number of evicted antecedents is added to stats["evicted_pronoun_antecedents"].
+    logger.info("Resolve third person pronouns start.")
 
-    new_tree_list: list[Tree] = []
-    coref_classes = {}
+    coref_classes = SalienceStore(max_sentence_distance=max_sentence_distance, min_salience=min_salience)
+    evicted_count = 0
 
     for tree in tree_list:
-        subtrees: list[Tree] = [subtree for subtree in tree]
+        subtrees: Tree = tree
+        sentence_index = get_sentence_index(subtrees)
         for subtree_index, subtree in enumerate(subtrees):
-            logging.debug(f"Checking {subtree=}")
+            logger.debug("Checking subtree=%r", subtree)
             subtree_label = subtree.label()
-            if subtree_label.startswith("NP"):
-                if "PronType=Prs" in subtree_label:
+            if subtree_label.tag == "NP":
+                if subtree_label.has_feature("PronType", "Prs"):
                     add_to_valid_coreference_class_with_max_salience(
                         subtree_index=subtree_index,
                         coref_classes=coref_classes,
-                        subtrees=subtrees
+                        subtrees=subtrees,
+                        sentence_index=sentence_index
                     )
                 else:
                     create_new_coreference_class(
@@ -33,196 +48,168 @@ def resolve_third_person_pronouns_strategy_1(tree_list: list[Tree]) -> list[Tree
                         coref_classes=coref_classes
                     )
 
-        new_tree_list.append(Tree(tree.label(), subtrees))
-
         # Update saliences
-        for np_id in coref_classes.keys():
-            coref_classes[np_id]["salience"] /= 2
+        evicted_count += coref_classes.decay()
+
+    if stats is not None:
+        stats["evicted_pronoun_antecedents"] = stats.get("evicted_pronoun_antecedents", 0) + evicted_count
 
-    return new_tree_list
+    return tree_list
 
-def add_to_valid_coreference_class_with_max_salience(subtree_index: int, coref_classes: dict, subtrees: list[Tree]):
+def add_to_valid_coreference_class_with_max_salience(subtree_index: int, coref_classes: SalienceStore, subtrees: list[Tree], sentence_index: SentenceIndex | None = None):
     # Input: subtree_index
     # Input/output: coref_classes, subtrees
 
+    if sentence_index is None:
+        sentence_index = get_sentence_index(subtrees)
+
     subtree = subtrees[subtree_index]
     subtree_label = subtree.label()
 
-    if "Person=3" in subtree_label or "Person=" not in subtree_label:
+    if subtree_label.get_feature("Person") in [None, "3"]:
         found = False
-        for coref_class_id, coref_class_details in sorted(coref_classes.items(), key=lambda x: x[1]["salience"], reverse=True):
+        for coref_class_id, np in coref_classes.by_salience():
             # Agreement filtering
             unification_possible = True
-            np = coref_class_details["tree"]
             np_label = np.label()
-            _, np_id_string, _, np_agreement_list_string = np_label.split(";")
 
-            logging.debug(f"Agreement filtering: {np_agreement_list_string=}")
-            if np_agreement_list_string != "":
-                np_agreement_list = np_agreement_list_string.split("|")
-                unification_possible = is_unification_possible(subtree_label, np_agreement_list)
+            logger.debug("Agreement filtering: np_label.agreements=%r", np_label.agreements)
+            if len(np_label.agreements) > 0:
+                unification_possible = is_unification_possible(subtree_label, np_label.agreements)
 
             if not unification_possible:
+                trace_decision("pronoun", subtrees, subtree_index, "rejected antecedent", "agreement filtering", candidate=coref_class_id)
                 continue
 
             # Syntax filtering
-            subtree_gfunc = extract_gfunc_from_label(subtree_label)
-            np_gfunc = extract_gfunc_from_label(np_label)
+            subtree_gfunc = subtree_label.gfunc
+            np_gfunc = np_label.gfunc
 
-            logging.debug(f"Syntax filtering 1")
-            if not is_satisfy_reflex_syntax_filtering(subtrees, subtree_index, np):
+            logger.debug("Syntax filtering 1")
+            if not is_satisfy_reflex_syntax_filtering(subtrees, subtree_index, np, sentence_index=sentence_index):
+                trace_decision("pronoun", subtrees, subtree_index, "rejected antecedent", "syntax filtering 1 (reflexive)", candidate=coref_class_id)
                 continue # You can't refer to it.
 
-            logging.debug(f"Syntax filtering 2")
-            if not is_satisfy_iobj_obliq_syntax_filtering(subtrees, subtree_index, np):
+            logger.debug("Syntax filtering 2")
+            if not is_satisfy_iobj_obliq_syntax_filtering(subtrees, subtree_index, np, sentence_index=sentence_index):
+                trace_decision("pronoun", subtrees, subtree_index, "rejected antecedent", "syntax filtering 2 (indirect object or oblique)", candidate=coref_class_id)
                 continue # You can't refer to it.
 
             # Continue with other syntax filtering
-            logging.debug(f"Syntax filtering 3")
+            logger.debug("Syntax filtering 3")
             if subtree_gfunc == "DOBJ" and np_gfunc == "SUBJ":
                 # Find subject of subtree
-                subtree_subject_index = subtree_index - 1
-                subtree_subject_label = ""
-                while subtree_subject_index >= 0:
-                    subtree_subject_label = subtrees[subtree_subject_index].label()
-                    if subtree_subject_label.startswith("NP") and "gfunc=SUBJ" in subtree_subject_label:
-                        break
-                    else:
-                        subtree_subject_index -= 1
-
-
+                subtree_subject_index = sentence_index.previous(SUBJECT, subtree_index)
                 if subtree_subject_index >= 0:
-                    logging.debug(f"Subtree subject: {subtrees[subtree_subject_index]}")
-                    if subtrees[subtree_subject_index] == np:
+                    logger.debug("Subtree subject: %s", subtrees[subtree_subject_index])
+                    if sentence_index.noun_phrases.np_id_at(subtree_subject_index) == np_label.np_id:
+                        trace_decision("pronoun", subtrees, subtree_index, "rejected antecedent", "syntax filtering 3 (direct object)", candidate=coref_class_id)
                         continue # You can't refer to it.
 
-            subtree.set_label(f"{subtree_label};coref={coref_class_id}")
+            subtree_label.coref = coref_class_id
             salience = get_salience(subtree_label)
-            coref_class_details["salience"] += salience
+            coref_classes.increase(coref_class_id, salience)
+            trace_decision("pronoun", subtrees, subtree_index, "antecedent", "most salient candidate left", coref=coref_class_id)
             found = True
             break
 
         if not found:
-            logging.debug(f"Not found; set coref=-1")
-            subtree.set_label(f"{subtree_label};coref=-1")
+            logger.debug("Not found; set coref=-1")
+            trace_decision("pronoun", subtrees, subtree_index, "no antecedent", "every candidate was filtered out", coref=-1)
+            subtree_label.coref = -1
 
     # else: do nothing
 
-def is_satisfy_reflex_syntax_filtering(subtrees: list[Tree], subtree_index: int, np: Tree):
-    subtree_label: str = subtrees[subtree_index].label()
-    if "Reflex=Yes" not in subtree_label:
+def is_satisfy_reflex_syntax_filtering(subtrees: list[Tree], subtree_index: int, np: Tree, sentence_index: SentenceIndex | None = None):
+    subtree_label: NodeRecord = subtrees[subtree_index].label()
+    if not subtree_label.has_feature("Reflex", "Yes"):
         return True
 
-    satisfied = True
-    # Find subject of subtree or find NP
-    subtree_subject_index = subtree_index - 1
-    subtree_subject_label = ""
-    while subtree_subject_index >= 0 and subtrees[subtree_subject_index] != np:
-        subtree_subject_label = subtrees[subtree_subject_index].label()
-        if subtree_subject_label.startswith("NP") and "gfunc=SUBJ" in subtree_subject_label:
-            break
-        else:
-            subtree_subject_index -= 1
+    if sentence_index is None:
+        sentence_index = get_sentence_index(subtrees)
 
-    # subtree_subject_index < 0, subtrees[subtree_subject_index] == np, or if subtree_subject_label.startswith("NP") and "gfunc=SUBJ" in subtree_subject_label
-
-    if subtree_subject_label.startswith("NP") and "gfunc=SUBJ" in subtree_subject_label:
-        if subtrees[subtree_subject_index] != np:
-            satisfied = False
+    # NP ids are unique, so looking the NP up by its id is the same as comparing subtrees.
+    np_index = sentence_index.noun_phrases.position(np.label().np_id)
+    if np_index >= subtree_index:
+        np_index = -1
 
-    return satisfied
+    # No subject may come between the NP (or, if it is in another sentence, the start) and the subtree
+    return sentence_index.previous(SUBJECT, subtree_index) <= np_index
 
-def is_satisfy_iobj_obliq_syntax_filtering(subtrees, subtree_index, np):
-    subtree_label = subtrees[subtree_index].label()
-    subtree_gfunc = extract_gfunc_from_label(subtree_label)
-    np_gfunc = extract_gfunc_from_label(np.label())
+def is_satisfy_iobj_obliq_syntax_filtering(subtrees, subtree_index, np, sentence_index: SentenceIndex | None = None):
+    subtree_gfunc = subtrees[subtree_index].label().gfunc
+    np_gfunc = np.label().gfunc
 
     if subtree_gfunc not in ["OBLIQ", "IOBJ"] or np_gfunc != "DOBJ":
         return True
-    
-    # Find subject of subtree
-    subtree_subject_index = subtree_index - 1
-    subtree_subject_label = ""
-    while subtree_subject_index >= 0:
-        subtree_subject_label = subtrees[subtree_subject_index].label()
-        if subtree_subject_label.startswith("NP") and "gfunc=SUBJ" in subtree_subject_label:
-            break
-        else:
-            subtree_subject_index -= 1
 
+    if sentence_index is None:
+        sentence_index = get_sentence_index(subtrees)
+
+    # Find subject of subtree
+    subtree_subject_index = sentence_index.previous(SUBJECT, subtree_index)
     if subtree_subject_index == -1:
         return True
     
     # Find NP index
-    np_index = subtree_subject_index + 1
-    while np_index < subtree_index and subtrees[np_index] != np:
-        np_index += 1
-
-    if np_index >= subtree_index:
+    np_index = sentence_index.noun_phrases.position(np.label().np_id)
+    if np_index <= subtree_subject_index or np_index >= subtree_index:
         return True
 
-    # Find NP subject index
-    np_subject_index = np_index - 1
-    while np_subject_index > subtree_subject_index:
-        np_subject_label = subtrees[np_subject_index].label()
-        if np_subject_label.startswith("NP") and "gfunc=SUBJ" in np_subject_label:
-            break
-        else:
-            np_subject_index -= 1
+    # Find NP subject index (at least subtree_subject_index, which is a subject before the NP)
+    np_subject_index = sentence_index.previous(SUBJECT, np_index)
 
     return np_subject_index != subtree_subject_index
 
-def get_salience(subtree_label):
+def get_salience(subtree_label: NodeRecord):
     salience = 100.0
-    if "gfunc=SUBJ" in subtree_label:
+    if subtree_label.gfunc == "SUBJ":
         salience += 70.0 + 80.0
-    elif "gfunc=DOBJ" in subtree_label:
+    elif subtree_label.gfunc == "DOBJ":
         salience += 50.0 + 80.0
-    elif "gfunc=IOBJ" in subtree_label:
+    elif subtree_label.gfunc == "IOBJ":
         salience += 40.0 + 80.0
-    elif "gfunc=OBLIQ" in subtree_label:
+    elif subtree_label.gfunc == "OBLIQ":
         salience += 40.0
     return salience
 
-def create_new_coreference_class(subtree: Tree, coref_classes: dict[int, dict[str]]):
+def create_new_coreference_class(subtree: Tree, coref_classes: SalienceStore):
     subtree_label = subtree.label()
-
-    _, np_id_string, *_ = subtree_label.split(";")
-    _, np_id = np_id_string.split("=")
-    np_id = int(np_id)
+    np_id = subtree_label.np_id
 
     salience = get_salience(subtree_label)
     # else: no addition
 
-    coref_classes[np_id] = {
-        "salience": salience,
-        "members": [],
-        "tree": subtree
-    }
+    coref_classes.add(np_id, salience, item=subtree)
 
-def resolve_third_person_pronouns_strategy_2(tree_list: list[Tree]) -> list[Tree]:
-    logging.info("Resolve third person pronouns start.")
+def resolve_third_person_pronouns_strategy_2(tree_list: list[Tree], max_sentence_distance: int | None = None, min_salience: float | None = None, stats: dict[str, int] | None = None) -> list[Tree]:
+    # Annotates the trees in place and returns the same list.
+    # The number of evicted antecedents is added to stats["evicted_pronoun_antecedents"].
+    logger.info("Resolve third person pronouns start.")
 
-    new_tree_list: list[Tree] = []
-    coref_classes = {}
+    coref_classes = SalienceStore(max_sentence_distance=max_sentence_distance, min_salience=min_salience)
+    evicted_count = 0
 
     for tree in tree_list:
-        subtrees: list[Tree] = [subtree for subtree in tree]
+        subtrees: Tree = tree
+        sentence_index = get_sentence_index(subtrees)
         for subtree_index, subtree in enumerate(subtrees):
-            logging.debug(f"Checking {subtree=}")
+            logger.debug("Checking subtree=%r", subtree)
             subtree_label = subtree.label()
-            if subtree_label.startswith("NP"):
-                if "PronType=Prs" in subtree_label:
+            if subtree_label.tag == "NP":
+                if subtree_label.has_feature("PronType", "Prs"):
                     add_to_valid_coreference_class_with_max_salience(
                         subtree_index=subtree_index,
                         coref_classes=coref_classes,
-                        subtrees=subtrees
+                        subtrees=subtrees,
+                        sentence_index=sentence_index
                     )
-                elif "PronType=Dem" in subtree[-1].label():
+                elif subtree[-1].label().has_feature("PronType", "Dem"):
                     add_to_valid_coreference_class_with_max_salience(
                         subtree_index=subtree_index,
                         coref_classes=coref_classes,
-                        subtrees=subtrees
+                        subtrees=subtrees,
+                        sentence_index=sentence_index
                     )
                 else:
                     create_new_coreference_class(
@@ -230,10 +217,10 @@ def resolve_third_person_pronouns_strategy_2(tree_list: list[Tree]) -> list[Tree
                         coref_classes=coref_classes
                     )
 
-        new_tree_list.append(Tree(tree.label(), subtrees))
-
         # Update saliences
-        for np_id in coref_classes.keys():
-            coref_classes[np_id]["salience"] /= 2
+        evicted_count += coref_classes.decay()
+
+    if stats is not None:
+        stats["evicted_pronoun_antecedents"] = stats.get("evicted_pronoun_antecedents", 0) + evicted_count
 
-    return new_tree_list
+    return tree_list
@@ -0,0 +1,233 @@
+import heapq
+import math
+from collections.abc import Hashable, Iterator
+
+# Up to this many classes, a store halves every salience on decay and sorts them on
+# by_salience(), like a plain dict; that is cheaper than keeping the heap for a short document.
+SMALL_STORE_SIZE = 64
+
+# Halving keeps a float exact while it stays a normal number, i.e. while its frexp exponent is
+# at least this.
+_MIN_NORMAL_EXPONENT = -1021
+
+def halve(value: float, times: int) -> float:
+    # Same result as dividing `value` by 2 `times` times, one by one.
+    if times <= 0 or value == 0:
+        return value
+
+    _, exponent = math.frexp(value)
+    exact_times = max(0, min(times, exponent - _MIN_NORMAL_EXPONENT))
+    value = math.ldexp(value, -exact_times)
+
+    # Subnormal values are rounded on every division, so do the rest one by one (a subnormal
+    # reaches zero within about 53 halvings).
+    times -= exact_times
+    while times > 0 and value != 0:
+        value /= 2
+        times -= 1
+
+    return value
+
+def decays_until_below(value: float, floor: float) -> float:
+    # Smallest number of halvings that takes `value` below `floor` (infinite if it never does).
+    if floor <= 0:
+        return math.inf
+
+    if value < floor:
+        return 0
+
+    times = max(0, math.frexp(value)[1] - math.frexp(floor)[1] - 1)
+    while halve(value, times) >= floor:
+        times += 1
+
+    return times
+
+class SalienceStore:
+    """Coreference classes ordered by salience, as used by the salience-based resolvers.
+
+    `decay()` halves every salience in O(1): it only counts the halvings, and each class stores
+    its salience as of its last update. Because halving does not change the order of saliences,
+    a heap keyed by (binary exponent + halvings at update, mantissa) stays valid across decays,
+    and the exponents are integers, so there is nothing to overflow or renormalize.
+
+    `by_salience()` yields classes from the highest salience, ties in insertion order. That is
+    the order `sorted(classes.items(), key=salience, reverse=True)` gives for a dict whose
+    saliences are halved eagerly, including values that have decayed into subnormals.
+    Saliences must not be negative.
+
+    While the store holds at most SMALL_STORE_SIZE classes, it halves the saliences eagerly and
+    sorts them instead; it builds the heap once it grows past that, and keeps it from then on.
+
+    Without an eviction policy a class stays a candidate forever. With `max_sentence_distance`,
+    `decay()` drops the classes last added or increased more than that many decays (sentences) ago;
+    with `min_salience`, it drops those whose salience has fallen below it. Each class gets its
+    eviction time when it is updated, so a decay only visits the classes it evicts.
+    """
+
+    def __init__(self, max_sentence_distance: int | None = None, min_salience: float | None = None):
+        self._max_sentence_distance = max_sentence_distance
+        self._min_salience = min_salience
+        self._decay_count = 0
+        self._next_sequence = 0
+        # Versions are unique in the store, so heap items left by an evicted class never match the
+        # class when its key is added again.
+        self._next_version = 0
+        # key -> [salience, decay count it was last halved to, insertion sequence, item, version,
+        # decay count at last update]. The two decay counts differ once a small store halves eagerly.
+        self._classes: dict[Hashable, list] = {}
+        # None while the store is small
+        self._heap: list[tuple] | None = None
+        self._stale_count = 0
+        # (decay count at which the class is evicted, version, key), only used with a policy
+        self._expiry_heap: list[tuple] = []
+
+    def __len__(self):
+        return len(self._classes)
+
+    def __contains__(self, key):
+        return key in self._classes
+
+    def add(self, key: Hashable, salience: float, item=None):
+        # Like assigning to a dict: a key that already exists keeps its place among ties.
+        entry = self._classes.get(key)
+        if entry is None:
+            entry = [salience, self._decay_count, self._next_sequence, item, None, self._decay_count]
+            self._next_sequence += 1
+            self._classes[key] = entry
+        else:
+            entry[0] = salience
+            entry[1] = self._decay_count
+            entry[3] = item
+            entry[5] = self._decay_count
+
+        self._push(key, entry)
+
+    def increase(self, key: Hashable, amount: float):
+        entry = self._classes[key]
+        entry[0] = self.salience(key) + amount
+        entry[1] = self._decay_count
+        entry[5] = self._decay_count
+        self._push(key, entry)
+
+    def decay(self) -> int:
+        # Halve every salience, then evict as the policy says. Returns the number of evicted classes.
+        self._decay_count += 1
+        if self._heap is None:
+            for entry in self._classes.values():
+                entry[0] /= 2
+                entry[1] = self._decay_count
+
+        evicted_count = 0
+        expiry_heap = self._expiry_heap
+        while len(expiry_heap) > 0 and expiry_heap[0][0] <= self._decay_count:
+            _, version, key = heapq.heappop(expiry_heap)
+            entry = self._classes.get(key)
+            if entry is None or entry[4] != version:
+                continue # Stale
+
+            del self._classes[key]
+            self._stale_count += 1 # Its items in the heaps
+            evicted_count += 1
+
+        return evicted_count
+
+    def salience(self, key: Hashable) -> float:
+        entry = self._classes[key]
+        return halve(entry[0], self._decay_count - entry[1])
+
+    def item(self, key: Hashable):
+        return self._classes[key][3]
+
+    def by_salience(self) -> Iterator[tuple[Hashable, object]]:
+        """Yield (key, item) from the highest salience down, lazily.
+
+        Walks the heap without popping it, so taking the first few candidates costs O(k log k).
+        Do not change the store while iterating (changing it right before stopping is fine).
+        """
+        heap = self._heap
+        if heap is None:
+            # Dict order is insertion order, so the stable sort keeps ties in it.
+            for key, entry in sorted(self._classes.items(), key=lambda x: x[1][0], reverse=True):
+                yield (key, entry[3])
+
+            return
+
+        if len(heap) == 0:
+            return
+
+        frontier = [(heap[0], 0)]
+        underflowed: list[tuple[float, int, Hashable, object]] = []
+        while len(frontier) > 0:
+            heap_entry, heap_index = heapq.heappop(frontier)
+            for child_index in [2 * heap_index + 1, 2 * heap_index + 2]:
+                if child_index < len(heap):
+                    heapq.heappush(frontier, (heap[child_index], child_index))
+
+            negative_exponent, _, sequence, version, key = heap_entry
+            entry = self._classes.get(key)
+            if entry is None or entry[4] != version:
+                continue # Stale
+
+            if -negative_exponent - self._decay_count < _MIN_NORMAL_EXPONENT:
+                # Every remaining class has decayed into subnormals, where eager halving rounds
+                # and may turn different saliences into ties. Order these by their actual values.
+                underflowed.append((-self.salience(key), sequence, key, entry[3]))
+                continue
+
+            yield (key, entry[3])
+
+        underflowed.sort(key=lambda x: (x[0], x[1]))
+        for _, _, key, item in underflowed:
+            yield (key, item)
+
+    def _push(self, key: Hashable, entry: list):
+        # The heap item of the previous version of this class (if any) becomes stale. Stale items
+        # are skipped while iterating and dropped once they outnumber the live ones.
+        if entry[4] is not None:
+            self._stale_count += 1
+
+        entry[4] = self._next_version
+        self._next_version += 1
+        if self._heap is not None:
+            heapq.heappush(self._heap, heap_item(key, entry))
+        elif len(self._classes) > SMALL_STORE_SIZE:
+            self._build_heap()
+
+        if self._evicts():
+            heapq.heappush(self._expiry_heap, (self._expiry(entry), entry[4], key))
+
+        if self._stale_count > len(self._classes):
+            if self._heap is not None:
+                self._build_heap()
+
+            if self._evicts():
+                self._expiry_heap = [(self._expiry(entry), entry[4], key) for key, entry in self._classes.items()]
+                heapq.heapify(self._expiry_heap)
+
+            self._stale_count = 0
+
+    def _build_heap(self):
+        self._heap = [heap_item(key, entry) for key, entry in self._classes.items()]
+        heapq.heapify(self._heap)
+
+    def _evicts(self) -> bool:
+        return self._max_sentence_distance is not None or self._min_salience is not None
+
+    def _expiry(self, entry: list) -> float:
+        # The first decay count at which the class is evicted; evictions only happen in decay().
+        salience, decay_count, *_, update_decay_count = entry
+        expiry = math.inf
+        if self._max_sentence_distance is not None:
+            expiry = update_decay_count + self._max_sentence_distance + 1
+
+        if self._min_salience is not None:
+            expiry = min(expiry, decay_count + max(1, decays_until_below(salience, self._min_salience)))
+
+        return expiry
+
+def heap_item(key: Hashable, entry: list) -> tuple:
+    # Smallest first: highest salience, then earliest insertion.
+    salience, decay_count, sequence, _, version, _ = entry
+    mantissa, exponent = math.frexp(salience)
+    exponent_key = exponent + decay_count if salience > 0 else -math.inf
+    return (-exponent_key, -mantissa, sequence, version, key)
@@ -0,0 +1,164 @@
+import weakref
+from nltk import Tree
+
+class NounPhraseIndex:
+    """Positions of the NPs among the children of a sentence tree, by NP id and back.
+
+    NP ids are unique within a sentence (the noun chunker numbers every NP of a document), so an
+    NP is found by its id in O(1) instead of comparing subtrees with `==`, which walks both of
+    them. If an id did occur twice, `position` gives the first one.
+    """
+
+    def __init__(self, tree: Tree):
+        self._np_ids: list[int | None] = []
+        self._positions: dict[int, int] = {}
+        for position, subtree in enumerate(tree):
+            label = subtree.label()
+            np_id = label.np_id if label.tag == "NP" else None
+            self._np_ids.append(np_id)
+            if np_id is not None and np_id not in self._positions:
+                self._positions[np_id] = position
+
+    def position(self, np_id: int) -> int:
+        # -1 if the sentence has no NP with this id.
+        return self._positions.get(np_id, -1)
+
+    def np_id_at(self, position: int) -> int | None:
+        # None if the child at this position is not an NP.
+        return self._np_ids[position]
+
+# Kinds of children a SentenceIndex can find. A kind is a (name, value) pair; see SentenceIndex.matches.
+SUBJECT = ("subject", None)
+RELATIVE_PRONOUN = ("relative_pronoun", None)
+VALID_CONJUNCTION = ("valid_conjunction", None)
+NP_OR_RELATIVE = ("np_or_relative", None) # Where clause boundary detection can start
+COMMA = ("word", frozenset([","]))
+PERIOD = ("word", frozenset(["."]))
+
+def tag_kind(*tags: str) -> tuple:
+    return ("tag", frozenset(tags))
+
+def not_tag_kind(*tags: str) -> tuple:
+    return ("not_tag", frozenset(tags))
+
+def word_kind(*words: str) -> tuple:
+    return ("word", frozenset(words))
+
+def not_word_kind(*words: str) -> tuple:
+    return ("not_word", frozenset(words))
+
+def lowercase_word_kind(*words: str) -> tuple:
+    return ("lowercase_word", frozenset(words))
+
+class SentenceIndex:
+    """Where the children of one sentence tree are, by kind.
+
+    `next(kind, index)` is the first position at or after `index` with a child of that kind (or
+    len(tree)), and `previous(kind, index)` the last one before `index` (or -1), so the forward and
+    backward scans of clause boundary detection and coreference filtering are O(1) lookups. The
+    table for a kind is built the first time it is asked for.
+
+    A token's word is `tree[position, 0]`, as in the scans it replaces; other children (NPs, clauses)
+    have no word. Subjects come from grammatical function extraction, which builds the index of
+    every sentence when it is done. Later stages may change labels (e.g. set corefs) but not the
+    tags, words or grammatical functions the index was built from.
+
+    The index also holds the appositive boundaries found in the sentence (see
+    clause_boundary.find_appositive_boundary), so they are kept as long as the tree is, and the
+    hits and misses of looking them up. The counts are of the sentence: an index built for a tree
+    rebuilt from it shares them with the index before.
+    """
+
+    def __init__(self, tree: Tree):
+        self._tree = weakref.ref(tree)
+        self._length = len(tree)
+        self._labels = [subtree.label() for subtree in tree]
+        self._words = [
+            subtree[0] if len(subtree) > 0 and isinstance(subtree[0], str) else None
+            for subtree in tree
+        ]
+        self._next_positions: dict[tuple, list[int]] = {}
+        self._previous_positions: dict[tuple, list[int]] = {}
+        self.noun_phrases = NounPhraseIndex(tree)
+        self.appositive_boundaries: dict[tuple[int, int], tuple[int, bool]] = {}
+        self.appositive_boundary_cache_counts = {"hits": 0, "misses": 0}
+
+    def is_index_of(self, tree: Tree) -> bool:
+        return self._tree() is tree
+
+    def matches(self, kind: tuple) -> list[bool]:
+        # Whether each child is of this kind
+        name, value = kind
+        labels = self._labels
+        words = self._words
+        if name == "tag":
+            return [label.tag in value for label in labels]
+        elif name == "not_tag":
+            return [label.tag not in value for label in labels]
+        elif name == "word":
+            return [word in value for word in words]
+        elif name == "not_word":
+            return [word not in value for word in words]
+        elif name == "lowercase_word":
+            return [word is not None and word.lower() in value for word in words]
+        elif name == "subject":
+            # Same as grammatical_function.is_subject
+            return [label.tag == "NP" and label.gfunc == "SUBJ" for label in labels]
+        elif name == "relative_pronoun":
+            return [label.tag == "PRON" and label.has_feature("PronType", "Rel") for label in labels]
+        elif name == "np_or_relative":
+            return [label.tag == "NP" or label.has_feature("PronType", "Rel") for label in labels]
+        elif name == "valid_conjunction":
+            # Same as clause_boundary.is_valid_conjunction
+            return [(label.tag == "SCONJ" or label.tag == "CCONJ") and word != "untuk" for label, word in zip(labels, words)]
+        else:
+            raise ValueError(f"Unknown kind: {kind!r}")
+
+    def next(self, kind: tuple, index: int) -> int:
+        next_positions = self._next_positions.get(kind)
+        if next_positions is None:
+            next_positions = [self._length] * (self._length + 1)
+            next_position = self._length
+            for position, matched in zip(range(self._length - 1, -1, -1), reversed(self.matches(kind))):
+                if matched:
+                    next_position = position
+
+                next_positions[position] = next_position
+
+            self._next_positions[kind] = next_positions
+
+        return next_positions[max(index, 0)] if index <= self._length else self._length
+
+    def previous(self, kind: tuple, index: int) -> int:
+        previous_positions = self._previous_positions.get(kind)
+        if previous_positions is None:
+            previous_positions = [-1] * (self._length + 1)
+            previous_position = -1
+            for position, matched in enumerate(self.matches(kind)):
+                if matched:
+                    previous_position = position
+
+                previous_positions[position + 1] = previous_position
+
+            self._previous_positions[kind] = previous_positions
+
+        return previous_positions[min(index, self._length)] if index >= 0 else -1
+
+def get_sentence_index(tree: Tree) -> SentenceIndex:
+    # Cached on the S record. Trees rebuilt from a sentence share its record, so the cached index
+    # is only used for the tree it was built for.
+    label = tree.label()
+    sentence_index = label.sentence_index
+    if sentence_index is None or not sentence_index.is_index_of(tree):
+        sentence_index = build_sentence_index(tree)
+
+    return sentence_index
+
+def build_sentence_index(tree: Tree) -> SentenceIndex:
+    label = tree.label()
+    sentence_index = SentenceIndex(tree)
+    if label.sentence_index is not None:
+        sentence_index.appositive_boundary_cache_counts = label.sentence_index.appositive_boundary_cache_counts
+
+    label.sentence_index = sentence_index
+    return sentence_index
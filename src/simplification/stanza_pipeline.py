@@ -1,48 +1,200 @@
-import re
+import importlib.metadata
+import logging
+import os
+import sqlite3
+import threading
 import nltk
-import stanza
-
-def init_stanza_pipeline(tokenize_no_ssplit=False, strategy=1):
-    nlp = stanza.Pipeline(lang="id", processors="tokenize,mwt,pos", package="gsd", tokenize_no_ssplit=tokenize_no_ssplit)
-
-    def stanza_pipeline_document_process(document: str) -> list[nltk.Tree]:
-        result: list[nltk.Tree] = []
-
-        for index, stanza_sentence in enumerate(nlp(document).sentences):
-            subtree_list: list[nltk.Tree] = []
-            for stanza_token in stanza_sentence.tokens:
-                first_word = stanza_token.words[0]
-                upos = first_word.upos
-                text = stanza_token.text
-
-                if strategy == 5:
-                    if upos == "SCONJ" and text.lower() == "hingga":
-                        upos = "ADP"
-                    elif upos == "ADP" and text.lower() == "setelah":
-                        upos ="SCONJ"
-
-                feats_string = extract_feats_string(first_word)
-                if strategy == 2 or strategy == 3 or strategy == 5:
-                    if upos == "NUM" and re.match(r"^[0-9]{4}$", text):
-                        if feats_string != "":
-                            feats_string += "|"
-                        
-                        feats_string += "Year=Yes"
-
-                node = f'{upos};{feats_string}'
-
-                subtree = nltk.Tree(
-                    node,
-                    [text]
-                )
-                subtree_list.append(subtree)
-        
-            tree = nltk.Tree(f"S;id={index}", subtree_list)
-            result.append(tree)
-
-        return result
-    
+from .tag_cache import DEFAULT_MAX_BYTES, TagCache
+from .tagged_sentence import tagged_sentences_to_tree_list
+
+logger = logging.getLogger(__name__)
+
+LANGUAGE = "id"
+PACKAGE = "gsd"
+
+# Tagged by warmup(), so that the first real document does not pay for the first run of the models
+WARMUP_TEXT = "Presiden Joko Widodo, yang lahir di Surakarta, meresmikan jalan tol baru di Jawa Tengah."
+WARMUP_WORDS = ["Presiden", "Joko", "Widodo", ",", "yang", "lahir", "di", "Surakarta", ",", "meresmikan", "jalan", "tol", "baru", "di", "Jawa", "Tengah", "."]
+
+def init_stanza_pipeline(
+    tokenize_no_ssplit=False,
+    strategy=1,
+    cache_dir: str | None = None,
+    cache_max_bytes: int = DEFAULT_MAX_BYTES,
+    tokenize_pretokenized=False
+):
+    stanza_pipeline_batch_process = init_stanza_batch_pipeline(
+        tokenize_no_ssplit=tokenize_no_ssplit,
+        strategy=strategy,
+        cache_dir=cache_dir,
+        cache_max_bytes=cache_max_bytes,
+        tokenize_pretokenized=tokenize_pretokenized
+    )
+
+    def stanza_pipeline_document_process(document: str | list[list[str]], stats: dict[str, int] | None = None) -> list[nltk.Tree]:
+        return stanza_pipeline_batch_process([document], stats=stats)[0]
+
     return stanza_pipeline_document_process
 
+def init_stanza_batch_pipeline(
+    tokenize_no_ssplit=False,
+    strategy=1,
+    cache_dir: str | None = None,
+    cache_max_bytes: int = DEFAULT_MAX_BYTES,
+    tokenize_pretokenized=False
+):
+    # With cache_dir, tags are looked up in a TagCache there first, and Stanza is only loaded when
+    # a document is not in it. stats["stanza_cache_hits"] and stats["stanza_cache_misses"] count
+    # the lookups.
+    # With tokenize_pretokenized, a document is a list of sentences, each a list of words, which
+    # Stanza only tags. Sentence i of the result is sentence i of the document.
+    # Stanza (and with it torch) is imported and its models loaded by the first document, or by
+    # load() or warmup() before that.
+    def create_nlp():
+        import stanza
+
+        return stanza.Pipeline(
+            lang=LANGUAGE,
+            processors="tokenize,mwt,pos",
+            package=PACKAGE,
+            tokenize_no_ssplit=tokenize_no_ssplit,
+            tokenize_pretokenized=tokenize_pretokenized
+        )
+
+    nlp = None
+    nlp_lock = threading.Lock()
+    cache = None if cache_dir is None else TagCache(cache_dir, get_stanza_model_version(), max_bytes=cache_max_bytes)
+
+    def load():
+        # Loads the models once. A thread calling it while another loads them waits for that load.
+        nonlocal nlp
+        with nlp_lock:
+            if nlp is not None:
+                return
+
+            nlp = create_nlp()
+            if cache is not None:
+                # Loading the pipeline may have downloaded a model.
+                cache.model_version = get_stanza_model_version()
+
+    def is_loaded() -> bool:
+        return nlp is not None
+
+    def tag_documents(documents: list[str] | list[list[list[str]]]) -> list[list[list[tuple[str, str, str]]]]:
+        import stanza
+
+        load()
+        # One Stanza call for the whole batch, so the tokenizer and POS tagger see large batches.
+        if not tokenize_pretokenized:
+            stanza_documents = nlp([stanza.Document([], text=document) for document in documents])
+            return [stanza_document_to_tagged_sentences(stanza_document) for stanza_document in stanza_documents]
+
+        # Stanza would drop empty sentences, so they are left out and put back afterwards.
+        stanza_documents = nlp([create_pretokenized_document([sentence for sentence in document if len(sentence) > 0]) for document in documents])
+        return [
+            restore_empty_sentences(document, stanza_document_to_tagged_sentences(stanza_document))
+            for document, stanza_document in zip(documents, stanza_documents)
+        ]
+
+    def get_cache_key(document: str | list[list[str]]) -> bytes:
+        return cache.key(document, tokenize_no_ssplit=tokenize_no_ssplit, tokenize_pretokenized=tokenize_pretokenized)
+
+    def tag_documents_with_cache(documents: list[str] | list[list[list[str]]], stats: dict[str, int] | None = None) -> list[list[list[tuple[str, str, str]]]]:
+        try:
+            tagged_documents = cache.get_many([get_cache_key(document) for document in documents])
+        except sqlite3.Error as e:
+            logger.warning("Tag cache lookup failed, tagging without it: %s", e)
+            return tag_documents(documents)
+
+        missing_indices = [index for index, tagged_sentences in enumerate(tagged_documents) if tagged_sentences is None]
+        if stats is not None:
+            stats["stanza_cache_hits"] = stats.get("stanza_cache_hits", 0) + len(documents) - len(missing_indices)
+            stats["stanza_cache_misses"] = stats.get("stanza_cache_misses", 0) + len(missing_indices)
+
+        if len(missing_indices) == 0:
+            return tagged_documents
+
+        for index, tagged_sentences in zip(missing_indices, tag_documents([documents[index] for index in missing_indices])):
+            tagged_documents[index] = tagged_sentences
+
+        try:
+            cache.put_many([(get_cache_key(documents[index]), tagged_documents[index]) for index in missing_indices])
+        except sqlite3.Error as e:
+            logger.warning("Tag cache write failed: %s", e)
+
+        return tagged_documents
+
+    def stanza_pipeline_batch_process(documents: list[str] | list[list[list[str]]], stats: dict[str, int] | None = None) -> list[list[nltk.Tree]]:
+        if len(documents) == 0:
+            return []
+
+        if cache is None:
+            tagged_documents = tag_documents(documents)
+        else:
+            tagged_documents = tag_documents_with_cache(documents, stats=stats)
+
+        return [
+            tagged_sentences_to_tree_list(tagged_sentences, strategy=strategy)
+            for tagged_sentences in tagged_documents
+        ]
+
+    def warmup() -> list[nltk.Tree]:
+        # Tags a short document past the cache, so that Stanza runs, and returns its trees.
+        tagged_sentences, = tag_documents([[WARMUP_WORDS] if tokenize_pretokenized else WARMUP_TEXT])
+        return tagged_sentences_to_tree_list(tagged_sentences, strategy=strategy)
+
+    stanza_pipeline_batch_process.cache = cache
+    stanza_pipeline_batch_process.load = load
+    stanza_pipeline_batch_process.is_loaded = is_loaded
+    stanza_pipeline_batch_process.warmup = warmup
+    return stanza_pipeline_batch_process
+
+def get_stanza_model_version() -> str:
+    # The Stanza version and the size and modification time of every model file of the language,
+    # so a new Stanza or a downloaded model changes it without importing or loading anything.
+    model_directory = os.path.join(
+        os.environ.get("STANZA_RESOURCES_DIR", os.path.join(os.path.expanduser("~"), "stanza_resources")),
+        LANGUAGE
+    )
+    model_files: list[str] = []
+    for directory, _, file_names in os.walk(model_directory):
+        for file_name in file_names:
+            path = os.path.join(directory, file_name)
+            file_stat = os.stat(path)
+            model_files.append(f"{os.path.relpath(path, model_directory)}:{file_stat.st_size}:{file_stat.st_mtime_ns}")
+
+    try:
+        stanza_version = importlib.metadata.version("stanza")
+    except importlib.metadata.PackageNotFoundError:
+        stanza_version = ""
+
+    return "|".join([stanza_version, PACKAGE] + sorted(model_files))
+
+def create_pretokenized_document(sentences: list[list[str]]):
+    # Tokenized already, as Stanza's tokenizer returns a document in pretokenized mode. The words
+    # are kept as the text too, for Stanza versions that tokenize a batch again from the text.
+    import stanza
+
+    return stanza.Document(
+        [[{"id": (index + 1,), "text": word} for index, word in enumerate(sentence)] for sentence in sentences],
+        text=sentences
+    )
+
+def restore_empty_sentences(sentences: list[list[str]], tagged_sentences: list[list[tuple[str, str, str]]]) -> list[list[tuple[str, str, str]]]:
+    tagged_sentence_iterator = iter(tagged_sentences)
+    return [next(tagged_sentence_iterator) if len(sentence) > 0 else [] for sentence in sentences]
+
+def stanza_document_to_tagged_sentences(stanza_document) -> list[list[tuple[str, str, str]]]:
+    return [
+        [
+            (stanza_token.text, stanza_token.words[0].upos, extract_feats_string(stanza_token.words[0]))
+            for stanza_token in stanza_sentence.tokens
+        ]
+        for stanza_sentence in stanza_document.sentences
+    ]
+
+def stanza_document_to_tree_list(stanza_document, strategy=1) -> list[nltk.Tree]:
+    return tagged_sentences_to_tree_list(stanza_document_to_tagged_sentences(stanza_document), strategy=strategy)
+
 def extract_feats_string(first_word):
     return "" if first_word.feats is None else first_word.feats
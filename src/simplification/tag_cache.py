@@ -0,0 +1,246 @@
+"""A disk cache of the tags Stanza gives each document, so documents tagged before are not tagged
+again.
+
+An entry is the (text, UPOS, feats) of every token of a document, before the tag corrections of a
+strategy, so one entry serves every strategy. It is found by a hash of the document text (or words), the
+tokenizer options and the model version (see stanza_pipeline.get_stanza_model_version); entries of
+another model version are never served, and eventually evicted.
+
+The entries are kept in an SQLite database in the cache directory, so worker processes can share
+it: each process opens its own connection, and SQLite locks the file. When the entries take more
+than `max_bytes`, the least recently used are evicted. Hits and misses are counted in the process
+(`stats`) and in the database (`info()`), so several workers add up to the hit rate of a run.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+import zlib
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+DATABASE_FILE_NAME = "tags.sqlite3"
+DEFAULT_MAX_BYTES = 1_000_000_000
+
+# Stored as one byte each; any other tag is stored as OTHER_UPOS followed by the tag.
+UPOS_TAGS = ["ADJ", "ADP", "ADV", "AUX", "CCONJ", "DET", "INTJ", "NOUN", "NUM", "PART", "PRON", "PROPN", "PUNCT", "SCONJ", "SYM", "VERB", "X"]
+UPOS_INDICES = {upos: index for index, upos in enumerate(UPOS_TAGS)}
+OTHER_UPOS = 255
+
+# SQLite allows at most 999 parameters in a query before version 3.32.
+MAX_QUERY_PARAMETERS = 500
+
+class TagCache:
+    def __init__(self, directory: str, model_version: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.model_version = model_version
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        self._connection: sqlite3.Connection | None = None
+        self._connection_pid: int | None = None
+
+    def key(self, document: str | list[list[str]], tokenize_no_ssplit=False, tokenize_pretokenized=False) -> bytes:
+        # A pretokenized document is a list of sentences, each a list of words.
+        prefix = f"{FORMAT_VERSION}\0{self.model_version}\0{int(tokenize_no_ssplit)}{int(tokenize_pretokenized)}\0"
+        text = json.dumps(document, ensure_ascii=False) if tokenize_pretokenized else document
+        return hashlib.sha256(prefix.encode("utf-8") + text.encode("utf-8")).digest()
+
+    def get_many(self, keys: list[bytes]) -> list[list[list[tuple[str, str, str]]] | None]:
+        # The tagged sentences of each key, or None for a miss. Hits become the most recently used.
+        connection = self._connect()
+        values: dict[bytes, bytes] = {}
+        unique_keys = list(dict.fromkeys(keys))
+        for start_index in range(0, len(unique_keys), MAX_QUERY_PARAMETERS):
+            chunk = unique_keys[start_index:start_index + MAX_QUERY_PARAMETERS]
+            placeholders = ",".join("?" * len(chunk))
+            for key, value in connection.execute(f"SELECT key, value FROM tags WHERE key IN ({placeholders})", chunk):
+                values[key] = value
+
+        results = [None if key not in values else decode_tagged_sentences(values[key]) for key in keys]
+        hit_count = sum(1 for result in results if result is not None)
+        self.stats["hits"] += hit_count
+        self.stats["misses"] += len(keys) - hit_count
+        with connection:
+            now = time.time()
+            connection.executemany("UPDATE tags SET last_used = ? WHERE key = ?", [(now, key) for key in values])
+            add_counters(connection, {"hits": hit_count, "misses": len(keys) - hit_count})
+
+        return results
+
+    def put_many(self, items: list[tuple[bytes, list[list[tuple[str, str, str]]]]]):
+        connection = self._connect()
+        now = time.time()
+        rows = []
+        for key, tagged_sentences in items:
+            value = encode_tagged_sentences(tagged_sentences)
+            rows.append((key, value, len(value), now))
+
+        with connection:
+            connection.executemany("INSERT OR REPLACE INTO tags (key, value, size, last_used) VALUES (?, ?, ?, ?)", rows)
+
+        self.stats["writes"] += len(rows)
+        self.evict()
+
+    def evict(self) -> int:
+        # Drops the least recently used entries until they take 90% of max_bytes. Two processes
+        # evicting at once only delete some entries twice.
+        connection = self._connect()
+        total_bytes, = connection.execute("SELECT COALESCE(SUM(size), 0) FROM tags").fetchone()
+        if total_bytes <= self.max_bytes:
+            return 0
+
+        target_bytes = self.max_bytes * 0.9
+        evicted_keys: list[bytes] = []
+        for key, size in connection.execute("SELECT key, size FROM tags ORDER BY last_used"):
+            if total_bytes <= target_bytes:
+                break
+
+            evicted_keys.append(key)
+            total_bytes -= size
+
+        with connection:
+            connection.executemany("DELETE FROM tags WHERE key = ?", [(key,) for key in evicted_keys])
+            add_counters(connection, {"evictions": len(evicted_keys)})
+
+        self.stats["evictions"] += len(evicted_keys)
+        logger.info("Evicted %d tag cache entries", len(evicted_keys))
+        return len(evicted_keys)
+
+    def info(self) -> dict:
+        # Entries and bytes in the cache, and hits, misses and evictions of every process that used it.
+        connection = self._connect()
+        entry_count, total_bytes = connection.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM tags").fetchone()
+        info = {"entries": entry_count, "bytes": total_bytes, "hits": 0, "misses": 0, "evictions": 0}
+        info.update(connection.execute("SELECT name, value FROM counters").fetchall())
+        lookup_count = info["hits"] + info["misses"]
+        info["hit_rate"] = info["hits"] / lookup_count if lookup_count > 0 else None
+        return info
+
+    def clear(self):
+        connection = self._connect()
+        with connection:
+            connection.execute("DELETE FROM tags")
+            connection.execute("DELETE FROM counters")
+
+    def close(self):
+        if self._connection is not None and self._connection_pid == os.getpid():
+            self._connection.close()
+
+        self._connection = None
+        self._connection_pid = None
+
+    def _connect(self) -> sqlite3.Connection:
+        # A connection must not be used by another process, so a forked worker opens its own.
+        if self._connection is not None and self._connection_pid == os.getpid():
+            return self._connection
+
+        os.makedirs(self.directory, exist_ok=True)
+        connection = sqlite3.connect(os.path.join(self.directory, DATABASE_FILE_NAME), timeout=60)
+        try:
+            # Readers do not wait for a writer. Not available on some network file systems.
+            connection.execute("PRAGMA journal_mode=WAL")
+        except sqlite3.OperationalError:
+            pass
+
+        with connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS tags (key BLOB PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)")
+            connection.execute("CREATE INDEX IF NOT EXISTS tags_last_used ON tags (last_used)")
+            connection.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+
+        self._connection = connection
+        self._connection_pid = os.getpid()
+        return connection
+
+def add_counters(connection: sqlite3.Connection, counts: dict[str, int]):
+    connection.executemany(
+        "INSERT INTO counters (name, value) VALUES (?, ?) ON CONFLICT (name) DO UPDATE SET value = value + excluded.value",
+        [(name, count) for name, count in counts.items() if count > 0]
+    )
+
+def encode_tagged_sentences(tagged_sentences: list[list[tuple[str, str, str]]]) -> bytes:
+    # Varint counts and lengths, UTF-8 text, one byte per UPOS, and each distinct feats string
+    # written once and then referred to by its index; compressed with zlib.
+    buffer = bytearray()
+    feats_indices: dict[str, int] = {}
+    write_varint(buffer, len(tagged_sentences))
+    for sentence in tagged_sentences:
+        write_varint(buffer, len(sentence))
+        for text, upos, feats in sentence:
+            write_string(buffer, text)
+            upos_index = UPOS_INDICES.get(upos)
+            if upos_index is None:
+                buffer.append(OTHER_UPOS)
+                write_string(buffer, upos)
+            else:
+                buffer.append(upos_index)
+
+            feats_index = feats_indices.get(feats)
+            if feats_index is None:
+                feats_index = len(feats_indices)
+                feats_indices[feats] = feats_index
+                write_varint(buffer, feats_index)
+                write_string(buffer, feats)
+            else:
+                write_varint(buffer, feats_index)
+
+    return zlib.compress(bytes(buffer))
+
+def decode_tagged_sentences(value: bytes) -> list[list[tuple[str, str, str]]]:
+    data = zlib.decompress(value)
+    feats_table: list[str] = []
+    sentence_count, position = read_varint(data, 0)
+    tagged_sentences: list[list[tuple[str, str, str]]] = []
+    for _ in range(sentence_count):
+        token_count, position = read_varint(data, position)
+        sentence: list[tuple[str, str, str]] = []
+        for _ in range(token_count):
+            text, position = read_string(data, position)
+            upos_index = data[position]
+            position += 1
+            if upos_index == OTHER_UPOS:
+                upos, position = read_string(data, position)
+            else:
+                upos = UPOS_TAGS[upos_index]
+
+            feats_index, position = read_varint(data, position)
+            if feats_index == len(feats_table):
+                feats, position = read_string(data, position)
+                feats_table.append(feats)
+
+            sentence.append((text, upos, feats_table[feats_index]))
+
+        tagged_sentences.append(sentence)
+
+    return tagged_sentences
+
+def write_varint(buffer: bytearray, value: int):
+    while value >= 0x80:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+
+    buffer.append(value)
+
+def read_varint(data: bytes, position: int) -> tuple[int, int]:
+    value = 0
+    shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return (value, position)
+
+        shift += 7
+
+def write_string(buffer: bytearray, value: str):
+    encoded = value.encode("utf-8")
+    write_varint(buffer, len(encoded))
+    buffer.extend(encoded)
+
+def read_string(data: bytes, position: int) -> tuple[str, int]:
+    length, position = read_varint(data, position)
+    return (data[position:position + length].decode("utf-8"), position + length)
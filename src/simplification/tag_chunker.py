@@ -0,0 +1,287 @@
+import re
+from nltk import Tree
+from nltk.chunk.regexp import ChunkRule, StripRule, SplitRule, MergeRule, ExpandLeftRule, ExpandRightRule, tag_pattern2re_pattern
+from .node import NodeRecord
+
+# A compiled pattern element is "<body>" or "<body>+". Bodies of the form "UPOS;.*", "(UPOS|UPOS);.*",
+# ".*Feature=Value.*" and "UPOS;.*Feature=Value.*" are checked without regexes.
+_ELEMENT_PATTERN = re.compile(r"<([^<>]+)>(\+?)")
+_LITERAL = r"[^.^$*+?{}\[\]\\|()<>;]+"
+_FAST_BODY_PATTERN = re.compile(
+    rf"(?:\((?P<upos_list>[A-Z]+(?:\|[A-Z]+)+)\)|(?P<upos>[A-Z]+));\.\*(?:(?P<upos_literal>{_LITERAL})\.\*)?"
+    rf"|\.\*(?P<literal>{_LITERAL})\.\*"
+)
+
+_MAX_CACHED_TAGS = 10000
+
+class TagChunkParser:
+    """Drop-in replacement for `nltk.RegexpChunkParser` over token trees labelled with `NodeRecord`.
+
+    `RegexpChunkParser` encodes a sentence as a "<UPOS;feats>..." string and rewrites braces into it
+    with one regex substitution per rule. Here the same rules work on the n + 1 gaps between tokens
+    (each gap holds the braces of that position), and tag patterns are compiled once into predicates
+    whose results are cached per token record. Every rule is one left-to-right pass, so a sentence
+    is chunked in O(rules * n).
+
+    Supported rules are ChunkRule, StripRule, SplitRule, MergeRule, ExpandLeftRule and
+    ExpandRightRule whose tag patterns are a single "<tag>" or "<tag>+" (ExpandRightRule may also
+    have an empty left pattern). The chunks, and the ValueError for an invalid chunk string, are the
+    same as RegexpChunkParser's.
+    """
+
+    def __init__(self, rules: list, chunk_label="NP"):
+        self._chunk_label = chunk_label
+        self._bodies: list[str] = []
+        self._fast_predicates: list[tuple[frozenset[str] | None, str | None] | None] = []
+        self._regexps: list[re.Pattern] = []
+        self._rules = [self._compile_rule(rule) for rule in rules]
+        self._token_masks: dict[int, tuple[NodeRecord, int]] = {}
+
+    def _compile_rule(self, rule) -> tuple[str, tuple[int, bool] | None, tuple[int, bool] | None]:
+        # Exact types only: subclasses such as ChunkRuleWithContext use other regexes.
+        rule_type = type(rule)
+        if rule_type is ChunkRule:
+            return ("chunk", self._compile_element(rule._pattern), None)
+        elif rule_type is StripRule:
+            return ("strip", self._compile_element(rule._pattern), None)
+
+        kind = {
+            SplitRule: "split",
+            MergeRule: "merge",
+            ExpandLeftRule: "expand_left",
+            ExpandRightRule: "expand_right"
+        }.get(rule_type)
+        if kind is None:
+            raise ValueError(f"Unsupported chunk rule: {rule!r}")
+
+        left = self._compile_element(rule._left_tag_pattern, allow_empty=(kind == "expand_right"))
+        right = self._compile_element(rule._right_tag_pattern)
+        return (kind, left, right)
+
+    def _compile_element(self, tag_pattern: str, allow_empty=False) -> tuple[int, bool] | None:
+        tag_pattern = re.sub(r"\s", "", tag_pattern)
+        if tag_pattern == "" and allow_empty:
+            return None
+
+        element_match = _ELEMENT_PATTERN.fullmatch(tag_pattern)
+        if element_match is None:
+            raise ValueError(f"Unsupported tag pattern: {tag_pattern!r}")
+
+        body, plus = element_match.groups()
+        if body not in self._bodies:
+            self._bodies.append(body)
+            self._regexps.append(re.compile(tag_pattern2re_pattern(f"<{body}>")))
+
+            fast_match = _FAST_BODY_PATTERN.fullmatch(body)
+            if fast_match is None:
+                self._fast_predicates.append(None)
+            elif fast_match["literal"] is not None:
+                self._fast_predicates.append((None, fast_match["literal"]))
+            else:
+                upos_list = fast_match["upos_list"] or fast_match["upos"]
+                self._fast_predicates.append((frozenset(upos_list.split("|")), fast_match["upos_literal"]))
+
+        return (1 << self._bodies.index(body), plus == "+")
+
+    def _get_token_mask(self, label: NodeRecord) -> int:
+        # Token records are interned, so a sentence usually needs no predicate evaluation at all.
+        cached = self._token_masks.get(id(label))
+        if cached is not None and cached[0] is label:
+            return cached[1]
+
+        # The fast predicates assume the "UPOS;feats" form of an untouched token label.
+        tag_string = str(label)
+        fast = (
+            label.feats is not None
+            and label.coref is None
+            and label.sentence_id is None
+            and ";" not in label.tag
+            and not any(c in tag_string for c in "{}<>")
+        )
+
+        mask = 0
+        for index, fast_predicate in enumerate(self._fast_predicates):
+            if fast and fast_predicate is not None:
+                upos_set, literal = fast_predicate
+                if upos_set is None:
+                    matched = literal in tag_string
+                else:
+                    matched = label.tag in upos_set and (literal is None or literal in tag_string[len(label.tag) + 1:])
+            else:
+                matched = self._regexps[index].fullmatch(f"<{tag_string}>") is not None
+
+            if matched:
+                mask |= 1 << index
+
+        if len(self._token_masks) >= _MAX_CACHED_TAGS:
+            self._token_masks.clear()
+
+        self._token_masks[id(label)] = (label, mask)
+        return mask
+
+    def chunk_spans(self, tree: Tree) -> list[tuple[int, int]]:
+        labels = [subtree.label() for subtree in tree]
+        masks = [self._get_token_mask(label) for label in labels]
+        n = len(masks)
+        gaps = [""] * (n + 1)
+
+        for kind, left, right in self._rules:
+            gaps = apply_rule(kind, left, right, masks, gaps)
+
+        spans: list[tuple[int, int]] = []
+        valid = True
+        opened = False
+        start_index = 0
+        for index, gap in enumerate(gaps):
+            if gap == "":
+                continue
+            elif gap == "{" and not opened and index < n:
+                opened = True
+                start_index = index
+            elif gap == "}" and opened:
+                opened = False
+                spans.append((start_index, index))
+            elif gap == "}{" and opened and index < n:
+                spans.append((start_index, index))
+                start_index = index
+            else:
+                valid = False
+                break
+
+        if opened or not valid:
+            chunk_string = "".join(f"{gap}<{label}>" for gap, label in zip(gaps, labels)) + gaps[n]
+            raise ValueError("Transformation generated invalid chunkstring:\n  %s" % chunk_string)
+
+        return spans
+
+    def parse(self, tree: Tree) -> Tree:
+        children: list[Tree] = []
+        prev_end_index = 0
+        for start_index, end_index in self.chunk_spans(tree):
+            children += tree[prev_end_index:start_index]
+            children.append(Tree(NodeRecord(self._chunk_label), tree[start_index:end_index]))
+            prev_end_index = end_index
+
+        children += tree[prev_end_index:]
+        return Tree(tree.label(), children)
+
+def match_element(element: tuple[int, bool], start_index: int, masks: list[int], gaps: list[str]) -> int:
+    # End index of the greedy match of `element` at `start_index`, or -1.
+    # Repeated tags have to be adjacent, i.e. without a brace between them.
+    bit, plus = element
+    if start_index >= len(masks) or not masks[start_index] & bit:
+        return -1
+
+    end_index = start_index + 1
+    if plus:
+        while end_index < len(masks) and gaps[end_index] == "" and masks[end_index] & bit:
+            end_index += 1
+
+    return end_index
+
+def apply_rule(kind: str, left: tuple[int, bool] | None, right: tuple[int, bool] | None, masks: list[int], gaps: list[str]) -> list[str]:
+    # Same result as the rule's re.sub over the chunk string. Matches are read from `gaps` and
+    # written to `new_gaps`, like re.sub, which only matches against the original string.
+    # Only tags matching the first pattern element can start a match, so just those are visited.
+    # When a greedy "<tag>+" match fails, starting it one tag later ends at the same place and fails
+    # the same way, so the scan can jump to its end.
+    n = len(masks)
+    new_gaps = list(gaps)
+    changed_indices: list[int] = []
+    index = 0
+
+    if kind == "chunk" or kind == "strip":
+        # Chunk: (P)(?=[^}]*({|$)) -> {P}. Strip: (P)(?=[^{]*}) -> }P{
+        # The lookahead only depends on the first brace after the match.
+        inside_wanted = kind == "strip"
+        brace_index = -1
+        for start_index in [i for i, mask in enumerate(masks) if mask & left[0]]:
+            if start_index < index:
+                continue
+
+            end_index = match_element(left, start_index, masks, gaps)
+            if brace_index < end_index:
+                brace_index = end_index
+                while brace_index < n and gaps[brace_index] == "":
+                    brace_index += 1
+
+            if (gaps[brace_index][:1] == "}") == inside_wanted:
+                new_gaps[start_index] += "{" if kind == "chunk" else "}"
+                new_gaps[end_index] = ("}" if kind == "chunk" else "{") + new_gaps[end_index]
+                changed_indices += [start_index, end_index]
+
+            index = end_index
+
+    elif kind == "split":
+        # (L)(?=R) -> L}{
+        for start_index in [i for i, mask in enumerate(masks) if mask & left[0]]:
+            if start_index < index:
+                continue
+
+            end_index = match_element(left, start_index, masks, gaps)
+
+            # Backtrack a greedy left match until the right pattern follows without a brace.
+            split_index = end_index
+            while split_index > start_index:
+                if split_index < n and gaps[split_index] == "" and masks[split_index] & right[0]:
+                    new_gaps[split_index] = "}{" + new_gaps[split_index]
+                    changed_indices.append(split_index)
+                    break
+
+                if not left[1]:
+                    break
+
+                split_index -= 1
+
+            index = end_index
+
+    elif kind == "expand_right" and left is None:
+        # }(R) -> R}
+        for start_index in [i for i, mask in enumerate(masks) if mask & right[0] and gaps[i].endswith("}")]:
+            if start_index < index:
+                continue
+
+            end_index = match_element(right, start_index, masks, gaps)
+            new_gaps[start_index] = new_gaps[start_index][:-1]
+            new_gaps[end_index] = "}" + new_gaps[end_index]
+            changed_indices += [start_index, end_index]
+            index = end_index
+
+    else:
+        # Merge: (L)}{(?=R) -> L. ExpandLeft: (L){(R) -> {LR. ExpandRight: (L)}(R) -> LR}
+        # A shorter left match is followed by another tag, not a brace, so only the greedy one counts.
+        expected_gap = {"merge": "}{", "expand_left": "{", "expand_right": "}"}[kind]
+        for start_index in [i for i, mask in enumerate(masks) if mask & left[0]]:
+            if start_index < index:
+                continue
+
+            end_index = match_element(left, start_index, masks, gaps)
+            if end_index < n and gaps[end_index] == expected_gap:
+                if kind == "merge":
+                    if masks[end_index] & right[0]:
+                        new_gaps[end_index] = ""
+
+                else:
+                    right_end_index = match_element(right, end_index, masks, gaps)
+                    if right_end_index != -1:
+                        new_gaps[end_index] = ""
+                        if kind == "expand_left":
+                            new_gaps[start_index] += "{"
+                            changed_indices.append(start_index)
+                        else:
+                            new_gaps[right_end_index] = "}" + new_gaps[right_end_index]
+                            changed_indices.append(right_end_index)
+
+                        end_index = right_end_index
+
+            index = end_index
+
+    # Like ChunkString.xform, drop the empty chunks the substitution left behind. Usually only the
+    # changed gaps can have one, but a single pass leaves "{}" behind in a gap like "{{}}".
+    if "{}" in " ".join(gaps):
+        changed_indices = range(n + 1)
+
+    for gap_index in changed_indices:
+        new_gaps[gap_index] = new_gaps[gap_index].replace("{}", "")
+
+    return new_gaps
@@ -0,0 +1,62 @@
+import re
+import nltk
+from .node import NodeRecord, get_token_record
+
+YEAR_PATTERN = re.compile(r"^[0-9]{4}$")
+
+# Simplified by TextSimplifier.warmup() for pretagged input
+WARMUP_SENTENCE = [
+    ("Presiden", "NOUN", "Number=Sing"), ("Joko", "PROPN", ""), ("Widodo", "PROPN", ""), (",", "PUNCT", ""),
+    ("yang", "PRON", "PronType=Rel"), ("lahir", "VERB", ""), ("di", "ADP", ""), ("Surakarta", "PROPN", ""),
+    (",", "PUNCT", ""), ("meresmikan", "VERB", "Mood=Ind|Voice=Act"), ("jalan", "NOUN", "Number=Sing"), ("tol", "NOUN", "Number=Sing"),
+    ("baru", "ADJ", ""), ("di", "ADP", ""), ("Jawa", "PROPN", ""), ("Tengah", "PROPN", ""), (".", "PUNCT", "")
+]
+
+def tagged_sentences_to_tree_list(sentences: list[list[tuple[str, str, str]]], strategy=1) -> list[nltk.Tree]:
+    # Each sentence is a list of (text, upos, feats string) tokens, as the tagger returns them.
+    # An empty sentence (of pretokenized input) gets no tree, but keeps its index.
+    return [
+        nltk.Tree(
+            NodeRecord("S", sentence_id=str(index)),
+            [get_token_tree(text, upos, feats_string, strategy=strategy) for text, upos, feats_string in sentence]
+        )
+        for index, sentence in enumerate(sentences)
+        if len(sentence) > 0
+    ]
+
+def init_tagged_batch_pipeline(strategy=1):
+    # The counterpart of stanza_pipeline.init_stanza_batch_pipeline for documents tagged already
+    # (lists of sentences of (text, upos, feats string) tokens, e.g. from conllu.read_conllu_documents).
+    # It has the load, is_loaded and warmup of a Stanza pipeline too, with nothing to load.
+    def tagged_batch_process(documents: list[list[list[tuple[str, str, str]]]], stats: dict[str, int] | None = None) -> list[list[nltk.Tree]]:
+        return [tagged_sentences_to_tree_list(sentences, strategy=strategy) for sentences in documents]
+
+    def load():
+        pass
+
+    def is_loaded() -> bool:
+        return True
+
+    def warmup() -> list[nltk.Tree]:
+        return tagged_sentences_to_tree_list([WARMUP_SENTENCE], strategy=strategy)
+
+    tagged_batch_process.load = load
+    tagged_batch_process.is_loaded = is_loaded
+    tagged_batch_process.warmup = warmup
+    return tagged_batch_process
+
+def get_token_tree(text: str, upos: str, feats_string: str, strategy=1) -> nltk.Tree:
+    if strategy == 5:
+        if upos == "SCONJ" and text.lower() == "hingga":
+            upos = "ADP"
+        elif upos == "ADP" and text.lower() == "setelah":
+            upos ="SCONJ"
+
+    if strategy == 2 or strategy == 3 or strategy == 5:
+        if upos == "NUM" and YEAR_PATTERN.match(text):
+            if feats_string != "":
+                feats_string += "|"
+
+            feats_string += "Year=Yes"
+
+    return nltk.Tree(get_token_record(upos, feats_string), [text])
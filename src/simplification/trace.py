@@ -0,0 +1,57 @@
+"""Decision traces of the simplification stages.
+
+Every module logs to its own logger (`logging.getLogger(__name__)`) with %-style arguments, so a
+log call below the configured level returns before any tree is rendered to text.
+
+A decision trace is opt-in and per document: inside `with trace_decisions() as decisions:` the
+stages append one record to `decisions` for each rule that fires, e.g.
+
+    {"stage": "appositive", "rule": "not appositive", "sentence_id": "2", "index": 7, "token": "NP", "reason": "expect non-location NP"}
+
+The active trace is held in a context variable, so tracing one document (or one request of a
+server) neither slows down nor mixes with the others. Outside the block a trace point only finds
+that no trace is active.
+"""
+
+import contextlib
+from collections.abc import Iterator
+from contextvars import ContextVar
+from nltk import Tree
+
+_decisions: ContextVar[list[dict] | None] = ContextVar("decisions", default=None)
+
+@contextlib.contextmanager
+def trace_decisions() -> Iterator[list[dict]]:
+    decisions: list[dict] = []
+    token = _decisions.set(decisions)
+    try:
+        yield decisions
+    finally:
+        _decisions.reset(token)
+
+def is_tracing_decisions() -> bool:
+    return _decisions.get() is not None
+
+def trace_decision(stage: str, tree: Tree, index: int, rule: str, reason: str = "", **details):
+    # Keep `reason` a constant; values (boundaries, coref ids) go to `details`, so nothing is
+    # formatted when no trace is active.
+    decisions = _decisions.get()
+    if decisions is None:
+        return
+
+    if 0 <= index < len(tree):
+        subtree = tree[index]
+        token = subtree[0] if len(subtree) > 0 and isinstance(subtree[0], str) else subtree.label().tag
+    else:
+        token = None
+
+    decision = {
+        "stage": stage,
+        "rule": rule,
+        "sentence_id": tree.label().sentence_id,
+        "index": index,
+        "token": token,
+        "reason": reason
+    }
+    decision.update(details)
+    decisions.append(decision)
@@ -1,60 +1,87 @@
 from nltk import Tree
-from .utils import get_attribute_value_from_tree_label, get_coref_id_from_tree_label, is_numeric_attribute_np
-
-def transform(tree_list: list[Tree], strategy=1) -> list[Tree]:
+from .node import NodeRecord
+from .sentence_index import NounPhraseIndex
+from .utils import get_coref_id, get_surface_text, is_numeric_attribute_np
+
+def transform(tree_list: list[Tree], strategy=1, stats: dict[str, int] | None = None) -> list[Tree]:
+    # noun_phrase_map only keeps the NPs that a later coref can still look up: an entry is dropped
+    # once the last sentence referring to its id has been transformed. Antecedents evicted by the
+    # coreference stages are never referred to again, so they are dropped here too. The number of
+    # dropped entries is added to stats["evicted_noun_phrases"], and the number of trees each
+    # transformation split in two to stats["<conjoined_clause|relative_clause|appositive>_splits"].
+    # A clause that is only unmarked, leaving one tree, is not a split.
     new_tree_list: list[Tree] = []
     noun_phrase_map: dict[int, Tree] = {}
-    potentially_simplified_list = tree_list.copy()
+    last_reference_indices = get_last_reference_indices(tree_list)
+    expiring_np_ids: dict[int, list[int]] = {}
+    for np_id, tree_index in last_reference_indices.items():
+        expiring_np_ids.setdefault(tree_index, []).append(np_id)
+
+    evicted_count = 0
+    split_counts = {"conjoined_clause_splits": 0, "relative_clause_splits": 0, "appositive_splits": 0}
+    # A stack with the next tree to transform at the end, so taking it and putting back the trees
+    # it was split into does not shift the whole document.
+    potentially_simplified_list = list(enumerate(tree_list))
+    potentially_simplified_list.reverse()
 
     while len(potentially_simplified_list) > 0:
-        tree = potentially_simplified_list.pop(0)
+        tree_index, tree = potentially_simplified_list.pop()
         changed = False
 
         first_new_tree, second_new_tree, changed = transform_for_conjoined_clauses(tree)
+        split_kind = "conjoined_clause_splits"
         if strategy != 5:
             if not changed:
                 first_new_tree, second_new_tree, changed = transform_for_relative_clause(tree)
+                split_kind = "relative_clause_splits"
             
             if not changed:
                 first_new_tree, second_new_tree, changed = transform_for_appositive(tree, strategy=strategy)
+                split_kind = "appositive_splits"
 
         else:
             
             if not changed:
                 first_new_tree, second_new_tree, changed = transform_for_appositive(tree, strategy=strategy)
+                split_kind = "appositive_splits"
                 
             if not changed:
                 first_new_tree, second_new_tree, changed = transform_for_relative_clause(tree)
+                split_kind = "relative_clause_splits"
 
         if changed:
-            potentially_simplified_list.insert(0, first_new_tree)
             if second_new_tree is not None:
-                potentially_simplified_list.insert(1, second_new_tree)
+                split_counts[split_kind] += 1
+                potentially_simplified_list.append((tree_index, second_new_tree))
+
+            potentially_simplified_list.append((tree_index, first_new_tree))
         else:
+            noun_phrases = NounPhraseIndex(tree)
             new_subtree_list: list[Tree] = []
             for subtree in tree:
                 subtree_label = subtree.label()
-                if not subtree_label.startswith("NP"):
+                if subtree_label.tag != "NP":
                     new_subtree_list.append(subtree)
                     continue
 
-                np_id = get_attribute_value_from_tree_label(subtree_label, "id")
+                np_id = subtree_label.np_id
                 if np_id is None:
                     raise ValueError("NP should have an ID, right? Something is wrong.")
                 
-                np_id = int(np_id)
-                noun_phrase_map[np_id] = subtree
+                if last_reference_indices.get(np_id, -1) >= tree_index:
+                    noun_phrase_map[np_id] = subtree
 
-                coref_id = get_coref_id_from_tree_label(subtree_label)
+                coref_id = get_coref_id(subtree)
                 if coref_id not in noun_phrase_map.keys():
                     new_subtree_list.append(subtree)
                     continue
 
                 new_subtree = noun_phrase_map[coref_id]
-                noun_phrase_map[np_id] = new_subtree
+                if last_reference_indices.get(np_id, -1) >= tree_index:
+                    noun_phrase_map[np_id] = new_subtree
 
                 # Check whether the NP exists in the same tree
-                if strategy==5 and new_subtree in list(tree):
+                if strategy==5 and is_in_tree(tree, noun_phrases, new_subtree):
                     new_subtree_list.append(subtree)
                 else:
                     new_subtree_list.append(new_subtree)
@@ -65,14 +92,36 @@ def transform(tree_list: list[Tree], strategy=1) -> list[Tree]:
             )
             new_tree_list.append(new_tree)
 
+            # Splits of a sentence are transformed before the next sentence.
+            if len(potentially_simplified_list) == 0 or potentially_simplified_list[-1][0] != tree_index:
+                for np_id in expiring_np_ids.pop(tree_index, []):
+                    if noun_phrase_map.pop(np_id, None) is not None:
+                        evicted_count += 1
+
+    if stats is not None:
+        stats["evicted_noun_phrases"] = stats.get("evicted_noun_phrases", 0) + evicted_count
+        for key, value in split_counts.items():
+            stats[key] = stats.get(key, 0) + value
+
     result = new_tree_list
 
     return result
 
+def get_last_reference_indices(tree_list: list[Tree]) -> dict[int, int]:
+    # Coref id -> index of the last tree with an NP referring to it.
+    last_reference_indices: dict[int, int] = {}
+    for tree_index, tree in enumerate(tree_list):
+        for subtree in tree.subtrees(lambda t: t.label().tag == "NP"):
+            coref_id = get_coref_id(subtree)
+            if coref_id != -1:
+                last_reference_indices[coref_id] = tree_index
+
+    return last_reference_indices
+
 def transform_for_conjoined_clauses(tree: Tree) -> tuple[Tree|None, Tree|None, bool]:
     # Find "CONJ-CLAUSE-1"
     first_conj_clause_index = 0
-    while first_conj_clause_index < len(tree) and tree[first_conj_clause_index].label() != "CONJ-CLAUSE-1":
+    while first_conj_clause_index < len(tree) and tree[first_conj_clause_index].label().tag != "CONJ-CLAUSE-1":
         first_conj_clause_index += 1
 
     if first_conj_clause_index == len(tree):
@@ -80,7 +129,7 @@ def transform_for_conjoined_clauses(tree: Tree) -> tuple[Tree|None, Tree|None, b
         
     # Find "CONJ-CLAUSE-2"
     second_conj_clause_index = first_conj_clause_index + 1
-    while second_conj_clause_index < len(tree) and tree[second_conj_clause_index].label() != "CONJ-CLAUSE-2":
+    while second_conj_clause_index < len(tree) and tree[second_conj_clause_index].label().tag != "CONJ-CLAUSE-2":
         second_conj_clause_index += 1
 
     if second_conj_clause_index == len(tree):
@@ -120,19 +169,19 @@ def demark_clause(tree: Tree, clause_indices: list[int]):
         children=children
     )
 
-def new_id_because_of_split(tree: Tree, split_id: int) -> str:
+def new_id_because_of_split(tree: Tree, split_id: int) -> NodeRecord:
     tree_label = tree.label()
-    return f"{tree_label}.{split_id}"
+    return NodeRecord(tree_label.tag, sentence_id=f"{tree_label.sentence_id}.{split_id}")
 
 def transform_for_relative_clause(tree: Tree) -> tuple[Tree|None, Tree|None, bool]:
     rel_clause_index = 0
-    while rel_clause_index < len(tree) and tree[rel_clause_index].label() not in ["SIMP-REST-CL", "SIMP-NONREST-CL"]:
+    while rel_clause_index < len(tree) and tree[rel_clause_index].label().tag not in ["SIMP-REST-CL", "SIMP-NONREST-CL"]:
         rel_clause_index += 1
 
     if rel_clause_index == len(tree):
         return (None, None, False)
     
-    np_id = get_coref_id_from_tree_label(tree[rel_clause_index, 0].label()) # Lanjut resolve ini
+    np_id = get_coref_id(tree[rel_clause_index, 0]) # Lanjut resolve ini
     if np_id == -1:
         new_tree = demark_clause(tree, [rel_clause_index])
         return (new_tree, None, True)
@@ -158,11 +207,11 @@ def transform_for_relative_clause(tree: Tree) -> tuple[Tree|None, Tree|None, boo
         return (new_tree, None, True)
     
     first_part = tree[:rel_clause_index]
-    if len(first_part) > 0 and " ".join(first_part[-1].leaves()) == ",":
+    if len(first_part) > 0 and get_surface_text(first_part[-1]) == ",":
         first_part = first_part[:-1]
 
     last_part = tree[rel_clause_index + 1:]
-    if len(last_part) > 0 and " ".join(last_part[0].leaves()) == ",":
+    if len(last_part) > 0 and get_surface_text(last_part[0]) == ",":
         last_part = last_part[1:]
 
     first_new_tree = Tree(
@@ -177,30 +226,23 @@ def transform_for_relative_clause(tree: Tree) -> tuple[Tree|None, Tree|None, boo
 
     return (first_new_tree, second_new_tree, True)
 
-def get_np_index_by_id(tree: Tree, np_id: int | str):
-    np_index = 0
-    found = False
-    while np_index < len(tree) and (not found):
-        other_subtree_label = tree[np_index].label()
-        if other_subtree_label.startswith("NP") and f"id={np_id}" in other_subtree_label:
-            found = True
-        else:
-            np_index += 1
+def get_np_index_by_id(tree: Tree, np_id: int):
+    return NounPhraseIndex(tree).position(np_id)
 
-    if found:
-        return np_index
-    else:
-        return -1
+def is_in_tree(tree: Tree, noun_phrases: NounPhraseIndex, np: Tree) -> bool:
+    # Same as `np in list(tree)`: only the child with the same NP id can be equal to it.
+    np_index = noun_phrases.position(np.label().np_id)
+    return np_index != -1 and tree[np_index] == np
     
 def transform_for_appositive(tree: Tree, strategy=1) -> tuple[Tree|None, Tree|None, bool]:
     appos_index = 0
-    while appos_index < len(tree) and tree[appos_index].label() != "SIMP-APPOS":
+    while appos_index < len(tree) and tree[appos_index].label().tag != "SIMP-APPOS":
         appos_index += 1
 
     if appos_index == len(tree):
         return (None, None, False)
     
-    np_id = get_coref_id_from_tree_label(tree[appos_index, 0].label())
+    np_id = get_coref_id(tree[appos_index, 0])
     if np_id == -1:
         new_tree = demark_clause(tree, [appos_index])
         return (new_tree, None, True)
@@ -221,11 +263,11 @@ def transform_for_appositive(tree: Tree, strategy=1) -> tuple[Tree|None, Tree|No
         return (new_tree, None, True)
     
     first_part = tree[:appos_index]
-    if len(first_part) > 0 and " ".join(first_part[-1].leaves()) == ",":
+    if len(first_part) > 0 and get_surface_text(first_part[-1]) == ",":
         first_part = first_part[:-1]
 
     last_part = tree[appos_index + 1:]
-    if len(last_part) > 0 and " ".join(last_part[0].leaves()) == ",":
+    if len(last_part) > 0 and get_surface_text(last_part[0]) == ",":
         last_part = last_part[1:]
 
     first_new_tree = Tree(
@@ -238,25 +280,21 @@ def transform_for_appositive(tree: Tree, strategy=1) -> tuple[Tree|None, Tree|No
         appos_subtrees[0] = removed_coref(appos_subtrees[0])
         second_new_tree = Tree(
             node=new_id_because_of_split(tree, 1),
-            children=[tree[referred_np_index]] + [Tree(node="AUX", children=["adalah"])] + list(appos_subtrees) + [last_part[-1]]
+            children=[tree[referred_np_index]] + [Tree(node=NodeRecord("AUX"), children=["adalah"])] + list(appos_subtrees) + [last_part[-1]]
         )
     else:
         second_new_tree = Tree(
             node=new_id_because_of_split(tree, 1),
-            children=[tree[referred_np_index]] + [Tree(node="AUX", children=["adalah"])] + list(appos_subtrees) + [last_part[-1]]
+            children=[tree[referred_np_index]] + [Tree(node=NodeRecord("AUX"), children=["adalah"])] + list(appos_subtrees) + [last_part[-1]]
         )
 
     return (first_new_tree, second_new_tree, True)
 
 def removed_coref(tree: Tree):
-    label = tree.label()
-    attributes = label.split(";")
-    new_attributes: list[str] = []
-    for attribute in attributes:
-        if not attribute.startswith("coref"):
-            new_attributes.append(attribute)
+    label = tree.label().copy()
+    label.coref = None
 
     return Tree(
-        node=";".join(new_attributes),
+        node=label,
         children=list(tree)
     )
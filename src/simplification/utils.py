@@ -1,20 +1,23 @@
-def get_coref_id_from_tree_label(tree_label: str) -> int:
-    result = get_attribute_value_from_tree_label(tree_label, "coref")
-    if result is None:
+from nltk import Tree
+
+def get_coref_id(tree: Tree) -> int:
+    coref_id = tree.label().coref
+    if coref_id is None:
         return -1
     else:
-        return int(result)
+        return coref_id
+
+def get_surface_text(tree: Tree) -> str:
+    # NP texts are read by several stages, so they are joined once and kept on the label.
+    label = tree.label()
+    if label.tag != "NP":
+        return " ".join(tree.leaves())
 
-def get_attribute_value_from_tree_label(tree_label: str, key: str) -> str | None:
-    result: str | None = None
-    attributes = tree_label.split(";")
-    for attribute in attributes:
-        if attribute.startswith(key):
-            _, result = attribute.split("=")
-            break
+    if label.text is None:
+        label.text = " ".join(tree.leaves())
 
-    return result
+    return label.text
 
-def is_numeric_attribute_np(tree: str) -> bool:
-    target_np_text = " ".join(tree.leaves()).lower()
+def is_numeric_attribute_np(tree: Tree) -> bool:
+    target_np_text = get_surface_text(tree).lower()
     return "jumlah" in target_np_text and "sejumlah" not in target_np_text
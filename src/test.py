@@ -5,7 +5,7 @@ import time
 from .max_bleu import bleu_score_for_simplified_sentences_pair
 
 from .utils import word_list_to_sentence
-analyzer = indo_ts.TextSimplifier(tokenize_no_ssplit=True, strategy=5)
+analyzer = indo_ts.TextSimplifier(tokenize_pretokenized=True, strategy=5, stanza_cache_dir="private/stanza_cache")
 
 def load_dataset(file_path: str) -> dict:
     with open(file_path, mode="r") as file:
@@ -87,15 +87,12 @@ for document_id, simplified_sentences in result.items():
             if open_bracket_index >= 0:
                 word_list = word_list[:open_bracket_index]
 
-        sentence = word_list_to_sentence(word_list)
-        sentences.append(sentence)
+        sentences.append(word_list)
 
-    document = "\n\n".join(sentences)
-
-    result: list[list[str]] = analyzer.simplify(document)
+    result: list[list[str]] = analyzer.simplify(sentences)
 
     # Baseline 1:
-    # result: list[list[str]] = [[sentence] * 4 for sentence in document.split("\n\n")]
+    # result: list[list[str]] = [[word_list_to_sentence(word_list)] * 4 for word_list in sentences]
 
     for sentence_index in simplified_sentences.keys():
         input_sentence = word_list_to_sentence(content["clean_article"][sentence_index])
@@ -63,18 +63,19 @@ output_path = f"private/test_result_{int(round(time.time()))}_wibowo.txt"
 total_score = 0.0
 max_score = 0.0
 
-stanza_pipeline = init_stanza_pipeline(tokenize_no_ssplit=True)
+stanza_pipeline = init_stanza_pipeline(tokenize_pretokenized=True, cache_dir="private/stanza_cache")
 
-def simple_simplification(document: str) -> list[list[str]]:
+def simple_simplification(document: list[list[str]]) -> list[list[str]]:
     tree_list = stanza_pipeline(document)
-    result: list[list[str]] = []
+    # An empty sentence has no tree.
+    result: list[list[str]] = [[] for _ in document]
     for tree in tree_list:
         current_simplified_sentences: list[str] = []
         current_word_list: list[str] = []
         for subtree in tree:
-            if "CONJ" in subtree.label():
+            if subtree.label().tag in ["CCONJ", "SCONJ"]:
                 current_word_list.append(".")
-                if subtree.label().startswith("CCONJ"):
+                if subtree.label().tag == "CCONJ":
                     current_simplified_sentences.append(word_list_to_sentence(current_word_list))
                     current_word_list = []
                 # else: do nothing
@@ -84,7 +85,7 @@ def simple_simplification(document: str) -> list[list[str]]:
         if len(current_word_list) > 0:
             current_simplified_sentences.append(word_list_to_sentence(current_word_list))
 
-        result.append(current_simplified_sentences)
+        result[int(tree.label().sentence_id)] = current_simplified_sentences
 
     return result
             
@@ -113,11 +114,9 @@ for document_id, simplified_sentences in result.items():
             if open_bracket_index >= 0:
                 word_list = word_list[:open_bracket_index]
 
-        sentence = word_list_to_sentence(word_list)
-        sentences.append(sentence)
+        sentences.append(word_list)
 
-    document = "\n\n".join(sentences)
-    result: list[list[str]] = simple_simplification(document)
+    result: list[list[str]] = simple_simplification(sentences)
     for sentence_index in simplified_sentences.keys():
         input_sentence = word_list_to_sentence(content["clean_article"][sentence_index])
         output_sentences = result[sentence_index]
@@ -1,34 +1,108 @@
-import nltk
-import re
+NO_SPACE_BEFORE = frozenset([".", ","])
+DIGITS = frozenset("0123456789")
 
-def word_list_to_sentence(word_list: list[str]) -> str:
-    sentence = ""
-    expected_close_symbol = []
+def word_list_to_sentence(word_list: list[str], balanced_brackets=False) -> str:
+    # Joins the words with spaces, except before "." and "," and a ")" that closes a "(", after
+    # "(" and "Rp", and after a digit followed by "." or ",". Text in square brackets (citations)
+    # is removed, see strip_brackets.
+    parts: list[str] = []
+    append = parts.append
+    last_character = ""
+    # Whether the sentence so far ends with a digit followed by "." or ","
+    after_number_punctuation = False
+    open_parenthesis_count = 0
     next_no_space = True
     for word in word_list:
         if next_no_space:
-            sentence += word
+            part = word
             next_no_space = False
-        elif word in [".", ","]:
-            sentence += word
-        elif len(expected_close_symbol) > 0 and expected_close_symbol[-1] == ")" == word:
-            sentence += word
-            expected_close_symbol.pop()
+        elif word in NO_SPACE_BEFORE:
+            part = word
+        elif open_parenthesis_count > 0 and word == ")":
+            part = word
+            open_parenthesis_count -= 1
         elif word == "(":
-            sentence += " " + word
+            part = " " + word
             next_no_space = True
-            expected_close_symbol.append(")")
-        elif len(sentence) >= 2 and sentence[-2] in "0123456789" and sentence[-1] in [".", ","]:
-            sentence += word
+            open_parenthesis_count += 1
+        elif after_number_punctuation:
+            part = word
         elif word == "Rp":
-            sentence += " " + word
+            part = " " + word
             next_no_space = True
         else:
-            sentence += " " + word
+            part = " " + word
 
-    sentence = re.sub(r"\[.+\]", "", sentence)
+        append(part)
+        if len(part) >= 2:
+            after_number_punctuation = part[-1] in NO_SPACE_BEFORE and part[-2] in DIGITS
+            last_character = part[-1]
+        elif part != "":
+            after_number_punctuation = part in NO_SPACE_BEFORE and last_character in DIGITS
+            last_character = part
+
+    sentence = "".join(parts)
+    if "[" in sentence:
+        sentence = strip_brackets(sentence, balanced_brackets=balanced_brackets)
 
     return sentence
 
+def word_lists_to_sentences(word_lists: list[list[str]], balanced_brackets=False) -> list[str]:
+    # All sentences of a document in one call
+    return [word_list_to_sentence(word_list, balanced_brackets=balanced_brackets) for word_list in word_lists]
+
+def strip_brackets(sentence: str, balanced_brackets=False) -> str:
+    """Removes text in square brackets, line by line.
+
+    By default, like re.sub(r"\\[.+\\]", "", sentence): from the first "[" of a line to its last
+    "]", so "a [1] b [2] c" becomes "a  c". With `balanced_brackets`, only each bracketed span is
+    removed ("a  b  c"), and unmatched brackets are kept.
+    """
+    if "[" not in sentence:
+        return sentence
+
+    return "\n".join(
+        strip_balanced_brackets(line) if balanced_brackets else strip_first_to_last_bracket(line)
+        for line in sentence.split("\n")
+    )
+
+def strip_first_to_last_bracket(line: str) -> str:
+    # Later "[" can only match if the first one does, and a match ends at the last "]".
+    start_index = line.find("[")
+    if start_index < 0:
+        return line
+
+    end_index = line.rfind("]")
+    if end_index < start_index + 2:
+        return line
+
+    return line[:start_index] + line[end_index + 1:]
+
+def strip_balanced_brackets(line: str) -> str:
+    # Every "[" matched by a later "]" with text between them is removed with that text; a span
+    # nested in another is removed with the outer one, and unmatched brackets stay.
+    spans: list[tuple[int, int]] = []
+    open_indices: list[int] = []
+    for index, character in enumerate(line):
+        if character == "[":
+            open_indices.append(index)
+        elif character == "]" and len(open_indices) > 0:
+            start_index = open_indices.pop()
+            if index >= start_index + 2:
+                spans.append((start_index, index + 1))
+
+    parts: list[str] = []
+    previous_end_index = 0
+    for start_index, end_index in sorted(spans):
+        if start_index >= previous_end_index:
+            parts.append(line[previous_end_index:start_index])
+            previous_end_index = end_index
+
+    parts.append(line[previous_end_index:])
+    return "".join(parts)
+
 def sentence_to_word_list(sentence):
+    # Imported here, so that the rest of this module does not wait for NLTK.
+    import nltk
+
     return nltk.word_tokenize(sentence)